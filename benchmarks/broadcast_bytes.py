@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Measures the bytes per wave broadcast as full "board" and as "delta" messages.
+
+Random valid moves are played on a large board, every wave of the "chain reaction"
+is encoded once as full board and once as the changes to the wave before (see
+"Network_s.send_board").
+
+Usage:
+    python benchmarks/broadcast_bytes.py [--width 100] [--height 100] [--moves 2000]
+"""
+
+
+from __future__ import annotations
+import argparse
+
+import numpy as np
+
+from chainreaction.game_rules import Gamecalc
+from chainreaction import protocol
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--height", type=int, default=100)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--moves", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    game = Gamecalc(args.players, args.width, args.height, 0, None, None, None)
+    previous = game.board_frame()
+    full_bytes = delta_bytes = waves = 0
+    for round_num in range(args.moves):
+        if game.winner is not None:
+            break
+        valid = game.valid_moves()
+        pos = divmod(int(valid[rng.integers(len(valid))]), args.width)
+        frames = game.update_player(game.player_to_move(), [pos], [1], None, round_num,
+                                    as_board=True)
+        for frame in frames:
+            full_bytes += len(protocol.encode(("board", frame)))
+            delta = protocol.board_delta(previous, frame)
+            delta_bytes += len(protocol.encode(("delta", (round_num, *delta))))
+            previous = frame
+            waves += 1
+        if game.winner is None:
+            game.increase_counter()
+            game.player_next_to_move()
+
+    print(f"board {args.height}x{args.width}, {args.players} players, {waves} waves")
+    print(f"board: {full_bytes / waves:>10.1f} B/wave")
+    print(f"delta: {delta_bytes / waves:>10.1f} B/wave")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Measures the cost of broadcasting a wave to many spectators.
+
+Every spectator is one end of a socket pair. A board is send to all of them once
+per connection with "Network_s.send" (one encoding per spectator) and once with
+"Network_s.broadcast" (one encoding shared by all spectators). The other ends are
+drained between the waves, which is not measured.
+
+Usage:
+    python benchmarks/broadcast_fanout.py [--spectators 100] [--size 100] [--waves 50]
+"""
+
+
+from __future__ import annotations
+import argparse
+import logging
+import socket
+import time
+
+import numpy as np
+
+from chainreaction.network import FrameReader, Network_s
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spectators", type=int, default=100)
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--waves", type=int, default=50)
+    args = parser.parse_args()
+
+    server = Network_s("127.0.0.1", 0, logging.getLogger("benchmark"), "benchmark")
+    pairs = [socket.socketpair() for _ in range(args.spectators)]
+    for sender, reciever in pairs:
+        sender.setblocking(False)
+        reciever.setblocking(False)
+        server.connections.append(sender)
+    readers = [FrameReader() for _ in pairs]
+    rng = np.random.default_rng(0)
+    board = (rng.integers(-1, 4, (args.size, args.size)).astype(np.int8),
+             rng.integers(0, 4, (args.size, args.size)).astype(np.uint8))
+
+    def per_connection() -> None:
+        for connection in server.connections:
+            server.send(connection, ("board", board))
+
+    def shared() -> None:
+        server.broadcast(server.connections, ("board", board))
+
+    print(f"{args.spectators} spectators, board {args.size}x{args.size}")
+    for name, function in (("send", per_connection), ("broadcast", shared)):
+        elapsed = 0.0
+        for _ in range(args.waves):
+            start = time.perf_counter()
+            function()
+            elapsed += time.perf_counter() - start
+            while server.pending():
+                server.flush(server.connections)
+                for (_, reciever), reader in zip(pairs, readers):
+                    reader.read(reciever)
+            for (_, reciever), reader in zip(pairs, readers):
+                reader.read(reciever)
+        print(f"{name:>10}: {elapsed / args.waves * 1e3:8.2f} ms/wave")
+    for sender, reciever in pairs:
+        sender.close()
+        reciever.close()
+    server.server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Measures the moves per minute of random games through the "Gamecalc" API.
+
+Every game plays random valid moves with "valid_moves" and "apply_move" (the fast
+path of "Bot") until a player won. The raw "Bitboard" plays the same kind of games
+without "Gamecalc" as an upper bound of the "bitboard" engine.
+
+The dense case fills a "--cascade" x "--cascade" board with one circle less than the
+critical mass on every position (owned by two players at random), so a single move
+"explodes" the whole board until one player is left.
+
+Usage:
+    python benchmarks/engine_moves.py [--width 6] [--height 9] [--players 2] [--games 200]
+                                      [--cascade 30] [--repeat 3]
+"""
+
+
+from __future__ import annotations
+from typing import Tuple
+import argparse
+import time
+
+import numpy as np
+
+from chainreaction.bitboard import Bitboard, bits_to_cells
+from chainreaction.game_rules import Gamecalc
+
+
+ENGINES = ("numpy", "classic", "bitboard")
+
+
+def bench_gamecalc(engine: str, player_num: int, width_num: int, height_num: int,
+                   games: int, seed: int = 0) -> float:
+    """Returns the moves per minute of random games played with "Gamecalc"."""
+    rng = np.random.default_rng(seed)
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        game = Gamecalc(player_num, width_num, height_num, 0, None, None, None,
+                        engine=engine, undo_limit=0)
+        while game.winner is None:
+            valid = game.valid_moves()
+            game.apply_move(divmod(int(valid[rng.integers(len(valid))]), width_num))
+            moves += 1
+    return 60 * moves / (time.perf_counter() - start)
+
+
+def bench_bitboard(player_num: int, width_num: int, height_num: int, games: int,
+                   seed: int = 0) -> float:
+    """Returns the moves per minute of random games played with the raw "Bitboard"."""
+    rng = np.random.default_rng(seed)
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        board = Bitboard(player_num, width_num, height_num)
+        player = 0
+        while board.winner is None:
+            valid = bits_to_cells(board.valid_moves(player))
+            board.play(player, valid[rng.integers(len(valid))])
+            moves += 1
+            player = (player + 1) % player_num
+            while not board.alive[player]:
+                player = (player + 1) % player_num
+    return 60 * moves / (time.perf_counter() - start)
+
+
+def bench_cascade(engine: str, size: int, repeat: int, seed: int = 0) -> Tuple[float, int]:
+    """Returns the fastest time in s and the number of waves of a full board cascade."""
+    rng = np.random.default_rng(seed)
+    owner = rng.integers(0, 2, (size, size))
+    owner[0, 0] = 0
+    times = []
+    for _ in range(repeat):
+        game = Gamecalc(2, size, size, 0, None, None, None, engine=engine, undo_limit=0)
+        critical_mass = game.tables.critical_mass.reshape(size, size)
+        game.player_pos = {num: np.where(owner == num, critical_mass - 1, 0) for num in range(2)}
+        start = time.perf_counter()
+        waves = len(list(game.play(0, (0, 0))))
+        times.append(time.perf_counter() - start)
+    return min(times), waves
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=6)
+    parser.add_argument("--height", type=int, default=9)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--cascade", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"board {args.height}x{args.width}, {args.players} players, {args.games} games")
+    for engine in ENGINES:
+        per_minute = bench_gamecalc(engine, args.players, args.width, args.height, args.games)
+        print(f"{engine:>10} {per_minute:>12,.0f} moves/min")
+    per_minute = bench_bitboard(args.players, args.width, args.height, args.games)
+    print(f"{'Bitboard':>10} {per_minute:>12,.0f} moves/min")
+
+    print(f"full board cascade on {args.cascade}x{args.cascade}")
+    for engine in ENGINES:
+        seconds, waves = bench_cascade(engine, args.cascade, args.repeat)
+        print(f"{engine:>10} {seconds * 1e3:>12.1f} ms ({waves} waves)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Measures how fast "FrameReader" decodes a burst of wave messages from a socket.
+
+A burst of "delta" messages (and some full boards) is written to one end of a
+socket pair and read from the other, non-blocking end as done by the server and the
+client after "select".
+
+Usage:
+    python benchmarks/frame_reader.py [--messages 20000] [--size 200]
+"""
+
+
+from __future__ import annotations
+import argparse
+import socket
+import threading
+import time
+
+import numpy as np
+
+from chainreaction import protocol
+from chainreaction.network import FrameReader
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    board = (rng.integers(-1, 4, (args.size, args.size)).astype(np.int8),
+             rng.integers(0, 4, (args.size, args.size)).astype(np.uint8))
+    cells = np.sort(rng.choice(args.size * args.size, 16, replace=False))
+    delta = protocol.encode(("delta", (1, cells, board[0].ravel()[cells],
+                                       board[1].ravel()[cells])))
+    keyframe = protocol.encode(("keyframe", (1, *board)))
+    stream = b"".join(keyframe if num % 32 == 0 else delta for num in range(args.messages))
+
+    sender, reciever = socket.socketpair()
+    reciever.setblocking(False)
+    writer = threading.Thread(target=sender.sendall, args=(stream,))
+    reader = FrameReader()
+    recieved = reads = 0
+    start = time.perf_counter()
+    writer.start()
+    while recieved < args.messages:
+        recieved += len(reader.read(reciever))
+        reads += 1
+    elapsed = time.perf_counter() - start
+    writer.join()
+    sender.close()
+    reciever.close()
+    print(f"{args.messages} messages, {len(stream) / 1e6:.1f} MB, board {args.size}x{args.size}")
+    print(f"{args.messages / elapsed:,.0f} messages/s, {len(stream) / elapsed / 1e6:.1f} MB/s, "
+          f"{args.messages / reads:.1f} messages per read")
+
+
+if __name__ == "__main__":
+    main()
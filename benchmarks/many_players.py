@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Measures the cost of a move and the size of a broadcast for 2 to 64 players.
+
+Every game plays random valid moves on the same board. A move consists of finding
+the current player, calculating the "chain reaction" (the "board_frame" of every wave
+is returned as done by the server) and advancing the turn. The broadcast size is the
+encoded "board" message (see "chainreaction.protocol") compared to the pickled
+one-board-per-player "player_pos".
+
+Usage:
+    python benchmarks/many_players.py [--width 20] [--height 20] [--moves 400]
+"""
+
+
+from __future__ import annotations
+import argparse
+import pickle
+import time
+
+import numpy as np
+
+from chainreaction.game_rules import Gamecalc
+from chainreaction import protocol
+
+
+PLAYER_NUMS = (2, 4, 8, 16, 32, 64)
+
+
+def bench_moves(player_num: int, width_num: int, height_num: int, moves: int,
+                seed: int = 0) -> float:
+    """Returns the average time in s of a move with "player_num" players."""
+    rng = np.random.default_rng(seed)
+    game = Gamecalc(player_num, width_num, height_num, 0, None, None, None)
+    elapsed = 0.0
+    played = 0
+    for round_num in range(moves):
+        if game.winner is not None:
+            break
+        valid = game.valid_moves()
+        pos = divmod(int(valid[rng.integers(len(valid))]), width_num)
+        start = time.perf_counter()
+        player = game.player_to_move()
+        game.update_player(player, [pos], [1], None, round_num, as_board=True)
+        if game.winner is None:
+            game.increase_counter()
+            game.player_next_to_move()
+        elapsed += time.perf_counter() - start
+        played += 1
+    return elapsed / max(played, 1)
+
+
+def broadcast_sizes(player_num: int, width_num: int, height_num: int) -> tuple[int, int]:
+    """Returns the encoded size of a "board" and the pickled size of a "positions" message in bytes."""
+    game = Gamecalc(player_num, width_num, height_num, 0, None, None, None)
+    board = len(protocol.encode(("board", game.board_frame())))
+    positions = len(pickle.dumps(("positions", game.player_pos)))
+    return board, positions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=20)
+    parser.add_argument("--height", type=int, default=20)
+    parser.add_argument("--moves", type=int, default=400)
+    args = parser.parse_args()
+
+    print(f"board {args.height}x{args.width}, {args.moves} moves")
+    print(f"{'players':>8} {'us/move':>10} {'board B':>9} {'positions B':>12}")
+    for player_num in PLAYER_NUMS:
+        per_move = bench_moves(player_num, args.width, args.height, args.moves)
+        board, positions = broadcast_sizes(player_num, args.width, args.height)
+        print(f"{player_num:>8} {per_move * 1e6:>10.1f} {board:>9} {positions:>12}")
+
+
+if __name__ == "__main__":
+    main()
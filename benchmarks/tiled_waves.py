@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Measures the time of large waves with the "numpy" and the "tiled" engine.
+
+The board is filled with random circles of two players and a share of the positions
+recieves a circle of player "0" at once, so the following waves "explode" a large
+part of the board. The first "--waves" waves are calculated by "Gamecalc" (including
+"totals", the hash and the undo journal) with the serial "numpy" engine and with
+the "tiled" engine with a growing number of threads. The speedup depends on the
+number of cores of the machine.
+
+Usage:
+    python benchmarks/tiled_waves.py [--size 600] [--share 0.3] [--waves 6] [--repeat 3]
+"""
+
+
+from __future__ import annotations
+import argparse
+import os
+import time
+
+import numpy as np
+
+from chainreaction.game_rules import Gamecalc
+
+
+def start_game(size: int, seed: int = 0) -> Gamecalc:
+    """Returns a game with random circles of two players."""
+    game = Gamecalc(2, size, size, 0, None, None, None)
+    rng = np.random.default_rng(seed)
+    critical_mass = game.tables.critical_mass.reshape(size, size)
+    count = (rng.random((size, size)) * critical_mass).astype(int)
+    owner = rng.integers(0, 2, (size, size))
+    game.player_pos = {num: np.where(owner == num, count, 0) for num in range(2)}
+    return game
+
+
+def best_time(start: Gamecalc, engine: str, workers: int | None, pos_l, waves: int,
+              repeat: int) -> float:
+    """Returns the fastest time in s per wave of "repeat" moves."""
+    times = []
+    for _ in range(repeat):
+        game = Gamecalc(2, start.width_num, start.height_num, 0, None, None, None,
+                        engine=engine, workers=workers, max_waves=waves, max_frames=1)
+        game.load_state(start)
+        game.set_state_for_undo(0)
+        begin = time.perf_counter()
+        game.update_player(0, pos_l, [1] * len(pos_l), None, 0)
+        times.append((time.perf_counter() - begin) / len(game.time_line[0]))
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=600)
+    parser.add_argument("--share", type=float, default=0.3)
+    parser.add_argument("--waves", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = start_game(args.size)
+    rng = np.random.default_rng(1)
+    cells = rng.choice(args.size * args.size, int(args.size * args.size * args.share),
+                       replace=False)
+    pos_l = [divmod(int(cell), args.size) for cell in np.sort(cells)]
+    serial = best_time(start, "numpy", None, pos_l, args.waves, args.repeat)
+    print(f"board {args.size}x{args.size}, {len(pos_l)} positions recieve a circle, "
+          f"{os.cpu_count()} cores")
+    print(f"{'engine':>8} {'workers':>8} {'ms/wave':>9} {'speedup':>8}")
+    print(f"{'numpy':>8} {'-':>8} {serial * 1e3:>9.1f} {1:>8.2f}")
+    workers = 1
+    while workers <= max(os.cpu_count() or 1, 1) * 2:
+        tiled = best_time(start, "tiled", workers, pos_l, args.waves, args.repeat)
+        print(f"{'tiled':>8} {workers:>8} {tiled * 1e3:>9.1f} {serial / tiled:>8.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
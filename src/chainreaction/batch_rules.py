@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the "Batchcalc" class to calculate many independent games at once.
+
+Follows the rules of "Gamecalc" but stores all games in stacked arrays and resolves
+the waves of all "chain reactions" of a move with vectorized operations. Intended
+for bot training and balance testing.
+"""
+
+
+from __future__ import annotations
+from typing import Dict
+
+import numpy as np
+
+from chainreaction.topology import WAVES_PER_SIDE, BoardTables, board_tables
+
+
+class Batchcalc():
+    """Calculates many games with the same board and number of players at once."""
+    def __init__(self, game_num: int, player_num: int, width_num: int, height_num: int,
+                 max_waves: int | None = None, tables: BoardTables | None = None) -> None:
+        """Initializes the instance.
+
+        Positions are adressed by their flat index "row * width_num + column".
+
+        Args:
+            game_num: Number of games.
+            player_num: Number of players per game.
+            width_num: Number of boxes in x-direction.
+            height_num: Number of boxes in y-direction.
+            max_waves: Hard limit of waves per "chain reaction" like "Gamecalc.max_waves".
+              Defaults to "WAVES_PER_SIDE" times "height_num + width_num".
+            tables: Topology of the board, see "board_tables". Defaults to a rectangular
+              board.
+        """
+        self.game_num = int(game_num)
+        self.player_num = int(player_num)
+        self.width_num = int(width_num)
+        self.height_num = int(height_num)
+        if tables is None:
+            tables = board_tables(self.height_num, self.width_num)
+        if tables.critical_mass.size != self.height_num * self.width_num:
+            raise ValueError("Board tables do not match the board size")
+        self.tables = tables
+        cell_num = self.height_num * self.width_num
+        if max_waves is None:
+            max_waves = WAVES_PER_SIDE * (self.height_num + self.width_num)
+        self.max_waves = max(1, int(max_waves))
+        owner_dtype = np.int8 if self.player_num <= np.iinfo(np.int8).max else np.int16
+        self.owner = np.full((self.game_num, cell_num), -1, dtype=owner_dtype)
+        self.count = np.zeros((self.game_num, cell_num), dtype=np.uint8)
+        self.alive = np.ones((self.game_num, self.player_num), dtype=bool)
+        self.counter = np.zeros(self.game_num, dtype=int)
+        self.winner = np.full(self.game_num, -1, dtype=int)
+
+    def player_pos(self, game: int) -> Dict[int, np.ndarray]:
+        """Returns the "player_pos" of a game, see "Gamecalc.player_pos".
+
+        Args:
+            game: Index of the game.
+
+        Returns:
+            Number and locations of circles corresponding to the "player_numbers".
+        """
+        owner = self.owner[game].reshape(self.height_num, self.width_num)
+        count = self.count[game].reshape(self.height_num, self.width_num)
+        player_pos = {}
+        for num in range(self.player_num):
+            player_pos[num] = np.where(owner == num, count, 0).astype(np.uint8)
+        return player_pos
+
+    def set_player_pos(self, game: int, player_pos: Dict[int, np.ndarray]) -> None:
+        """Replaces the state of a game by "player_pos".
+
+        Args:
+            game: Index of the game.
+            player_pos: Number and locations of circles corresponding to the "player_numbers".
+        """
+        self.owner[game] = -1
+        self.count[game] = 0
+        for num, board in player_pos.items():
+            board = np.asarray(board).reshape(-1)
+            occupied = board != 0
+            self.owner[game, occupied] = num
+            self.count[game, occupied] = board[occupied]
+
+    def totals(self) -> np.ndarray:
+        """Returns the number of circles of every player in every game (games x players)."""
+        occupied = self.owner >= 0
+        games = np.nonzero(occupied)[0]
+        index = games * self.player_num + self.owner[occupied]
+        totals = np.bincount(index, weights=self.count[occupied],
+                             minlength=self.game_num * self.player_num)
+        return totals.astype(int).reshape(self.game_num, self.player_num)
+
+    def player_to_move(self) -> np.ndarray:
+        """Returns the "player_number" of the current player of every game.
+
+        Skips eliminated players like "Gamecalc.player_to_move".
+
+        Returns:
+            "Player_number" of the current player, "-1" for finished games.
+        """
+        offsets = (self.counter[:, np.newaxis] + np.arange(self.player_num)) % self.player_num
+        alive = np.take_along_axis(self.alive, offsets, axis=1)
+        first = np.argmax(alive, axis=1)
+        self.counter += first
+        players = offsets[np.arange(self.game_num), first]
+        players[(self.winner >= 0) | ~alive.any(axis=1)] = -1
+        return players
+
+    def valid_moves(self) -> np.ndarray:
+        """Returns which positions the current player of every game can play (games x cells)."""
+        players = self.player_to_move()
+        valid = (self.owner == players[:, np.newaxis]) | (self.count == 0)
+        valid[:, self.tables.blocked] = False
+        valid[players < 0] = False
+        return valid
+
+    def _update_alive(self, games: np.ndarray) -> None:
+        """Eliminates the players without circles in the selected games.
+
+        Args:
+            games: Mask of the games to check.
+        """
+        if games.any():
+            self.alive[games] &= self.totals()[games] > 0
+
+    def step(self, moves: np.ndarray) -> np.ndarray:
+        """Places one circle of the current player of every game and resolves all "chain reactions".
+
+        Args:
+            moves: Flat index of the position played in every game. Games with a negative
+              index or an invalid move (see "valid_moves") are skipped.
+
+        Returns:
+            Number of waves of every game ("0" for skipped games).
+        """
+        moves = np.asarray(moves, dtype=np.intp)
+        games = np.arange(self.game_num)
+        players = self.player_to_move()
+        active = (players >= 0) & (moves >= 0)
+        active[active] = self.valid_moves()[games[active], moves[active]]
+        moved = active.copy()
+        max_num = self.tables.critical_mass
+        cell_num = self.owner.shape[1]
+
+        incoming = np.zeros(self.owner.shape, dtype=np.uint8)
+        incoming[games[active], moves[active]] = 1
+        exploded = np.zeros(self.game_num, dtype=bool)
+        waves = np.zeros(self.game_num, dtype=int)
+        while active.any():
+            recieved = incoming > 0
+            np.copyto(self.owner, players[:, np.newaxis], casting="unsafe", where=recieved)
+            self.count += incoming
+            waves[active] += 1
+
+            overloaded = recieved & (self.count >= max_num)
+            has_overloaded = overloaded.any(axis=1)
+            self._update_alive(has_overloaded)
+            continuing = (has_overloaded & (self.alive.sum(axis=1) != 1)
+                          & (waves < self.max_waves))
+
+            finished = active & ~continuing & exploded
+            self._update_alive(finished)
+            single = finished & (self.alive.sum(axis=1) == 1)
+            self.winner[single] = np.argmax(self.alive[single], axis=1)
+
+            active = continuing
+            overloaded &= continuing[:, np.newaxis]
+            self.count -= np.where(overloaded, max_num, 0).astype(self.count.dtype)
+            self.owner[overloaded & (self.count == 0)] = -1
+            exploded |= continuing
+
+            game_idx, cells = np.nonzero(overloaded)
+            starts = self.tables.neighbor_ptr[cells]
+            neighbors = self.tables.neighbors(cells)
+            game_idx = np.repeat(game_idx, self.tables.neighbor_ptr[cells + 1] - starts)
+            incoming = np.bincount(game_idx * cell_num + neighbors,
+                                   minlength=self.owner.size).astype(np.uint8)
+            incoming = incoming.reshape(self.owner.shape)
+
+        self.counter[moved & (self.winner < 0)] += 1
+        return waves
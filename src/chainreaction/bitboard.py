@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the "Bitboard" class, a game state packed into integers for small boards.
+
+Every position is one bit ("row * width_num + column") of a Python integer. Each
+player owns one occupancy plane and the number of circles is stored in three
+count planes (bit 0, 1 and 2 of the count), so a wave of "explosions" is a handful
+of shifts, masks and bitwise additions. On the classic 9x6 board every plane fits
+into one machine word.
+"""
+
+
+from __future__ import annotations
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from chainreaction.topology import board_tables
+
+
+def _add4(a: int, b: int, c: int, d: int) -> Tuple[int, int, int]:
+    """Adds four one-bit planes.
+
+    Returns:
+        Bit 0, 1 and 2 of the sum.
+    """
+    sum_ab, carry_ab = a ^ b, a & b
+    sum_cd, carry_cd = c ^ d, c & d
+    carry = sum_ab & sum_cd
+    return (sum_ab ^ sum_cd, carry_ab ^ carry_cd ^ carry,
+            (carry_ab & carry_cd) | (carry & (carry_ab ^ carry_cd)))
+
+
+def _add3(x: Tuple[int, int, int], y: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """Adds two three-bit planes (the sum must stay below "8")."""
+    bit0 = x[0] ^ y[0]
+    carry = x[0] & y[0]
+    bit1 = x[1] ^ y[1] ^ carry
+    carry = (x[1] & y[1]) | (carry & (x[1] ^ y[1]))
+    return bit0, bit1, x[2] ^ y[2] ^ carry
+
+
+def _sub3(x: Tuple[int, int, int], y: Tuple[int, int, int], full: int) -> Tuple[int, int, int]:
+    """Substracts three-bit plane "y" from "x" (the difference must not be negative)."""
+    bit0 = x[0] ^ y[0]
+    borrow = (full ^ x[0]) & y[0]
+    bit1 = x[1] ^ y[1] ^ borrow
+    borrow = ((full ^ x[1]) & y[1]) | ((full ^ (x[1] ^ y[1])) & borrow)
+    return bit0, bit1, x[2] ^ y[2] ^ borrow
+
+
+def bits_to_cells(bits: int) -> List[int]:
+    """Returns the flat indices of all set bits of "bits" in ascending order."""
+    cells = []
+    while bits:
+        low = bits & -bits
+        cells.append(low.bit_length() - 1)
+        bits ^= low
+    return cells
+
+
+class Bitboard():
+    """Game state of a rectangular board packed into integer bitboards."""
+    def __init__(self, player_num: int, width_num: int, height_num: int) -> None:
+        """Initializes an empty board.
+
+        Args:
+            player_num: Number of players.
+            width_num: Number of boxes in x-direction.
+            height_num: Number of boxes in y-direction.
+        """
+        self.player_num = int(player_num)
+        self.width_num = int(width_num)
+        self.height_num = int(height_num)
+        self.cell_num = self.width_num * self.height_num
+        self.full = (1 << self.cell_num) - 1
+        left = sum(1 << (row * self.width_num) for row in range(self.height_num))
+        self._not_left = self.full ^ left
+        self._not_right = self.full ^ (left << (self.width_num - 1))
+        critical_mass = board_tables(self.height_num, self.width_num).critical_mass
+        self._critical = {num: self.mask(critical_mass == num) for num in (2, 3, 4)}
+        self.owned = [0] * self.player_num
+        self.planes = (0, 0, 0)
+        self.alive = [True] * self.player_num
+        self.winner = None
+
+    def mask(self, cells: np.ndarray) -> int:
+        """Packs a boolean array with one entry per position into an integer."""
+        packed = np.packbits(np.asarray(cells, dtype=bool).reshape(-1), bitorder="little")
+        return int.from_bytes(packed.tobytes(), "little")
+
+    def unmask(self, bits: int) -> np.ndarray:
+        """Unpacks an integer into a boolean array with one entry per position."""
+        packed = np.frombuffer(bits.to_bytes((self.cell_num + 7) // 8, "little"), dtype=np.uint8)
+        return np.unpackbits(packed, bitorder="little")[:self.cell_num].astype(bool)
+
+    def load(self, owner: np.ndarray, count: np.ndarray) -> None:
+        """Replaces the board by the state given as "owner" and "count" arrays (see "Gamecalc").
+
+        Args:
+            owner: "Player_number" owning a position, "-1" if empty.
+            count: Number of circles at a position, must be smaller than "8".
+        """
+        owner = np.asarray(owner).reshape(-1)
+        count = np.asarray(count).reshape(-1)
+        if count.max(initial=0) >= 8:
+            raise ValueError("Bitboard can only store up to 7 circles per position")
+        self.owned = [self.mask(owner == num) for num in range(self.player_num)]
+        self.planes = tuple(self.mask((count >> bit) & 1) for bit in range(3))
+
+    def store(self, owner: np.ndarray, count: np.ndarray) -> None:
+        """Writes the board into "owner" and "count" arrays (see "Gamecalc").
+
+        Args:
+            owner: Is set to the "player_number" owning a position, "-1" if empty.
+            count: Is set to the number of circles at a position.
+        """
+        owner = owner.reshape(-1)
+        count = count.reshape(-1)
+        owner[:] = -1
+        for num, owned in enumerate(self.owned):
+            owner[self.unmask(owned)] = num
+        count[:] = sum(self.unmask(plane).astype(np.uint8) << bit
+                       for bit, plane in enumerate(self.planes))
+
+    def copy(self) -> Bitboard:
+        """Returns an independent copy of the board."""
+        board = Bitboard.__new__(Bitboard)
+        board.__dict__.update(self.__dict__)
+        board.owned = list(self.owned)
+        board.alive = list(self.alive)
+        return board
+
+    def get_pos(self, cell: int) -> Tuple[int, int]:
+        """Returns the number of circles and the owner ("-1" if empty) of a position."""
+        cell = int(cell)
+        value = sum(((plane >> cell) & 1) << bit for bit, plane in enumerate(self.planes))
+        for num, owned in enumerate(self.owned):
+            if (owned >> cell) & 1:
+                return value, num
+        return value, -1
+
+    def valid_moves(self, player: int) -> int:
+        """Returns the positions "player" is allowed to play as bitboard."""
+        occupied = self.planes[0] | self.planes[1] | self.planes[2]
+        return self.owned[player] | (self.full ^ occupied)
+
+    def totals(self) -> List[int]:
+        """Returns the number of circles of every player."""
+        return [sum(bin(plane & owned).count("1") << bit
+                    for bit, plane in enumerate(self.planes))
+                for owned in self.owned]
+
+    def _check_elimination(self) -> List[int]:
+        """Eliminates players without circles like "Gamecalc.get_alive" and returns the alive ones."""
+        for num, owned in enumerate(self.owned):
+            if not owned:
+                self.alive[num] = False
+        return [num for num in range(self.player_num) if self.alive[num]]
+
+    def _neighbors(self, exploding: int) -> Tuple[int, int, int]:
+        """Returns the circles recieved from the "exploding" positions as three-bit planes."""
+        return _add4((exploding << self.width_num) & self.full,
+                     exploding >> self.width_num,
+                     (exploding & self._not_right) << 1,
+                     (exploding & self._not_left) >> 1)
+
+    def waves(self, player: int, cells: List[int], nums: List[int]) -> Iterator[Tuple[int, int]]:
+        """Adds circles of "player" and resolves the "chain reaction" wave by wave.
+
+        Follows the rules of "Gamecalc", including eliminations and the "winner".
+
+        Args:
+            player: "Player_number" of current player.
+            cells: Flat indices of the positions recieving circles.
+            nums: Number of circles added to the corresponding position.
+
+        Yields:
+            Bitboards of the positions changed by every wave, of the positions which
+            recieved circles and of the positions which "explode" with the next wave
+            ("0" for the last wave).
+        """
+        incoming = [0, 0, 0]
+        for cell, num in zip(cells, nums):
+            added = tuple(((num >> bit) & 1) << cell for bit in range(3))
+            incoming = list(_add3(incoming, added))
+        incoming = tuple(incoming)
+        critical = self._critical
+        exploded = False
+        last_planes = self.planes
+        last_owned = list(self.owned)
+        while True:
+            recieved = incoming[0] | incoming[1] | incoming[2]
+            not_recieved = self.full ^ recieved
+            for num in range(self.player_num):
+                self.owned[num] &= not_recieved
+            self.owned[player] |= recieved
+            count = _add3(self.planes, incoming)
+            self.planes = count
+
+            at_least_2 = count[1] | count[2]
+            at_least_3 = count[2] | (count[1] & count[0])
+            overloaded = recieved & ((critical[2] & at_least_2) | (critical[3] & at_least_3)
+                                     | (critical[4] & count[2]))
+            stop = (not overloaded) or (len(self._check_elimination()) == 1)
+            if stop and exploded:
+                alive = self._check_elimination()
+                if len(alive) == 1:
+                    self.winner = alive[0]
+
+            changed = 0
+            for plane, last_plane in zip(self.planes, last_planes):
+                changed |= plane ^ last_plane
+            for owned, last in zip(self.owned, last_owned):
+                changed |= owned ^ last
+            yield changed, recieved, 0 if stop else overloaded
+            if stop:
+                return
+
+            # changes of the explosions are reported with the next wave
+            last_planes = self.planes
+            last_owned = list(self.owned)
+            substract = (overloaded & critical[3], overloaded & (critical[2] | critical[3]),
+                         overloaded & critical[4])
+            self.planes = _sub3(self.planes, substract, self.full)
+            empty = self.full ^ (self.planes[0] | self.planes[1] | self.planes[2])
+            self.owned[player] &= self.full ^ (overloaded & empty)
+            exploded = True
+            incoming = self._neighbors(overloaded)
+
+    def play(self, player: int, cell: int) -> int:
+        """Places one circle of "player" at "cell" and resolves the "chain reaction".
+
+        Returns:
+            Number of waves.
+        """
+        waves = 0
+        for _ in self.waves(player, [cell], [1]):
+            waves += 1
+        return waves
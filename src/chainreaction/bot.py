@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the "Bot" class, a computer player based on "Gamecalc".
+
+The bot runs an iterative deepening alpha-beta search within a time budget per
+move. With more than two players every opponent is assumed to play against the
+bot ("paranoid" search). Moves are played and taken back on a private "Gamecalc"
+with "apply_move" and "undo", so no game state is copied while searching.
+Evaluated game states are kept in a "TranspositionTable" which is reused by the
+following moves.
+"""
+
+
+from __future__ import annotations
+from typing import List, Tuple
+import time
+
+import numpy as np
+
+from chainreaction.game_rules import Gamecalc
+from chainreaction.topology import BoardTables
+from chainreaction.zobrist import TranspositionTable, EXACT, LOWER, UPPER
+
+
+WIN = 1_000_000.0
+# values beyond this are won (lost) games, far above any evaluation of circles
+WIN_BOUND = WIN / 2
+CRITICAL_WEIGHT = 0.5
+
+
+def _value_to_table(value: float, ply: int) -> float:
+    """Converts a value of the search to the value stored in the "TranspositionTable".
+
+    Won (lost) games are worth less the more moves they are away from the root of the
+    search (see "Bot._evaluate"). In the table they are stored by their distance to
+    the game state itself, so an entry is valid at every "ply" and in later searches.
+
+    Args:
+        value: Value relative to the root of the search.
+        ply: Number of moves since the root of the search.
+    """
+    if value >= WIN_BOUND:
+        return value + ply
+    if value <= -WIN_BOUND:
+        return value - ply
+    return value
+
+
+def _value_from_table(value: float, ply: int) -> float:
+    """Converts a value of the "TranspositionTable" back to a value of the search.
+
+    Args:
+        value: Value relative to the game state, see "_value_to_table".
+        ply: Number of moves since the root of the search.
+    """
+    if value >= WIN_BOUND:
+        return value - ply
+    if value <= -WIN_BOUND:
+        return value + ply
+    return value
+
+
+class _Timeout(Exception):
+    """Raised when the time budget of a move is used up."""
+
+
+class Bot():
+    """Computer player for one "player_number"."""
+    def __init__(self, player: int, player_num: int, width_num: int, height_num: int,
+                 time_budget: float = 1.0, max_depth: int = 12, table_size: int = 2**16,
+                 engine: str = "numpy", tables: BoardTables | None = None) -> None:
+        """Initializes the instance.
+
+        Args:
+            player: "Player_number" the bot plays for.
+            player_num: Number of players.
+            width_num: Number of boxes in x-direction.
+            height_num: Number of boxes in y-direction.
+            time_budget: Time in s the search of a move may take. Defaults to 1.0.
+            max_depth: Maximum search depth in moves. Defaults to 12.
+            table_size: Number of entries of the "TranspositionTable". Defaults to 2**16.
+            engine: Engine of the private "Gamecalc". Defaults to "numpy".
+            tables: Topology of the board (neighbors, critical masses and blocked
+              positions), see "board_tables". Defaults to a rectangular board.
+        """
+        self.player = int(player)
+        self.time_budget = time_budget
+        self.max_depth = int(max_depth)
+        self.game = Gamecalc(player_num, width_num, height_num, 0, None, None, None,
+                             engine=engine, undo_limit=self.max_depth + 1, tables=tables)
+        self.table = TranspositionTable(table_size)
+        self.nodes = 0
+        self.depth = 0
+        self._deadline = 0.0
+
+    def choose_move(self, game: Gamecalc) -> Tuple[int, int]:
+        """Searches the best move of the bot in the current state of "game".
+
+        "game" itself is not changed.
+
+        Args:
+            game: Game in which the bot is the current player.
+
+        Returns:
+            Position (row, column) to play.
+        """
+        self.game.load_state(game)
+        if self.game.player_to_move() != self.player:
+            raise ValueError(f"Player {self.player} is not the current player")
+        self.nodes = 0
+        self.depth = 0
+        self._deadline = time.monotonic() + self.time_budget
+        best_move = int(self._order_moves(self.player, -1)[0])
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value, move = self._search(depth, 0, -np.inf, np.inf)
+            except _Timeout:
+                break
+            best_move = move
+            self.depth = depth
+            if abs(value) >= WIN - self.max_depth:
+                break  # result is decided
+        return divmod(best_move, self.game.width_num)
+
+    def _tick(self) -> None:
+        """Counts a searched node and stops the search if the time budget is used up."""
+        self.nodes += 1
+        if (self.nodes % 64 == 0) and (time.monotonic() > self._deadline):
+            raise _Timeout()
+
+    def _order_moves(self, player: int, first: int) -> List[int]:
+        """Returns the valid moves of "player", the most promising first.
+
+        Moves on own critical positions (one circle short of "exploding") come first,
+        then positions with a small critical mass (corners and edges).
+
+        Args:
+            player: "Player_number" of the player.
+            first: Move to put in front (e.g. from the "TranspositionTable") or "-1".
+        """
+        game = self.game
+        cells = game.valid_moves(player)
+        max_num = game.tables.critical_mass[cells].astype(int)
+        critical = game.count.reshape(-1)[cells] == max_num - 1
+        score = 4 * critical - max_num
+        moves = cells[np.argsort(-score, kind="stable")].tolist()
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def _evaluate(self, ply: int) -> float:
+        """Returns the value of the game state for the bot.
+
+        Won (lost) games are worth "WIN" ("-WIN"), earlier wins are preferred. Otherwise
+        the circles of the bot are compared to those of all opponents, with a bonus
+        for critical positions.
+
+        Args:
+            ply: Number of moves since the root of the search.
+        """
+        game = self.game
+        if game.winner is not None:
+            return WIN - ply if game.winner == self.player else -WIN + ply
+        if not game.player_alive[self.player]:
+            return -WIN + ply
+        own = game.totals[self.player]
+        owner = game.owner.reshape(-1)
+        critical = game.count.reshape(-1) == game.tables.critical_mass - 1
+        own_critical = np.count_nonzero(critical & (owner == self.player))
+        other_critical = np.count_nonzero(critical & (owner >= 0)) - own_critical
+        return float(2 * own - game.totals.sum()
+                     + CRITICAL_WEIGHT * (own_critical - other_critical))
+
+    def _search(self, depth: int, ply: int, alpha: float, beta: float) -> Tuple[float, int]:
+        """Alpha-beta search of the current game state.
+
+        Args:
+            depth: Remaining search depth in moves.
+            ply: Number of moves since the root of the search.
+            alpha: Value the bot is already guaranteed.
+            beta: Value the opponents are already guaranteed.
+
+        Returns:
+            Value of the game state and the best move (flat index, "-1" at leaves).
+        """
+        self._tick()
+        game = self.game
+        if (game.winner is not None) or (depth == 0):
+            return self._evaluate(ply), -1
+        key = game.get_hash()
+        entry = self.table.get(key)
+        first = -1
+        if entry is not None:
+            first = entry.move
+            if (entry.depth >= depth) and (ply > 0):
+                value = _value_from_table(entry.value, ply)
+                if entry.flag == EXACT:
+                    return value, entry.move
+                if entry.flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, entry.move
+
+        player = game.player_to_move()
+        maximize = player == self.player
+        alpha_orig, beta_orig = alpha, beta
+        best_value = -np.inf if maximize else np.inf
+        best_move = -1
+        for move in self._order_moves(player, first):
+            game.apply_move(divmod(move, game.width_num))
+            try:
+                value, _ = self._search(depth - 1, ply + 1, alpha, beta)
+            finally:
+                game.undo(None)
+            if maximize and (value > best_value):
+                best_value, best_move = value, move
+                alpha = max(alpha, value)
+            elif (not maximize) and (value < best_value):
+                best_value, best_move = value, move
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, depth, _value_to_table(best_value, ply), best_move, flag)
+        return best_value, best_move
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the "ChunkedArray" class, a board array which only stores occupied tiles.
+
+The board is split into square tiles of "tile_size" x "tile_size" positions. A tile
+is allocated when the first position in it gets a value other than the "fill" value
+and is freed again when all its positions are back to "fill". On very large boards
+the memory therefore grows with the occupied area instead of the board area.
+"""
+
+
+from __future__ import annotations
+from typing import Dict, Iterator, Tuple, Any
+
+import numpy as np
+
+
+class ChunkedArray():
+    """Two dimensional board array stored in lazily allocated tiles.
+
+    Supports the subset of the "np.ndarray" interface used by "Gamecalc": indexing
+    with (row, column), indexing with arrays of flat indices ("row * width_num +
+    column"), "reshape(-1)" (returns the array itself, which is indexed with flat
+    indices) and "[:]" to replace the whole board.
+    """
+    def __init__(self, shape: Tuple[int, int], dtype: Any, fill: int = 0,
+                 tile_size: int = 32) -> None:
+        """Initializes a board with every position set to "fill".
+
+        Args:
+            shape: Number of boxes in y- and x-direction.
+            dtype: Data type of the values.
+            fill: Value of the positions which are not stored. Defaults to "0".
+            tile_size: Edge length of the tiles. Defaults to "32".
+        """
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.size = self.shape[0] * self.shape[1]
+        self.dtype = np.dtype(dtype)
+        self.fill = self.dtype.type(fill)
+        self.tile_size = int(tile_size)
+        self._tile_columns = -(-self.shape[1] // self.tile_size)
+        self._tiles: Dict[int, np.ndarray] = {}
+
+    @property
+    def tile_num(self) -> int:
+        """Number of allocated tiles."""
+        return len(self._tiles)
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes used by the allocated tiles."""
+        return sum(tile.nbytes for tile in self._tiles.values())
+
+    def reshape(self, *shape: int) -> ChunkedArray:
+        """Returns the array itself for "reshape(-1)", it accepts flat indices anyway."""
+        if shape not in ((-1,), ((-1,),), (self.size,), ((self.size,),)):
+            raise ValueError("ChunkedArray can only be reshaped to one dimension")
+        return self
+
+    def _locate(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the tile and the offset within the tile of flat indices."""
+        rows, columns = np.divmod(cells, self.shape[1])
+        tiles = (rows // self.tile_size) * self._tile_columns + columns // self.tile_size
+        offsets = (rows % self.tile_size) * self.tile_size + columns % self.tile_size
+        return tiles, offsets
+
+    def _segments(self, cells: np.ndarray) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """Groups flat indices by tile.
+
+        Yields:
+            Tile, positions within "cells" and offsets within the tile.
+        """
+        tiles, offsets = self._locate(cells)
+        order = np.argsort(tiles, kind="stable")
+        starts = np.flatnonzero(np.diff(tiles[order], prepend=-1))
+        for start, stop in zip(starts, np.append(starts[1:], order.size)):
+            selected = order[start:stop]
+            yield int(tiles[selected[0]]), selected, offsets[selected]
+
+    def _new_tile(self) -> np.ndarray:
+        return np.full(self.tile_size * self.tile_size, self.fill, dtype=self.dtype)
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, tuple):
+            return self[np.array([key[0] * self.shape[1] + key[1]])][0]
+        cells = np.asarray(key, dtype=np.intp).reshape(-1)
+        values = np.full(cells.size, self.fill, dtype=self.dtype)
+        for tile, selected, offsets in self._segments(cells):
+            stored = self._tiles.get(tile)
+            if stored is not None:
+                values[selected] = stored[offsets]
+        return values
+
+    def __setitem__(self, key: Any, values: Any) -> None:
+        if isinstance(key, slice) and (key == slice(None)):
+            self._assign(np.broadcast_to(np.asarray(values, dtype=self.dtype), self.shape))
+            return
+        if isinstance(key, tuple):
+            key = np.array([key[0] * self.shape[1] + key[1]])
+        cells = np.asarray(key, dtype=np.intp).reshape(-1)
+        values = np.broadcast_to(np.asarray(values, dtype=self.dtype), cells.shape)
+        for tile, selected, offsets in self._segments(cells):
+            stored = self._tiles.get(tile)
+            if stored is None:
+                if np.all(values[selected] == self.fill):
+                    continue
+                stored = self._tiles[tile] = self._new_tile()
+            stored[offsets] = values[selected]
+            if np.all(stored == self.fill):
+                del self._tiles[tile]
+
+    def _assign(self, board: np.ndarray) -> None:
+        """Replaces the whole board by the dense array "board"."""
+        self._tiles = {}
+        cells = np.flatnonzero(board.reshape(-1) != self.fill)
+        self[cells] = board.reshape(-1)[cells]
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        board = self.to_dense()
+        return board if dtype is None else board.astype(dtype)
+
+    def to_dense(self) -> np.ndarray:
+        """Returns the board as dense array."""
+        board = np.full(self.size, self.fill, dtype=self.dtype)
+        cells = self.stored()
+        board[cells] = self[cells]
+        return board.reshape(self.shape)
+
+    def stored(self) -> np.ndarray:
+        """Returns the flat indices of all positions not set to "fill" in ascending order."""
+        cells = []
+        for tile, stored in self._tiles.items():
+            offsets = np.flatnonzero(stored != self.fill)
+            tile_row, tile_column = divmod(tile, self._tile_columns)
+            rows = tile_row * self.tile_size + offsets // self.tile_size
+            columns = tile_column * self.tile_size + offsets % self.tile_size
+            cells.append(rows * self.shape[1] + columns)
+        if not cells:
+            return np.zeros(0, dtype=np.intp)
+        return np.sort(np.concatenate(cells)).astype(np.intp)
+
+    def copy(self) -> ChunkedArray:
+        """Returns an independent copy of the board."""
+        array = ChunkedArray(self.shape, self.dtype, self.fill, self.tile_size)
+        array._tiles = {tile: stored.copy() for tile, stored in self._tiles.items()}
+        return array
@@ -9,7 +9,7 @@ visualtisation of the game, the user inputs and the communication with the serve
 
 
 from __future__ import annotations
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple
 import sys
 import time
 import select
@@ -24,10 +24,13 @@ from chainreaction.game import Gameboard
 from chainreaction.client_gui import client_gui, client_quit_gui, client_gui_restart
 from chainreaction.configfile import load_config_c
 from chainreaction.loggingsetup import setup_logging, formatted_traceback
+from chainreaction.timeline import TimeSeries
+from chainreaction.topology import board_tables
+from chainreaction import protocol
 
 
 def _game_loop(logger: logging.Logger, session_uuid: str, client_uuid: str, network: Network_c,
-               config: Dict[str, Any], handshake_infos: Dict[str, Any]) -> Tuple[int, Dict[int, List[List[int]]]] | None:
+               config: Dict[str, Any], handshake_infos: Dict[str, Any]) -> Tuple[int, TimeSeries] | None:
     """Starts a game.
 
     Communicates to the server via sockets. Visualizes the game and gathers user inputs
@@ -43,18 +46,20 @@ def _game_loop(logger: logging.Logger, session_uuid: str, client_uuid: str, netw
         handshake_infos: Conatins infos from the handshake.
 
     Returns
-        finish_message: Contains the "player_number" of the winner and a dictionary
-          with the information about the game evolution ("time line").
+        finish_message: Contains the "player_number" of the winner and the downsampled
+          information about the game evolution ("time line").
           Is None if not recieved.
     """
     finish_message = None
-    player_pos = {}
-    for num in range(handshake_infos["player_num"]):
-        player_pos[num] = np.zeros((handshake_infos["height"], handshake_infos["width"]), dtype=int)
+    shape = (handshake_infos["height"], handshake_infos["width"])
+    tables = board_tables(*shape, handshake_infos.get("topology", "rect"),
+                          tuple(tuple(pos) for pos in handshake_infos.get("blocked", [])))
+    board = (np.full(shape, -1, dtype=int), np.zeros(shape, dtype=int))
+    board_seq = None  # sequence number of the last "keyframe"/"delta", None if unknown
     gameboard = Gameboard(config["box_min_size"], config["box_line_width"],
                           handshake_infos["player_num"], config["board_color"],
                           handshake_infos["width"], handshake_infos["height"],
-                          config["player_colors"])
+                          config["player_colors"], tables)
 
     clock = pygame.time.Clock()
     round_num = 0
@@ -70,63 +75,88 @@ def _game_loop(logger: logging.Logger, session_uuid: str, client_uuid: str, netw
         readable, writable, errored = select.select(connection, connection,
                                                     connection, 0.5)
 
-        if readable:
-            msg = network.recieve()
-            if msg[0] == "positions":
-
-                player_pos = msg[1]
-                logger.debug("Recieved player positions",
-                             extra={"client_uuid": client_uuid,
-                                    "session_uuid": session_uuid,
-                                    "player_pos": player_pos})
-            elif msg[0] == "next player":
-                player_turn_num, round_num = msg[1]
-                logger.debug("Recieved next player",
-                             extra={"client_uuid": client_uuid,
-                                    "session_uuid": session_uuid,
-                                    "player_turn_num": player_turn_num,
-                                    "round_num": round_num})
-
-            elif msg[0] == "your number":
-                your_number = msg[1]
-                logger.debug("Recieved own number",
-                             extra={"client_uuid": client_uuid,
-                                    "session_uuid": session_uuid,
-                                    "your_number": your_number})
-                pygame.display.set_caption(f"{handshake_infos['nicknames'][your_number]}")
+        if readable or network.has_pending():
+            for msg in network.recieve():
+                if msg[0] == "board":
+                    board = msg[1]
+                    logger.debug("Recieved board",
+                                 extra={"client_uuid": client_uuid,
+                                        "session_uuid": session_uuid,
+                                        "board": board})
+                elif msg[0] == "keyframe":
+                    board_seq = msg[1][0]
+                    board = (np.array(msg[1][1]), np.array(msg[1][2]))
+                    logger.debug("Recieved keyframe",
+                                 extra={"client_uuid": client_uuid,
+                                        "session_uuid": session_uuid,
+                                        "board_seq": board_seq,
+                                        "board": board})
+                elif msg[0] == "delta":
+                    if (board_seq is not None) and (msg[1][0] == board_seq + 1):
+                        board_seq = msg[1][0]
+                        protocol.apply_delta(board, *msg[1][1:])
+                        logger.debug("Recieved delta",
+                                     extra={"client_uuid": client_uuid,
+                                            "session_uuid": session_uuid,
+                                            "board_seq": board_seq,
+                                            "cells": msg[1][1]})
+                    else:
+                        # a board is missing, wait for the next keyframe
+                        board_seq = None
+                        logger.warning("Recieved delta out of order",
+                                       extra={"client_uuid": client_uuid,
+                                              "session_uuid": session_uuid,
+                                              "board_seq": msg[1][0]})
+                elif msg[0] == "next player":
+                    player_turn_num, round_num = msg[1]
+                    logger.debug("Recieved next player",
+                                 extra={"client_uuid": client_uuid,
+                                        "session_uuid": session_uuid,
+                                        "player_turn_num": player_turn_num,
+                                        "round_num": round_num})
 
-            elif msg[0] == "spectator":
-                logger.debug("Recieved spectator",
-                             extra={"client_uuid": client_uuid,
-                                    "session_uuid": session_uuid})
-                pygame.display.set_caption("Spectator")
+                elif msg[0] == "your number":
+                    your_number = msg[1]
+                    logger.debug("Recieved own number",
+                                 extra={"client_uuid": client_uuid,
+                                        "session_uuid": session_uuid,
+                                        "your_number": your_number})
+                    pygame.display.set_caption(f"{handshake_infos['nicknames'][your_number]}")
 
-            elif msg[0] == "finished":
-                run = False
-                network.close()
-                logger.debug("Recieved finished",
-                             extra={"client_uuid": client_uuid,
-                                    "session_uuid": session_uuid,
-                                    "winner": msg[1][0],
-                                    "time_line": msg[1][1]})
-                print(f"winner: {handshake_infos['nicknames'][msg[1][0]]}")
-                finish_message = msg[1]
-                break
+                elif msg[0] == "spectator":
+                    logger.debug("Recieved spectator",
+                                 extra={"client_uuid": client_uuid,
+                                        "session_uuid": session_uuid})
+                    pygame.display.set_caption("Spectator")
 
-            elif msg[0] == None:
-                logger.info("Connection closed by server!",
-                             extra={"client_uuid": client_uuid,
-                                    "session_uuid": session_uuid})
-                run = False
-                network.close()
+                elif msg[0] == "finished":
+                    run = False
+                    network.close()
+                    logger.debug("Recieved finished",
+                                 extra={"client_uuid": client_uuid,
+                                        "session_uuid": session_uuid,
+                                        "winner": msg[1][0],
+                                        "time_line": msg[1][1].to_lists()})
+                    print(f"winner: {handshake_infos['nicknames'][msg[1][0]]}")
+                    finish_message = msg[1]
+                    break
+
+                elif msg[0] == None:
+                    logger.info("Connection closed by server!",
+                                 extra={"client_uuid": client_uuid,
+                                        "session_uuid": session_uuid})
+                    run = False
+                    network.close()
+                    break
+
+                else:
+                    logger.warning("Recieved unknown msg",
+                                   extra={"client_uuid": client_uuid,
+                                          "session_uuid": session_uuid,
+                                          "recieved": msg})
+            if not run:
                 break
 
-            else:
-                logger.warning("Recieved unknown msg",
-                               extra={"client_uuid": client_uuid,
-                                      "session_uuid": session_uuid,
-                                      "recieved": msg})
-
         if errored:
             run = False
             network.close()
@@ -135,7 +165,7 @@ def _game_loop(logger: logging.Logger, session_uuid: str, client_uuid: str, netw
                                 "session_uuid": session_uuid})
             sys.exit()
 
-        gameboard.update_window(player_pos, player_turn_num,
+        gameboard.update_window(board, player_turn_num,
                                 handshake_infos["nicknames"], round_num)
 
         for event in pygame.event.get():
@@ -149,7 +179,7 @@ def _game_loop(logger: logging.Logger, session_uuid: str, client_uuid: str, netw
                                  extra={"client_uuid": client_uuid,
                                         "session_uuid": session_uuid})
             if event.type == pygame.VIDEORESIZE:
-                gameboard.rescale_window(event.w, event.h, player_pos, player_turn_num,
+                gameboard.rescale_window(event.w, event.h, board, player_turn_num,
                                          handshake_infos["nicknames"], round_num)
                 logger.debug("Resized", extra={"client_uuid": client_uuid,
                                                "session_uuid": session_uuid,
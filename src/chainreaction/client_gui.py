@@ -17,6 +17,8 @@ import matplotlib.ticker as ticker
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
+from chainreaction.timeline import TimeSeries
+
 
 class client_gui():
     """Main client gui used for initial session start."""
@@ -236,36 +238,28 @@ class client_gui_restart():
         """Toggles "be_player" between "player" and "spectator" depending on checkbox."""
         self.be_player = not self.be_player
 
-    def make_plots(self, fig: Figure, time_line: Dict[int, List[List[int]]],
+    def make_plots(self, fig: Figure, time_line: TimeSeries,
                    player_colors: List[Tuple[int, int, int]],
                    player_num: int, nicknames: Dict[int, str]) -> None:
         """Creates the plots to show the game evolution ("time line").
 
         Args:
             fig: Figure to add the plots to.
-            time_line: Information about the game evolution ("time line").
+            time_line: Information about the game evolution ("time line"), downsampled
+              by the server.
             player_colors: Colors for the players.
             player_num: Number of players.
             nicknames: Connects "player_number" to the respective player nicknames.
         """
-        x_list = []
+        x_list = time_line.x
         y_lists = {}
         y_lists1 = {}
+        stacked = np.cumsum(time_line.totals, axis=1)
         for num in range(player_num):
-            y_lists[num] = []
-            y_lists1[num] = []
-
-        round_num = 0
-        for round_num, round_counts in time_line.items():
-            step = 1/len(round_counts)
-            for step_num, step_counts in enumerate(round_counts):
-                x_list.append(round_num + step * step_num)
-                y = 0
-                for num, player_count in enumerate(step_counts):
-                    y_lists[num].append(player_count)
-                    y += player_count
-                    y_lists1[num].append(y)
+            y_lists[num] = time_line.totals[:, num]
+            y_lists1[num] = stacked[:, num]
 
+        round_num = int(x_list[-1]) if len(x_list) else 0
         major_tick, minor_tick = self.get_spacing(round_num + 1)
         axs1 = fig.add_subplot(2, 1, 1)
         axs1.xaxis.set_major_locator(ticker.MultipleLocator(major_tick))
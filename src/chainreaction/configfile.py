@@ -13,6 +13,10 @@ import ast
 
 import pygame
 
+from chainreaction.topology import TOPOLOGIES
+from chainreaction.game_rules import ENGINES, STORAGES
+from chainreaction.network import SLOW_CLIENT_POLICIES
+
 
 DEFAULTS = {"info": "Changes in '[DEFAULT]' will be ignored. Changes should be done in '[CLIENT]' and/or '[SERVER]'.",
             "client.fps_limit": "60",
@@ -27,6 +31,13 @@ DEFAULTS = {"info": "Changes in '[DEFAULT]' will be ignored. Changes should be d
             "client.port": "5555",
             "client.be_player": "True",
             "server.reaction_time_step": "0.5",
+            "server.undo_limit": "20",
+            "server.engine": "numpy",
+            "server.storage": "dense",
+            "server.topology": "rect",
+            "server.blocked": "[]",
+            "server.send_queue_limit": "4194304",
+            "server.slow_client": "drop",
             "server.player_number": "'None' -> 'user input'",
             "server.gameboard_height": "'None' -> 'user input'",
             "server.gameboard_width": "'None' -> 'user input'",
@@ -46,6 +57,13 @@ CLIENT = {"fps_limit": "60",
           "be_player": "True"}
 
 SERVER = {"reaction_time_step": "0.5",
+          "undo_limit": "20",
+          "engine": "numpy",
+          "storage": "dense",
+          "topology": "rect",
+          "blocked": "[]",
+          "send_queue_limit": "4194304",
+          "slow_client": "drop",
           "player_number": "None",
           "gameboard_height": "None",
           "gameboard_width": "None",
@@ -168,4 +186,32 @@ def load_config_s() -> Dict[str, Any]:
     if config_dict["ip"] is not None:
         socket.inet_pton(socket.AF_INET, config_dict["ip"])  # tests for valid ip4
     config_dict["reaction_time_step"] = float(get_config(config, DEFAULTS, "SERVER", "reaction_time_step"))
+    config_dict["undo_limit"] = int(get_config(config, DEFAULTS, "SERVER", "undo_limit"))
+    if config_dict["undo_limit"] < 0:
+        raise ValueError("undo_limit must not be negative")
+    config_dict["topology"] = get_config(config, DEFAULTS, "SERVER", "topology")
+    if config_dict["topology"] not in TOPOLOGIES:
+        raise ValueError(f"topology must be one of {TOPOLOGIES}")
+    config_dict["blocked"] = [tuple(pos) for pos in
+                              ast.literal_eval(get_config(config, DEFAULTS, "SERVER", "blocked"))]
+    for pos in config_dict["blocked"]:
+        if (len(pos) != 2) or not all(isinstance(num, int) and (num >= 0) for num in pos):
+            raise ValueError("blocked must be a list of (row, column) with non-negative integers")
+    config_dict["engine"] = get_config(config, DEFAULTS, "SERVER", "engine")
+    if config_dict["engine"] not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}")
+    if (config_dict["engine"] == "bitboard") and ((config_dict["topology"] != "rect")
+                                                  or config_dict["blocked"]):
+        raise ValueError("engine 'bitboard' requires topology 'rect' without blocked cells")
+    config_dict["storage"] = get_config(config, DEFAULTS, "SERVER", "storage")
+    if config_dict["storage"] not in STORAGES:
+        raise ValueError(f"storage must be one of {STORAGES}")
+    if (config_dict["storage"] == "chunked") and (config_dict["engine"] != "numpy"):
+        raise ValueError("storage 'chunked' requires engine 'numpy'")
+    config_dict["send_queue_limit"] = int(get_config(config, DEFAULTS, "SERVER", "send_queue_limit"))
+    if config_dict["send_queue_limit"] <= 0:
+        raise ValueError("send_queue_limit must be positive")
+    config_dict["slow_client"] = get_config(config, DEFAULTS, "SERVER", "slow_client")
+    if config_dict["slow_client"] not in SLOW_CLIENT_POLICIES:
+        raise ValueError(f"slow_client must be one of {SLOW_CLIENT_POLICIES}")
     return config_dict
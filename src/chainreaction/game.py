@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-"""Contains the "Gameboard" class for the client module to visualize the gameboard."""
+"""Contains the "Gameboard" class for the client module to visualize the gameboard.
+
+The board is drawn from the same "BoardTables" the server calculates with: blocked
+positions are filled and on "hex" boards every odd row is shifted by half a box.
+"""
 
 
 from __future__ import annotations
@@ -10,12 +14,15 @@ from typing import List, Tuple, Dict
 import numpy as np
 import pygame
 
+from chainreaction.topology import BoardTables, board_tables
+
 
 class Gameboard():
     """Visualizes gameboard."""
     def __init__(self, min_box_size: int, line_width: int, player_num: int,
                  board_color: Tuple[int, int, int], width_num: int,
-                 height_num: int, player_colors: List[Tuple[int, int, int]]) -> None:
+                 height_num: int, player_colors: List[Tuple[int, int, int]],
+                 tables: BoardTables | None = None) -> None:
         """Initializes the instance.
 
         Args:
@@ -26,6 +33,8 @@ class Gameboard():
             width_num: Number of boxes in x-direction.
             height_num: Number of boxes in y-direction.
             player_colors: Colors for the players.
+            tables: Topology of the board, see "board_tables". Defaults to a rectangular
+              board.
         """
         self.inside = int(min_box_size)        # min size of box inside
         self.line_width = int(line_width)      # width of box seperator
@@ -34,8 +43,13 @@ class Gameboard():
         self.width_num = int(width_num)
         self.height_num = int(height_num)
         self.player_colors = player_colors
+        if tables is None:
+            tables = board_tables(self.height_num, self.width_num)
+        self.tables = tables
+        self.hex = tables.topology == "hex"
         self._calc_min_inside()
-        self.width_min_grid = width_num * self.inside + width_num * self.line_width
+        self.width_min_grid = (width_num * self.inside + width_num * self.line_width
+                               + self._row_shift(1, self.inside))
         self.height_min_grid = height_num * self.inside + (height_num-1) * self.line_width
         self.curr_grid_height = self.height_min_grid
         self.curr_grid_width = self.width_min_grid
@@ -56,6 +70,14 @@ class Gameboard():
         if self.inside < box_height:
             self.inside = box_height
 
+    def _row_shift(self, row: int, box_size: int | None = None) -> int:
+        """Returns the shift of a row in x-direction in pixel (half a box for odd "hex" rows)."""
+        if not (self.hex and (row % 2 == 1)):
+            return 0
+        if box_size is None:
+            box_size = self.box_size
+        return (box_size + self.line_width) // 2
+
     def _create_window(self) -> pygame.surface.Surface:
         """Creates the pygame window.
 
@@ -86,7 +108,10 @@ class Gameboard():
             height: New height in pixel.
         """
         box_width_tot = width - self.width_num * self.line_width
-        box_width = box_width_tot // self.width_num
+        if self.hex:
+            box_width = int((box_width_tot - self.line_width / 2) // (self.width_num + 0.5))
+        else:
+            box_width = box_width_tot // self.width_num
         box_height_tot = height - (self.height_num-1) * self.line_width
         box_height = box_height_tot // self.height_num
 
@@ -106,7 +131,8 @@ class Gameboard():
             board_width: New board width in pixel.
             board_height: New board height in pixel.
         """
-        board_width = self.width_num * self.box_size + self.width_num * self.line_width
+        board_width = (self.width_num * self.box_size + self.width_num * self.line_width
+                       + self._row_shift(1))
         board_height = self.height_num * self.box_size + (self.height_num-1) * self.line_width
         return board_width, board_height
 
@@ -129,6 +155,19 @@ class Gameboard():
             y_pos = num * self.box_size + (num-1) * self.line_width
             h_lines.append((0, y_pos, board_width, self.line_width))
         self.h_lines = h_lines
+        if self.hex:
+            # vertical lines are split into one piece per (shifted) row
+            mesh = []
+            for row in range(self.height_num):
+                y_top = row * (self.box_size + self.line_width)
+                shift = self._row_shift(row)
+                if shift:
+                    mesh.append((shift - self.line_width, y_top, self.line_width, self.box_size))
+                for line in v_lines:
+                    mesh.append((line[0] + shift, y_top, self.line_width, self.box_size))
+            self._mesh = mesh + h_lines
+        else:
+            self._mesh = v_lines + h_lines
 
     def _draw_mesh(self, color: Tuple[int, int, int]) -> None:
         """Drawes the grid onto the window.
@@ -136,20 +175,19 @@ class Gameboard():
         Args:
             color: Color of the current player for the grid lines.
         """
-        lines = self.v_lines + self.h_lines
-        for line in lines:
+        for line in self._mesh:
             pygame.draw.rect(self.window, color, line)
 
     def rescale_window(self, new_width: int, new_height: int,
-                       player_pos: Dict[int, np.ndarray], player_turn_num: int,
+                       board: Tuple[np.ndarray, np.ndarray], player_turn_num: int,
                        nicknames: Dict[int, str], round_num: int) -> None:
         """Rescales the window.
 
         Args:
             new_width: New board width in pixel.
             new_height: New board height in pixel.
-            player_pos: Contains the number and locations of circles corresponding
-              to the "player_numbers".
+            board: "Owner" ("player_number" or "-1" if empty) and number of circles
+              of every position.
             player_turn_num: "Player_number" of current player.
             nicknames: Connects "player_number" to the respective player nicknames.
             round_num: Number of the current round.
@@ -174,71 +212,83 @@ class Gameboard():
                                               pygame.RESIZABLE)
         self.window.fill(self.board_color)
         self._meshing(board_width, board_height)
-        self.update_window(player_pos, player_turn_num, nicknames, round_num)
+        self.update_window(board, player_turn_num, nicknames, round_num)
 
-    def update_window(self, player_pos: Dict[int, np.ndarray], player_turn_num: int,
+    def update_window(self, board: Tuple[np.ndarray, np.ndarray], player_turn_num: int,
                       nicknames: Dict[int, str], round_num: int) -> None:
         """Updates the window.
 
         Args:
-            player_pos: Contains the number and locations of circles corresponding
-              to the "player_numbers".
+            board: "Owner" ("player_number" or "-1" if empty) and number of circles
+              of every position.
             player_turn_num: "Player_number" of current player.
             nicknames: Connects "player_number" to the respective player nicknames.
             round_num: Number of the current round.
         """
+        owner, count = board
+        occupied = owner >= 0
+        totals = np.bincount(owner[occupied], weights=count[occupied],
+                             minlength=self.player_num).astype(int)
         self.window.fill(self.board_color)
-        for num in range(self.player_num):
-            player_board = player_pos[num]
-            self._draw_circle(player_board, self._get_player_color(num))
+        self._draw_blocked()
+        self._draw_circle(board)
         self._draw_mesh(self._get_player_color(player_turn_num))
-        self._write_infos(player_pos, nicknames, round_num,
+        self._write_infos(int(totals.sum()), nicknames, round_num,
                           nicknames[player_turn_num])
-        self._draw_bar(player_pos, nicknames)
+        self._draw_bar(totals, nicknames)
 
-    def _draw_circle(self, player_pos: Dict[int, np.ndarray],
-                     player_color: Tuple[int, int, int]) -> None:
+    def _draw_circle(self, board: Tuple[np.ndarray, np.ndarray]) -> None:
         """Draw cirles on gameboard.
 
+        Only the occupied positions are visited, in the color of their "owner".
+
         Args:
-            player_pos: Contains the number and locations of circles corresponding
-              to the "player_numbers".
-            player_color: Color of the circles of the player currently drawn to the window.
+            board: "Owner" ("player_number" or "-1" if empty) and number of circles
+              of every position.
         """
         circle_radius = self.box_size // 4
-
-        for num_r, row in enumerate(player_pos):
-            for num_c, column, in enumerate(row):
-                # pos of bottom right corner of box
-                x_pos = self.v_lines[num_c][0]
-                y_pos = self.h_lines[num_r][1]
-                if column == 0:
-                    continue
-                # upper left hand corner
-                if column >= 1:
-                    center = (x_pos - (3*circle_radius), y_pos -
-                              (3*circle_radius))
-                    pygame.draw.circle(self.window, player_color, center,
-                                       circle_radius)
-                # upper right hand corner
-                if column >= 2:
-                    center = (x_pos - (1*circle_radius), y_pos -
-                              (3*circle_radius))
-                    pygame.draw.circle(self.window, player_color, center,
-                                       circle_radius)
-                # lower right hand corner
-                if column >= 3:
-                    center = (x_pos - (1*circle_radius), y_pos -
-                              (1*circle_radius))
-                    pygame.draw.circle(self.window, player_color, center,
-                                       circle_radius)
-
-                # lower left hand corner
-                if column >= 4:
-                    center = (x_pos - (3*circle_radius), y_pos -
-                              (1*circle_radius))
-                    pygame.draw.circle(self.window, player_color, center,
-                                       circle_radius)
+        owner, count = board
+
+        for num_r, num_c in zip(*np.nonzero(count)):
+            column = count[num_r, num_c]
+            player_color = self._get_player_color(int(owner[num_r, num_c]))
+            # pos of bottom right corner of box
+            x_pos = self.v_lines[num_c][0] + self._row_shift(num_r)
+            y_pos = self.h_lines[num_r][1]
+            # upper left hand corner
+            if column >= 1:
+                center = (x_pos - (3*circle_radius), y_pos -
+                          (3*circle_radius))
+                pygame.draw.circle(self.window, player_color, center,
+                                   circle_radius)
+            # upper right hand corner
+            if column >= 2:
+                center = (x_pos - (1*circle_radius), y_pos -
+                          (3*circle_radius))
+                pygame.draw.circle(self.window, player_color, center,
+                                   circle_radius)
+            # lower right hand corner
+            if column >= 3:
+                center = (x_pos - (1*circle_radius), y_pos -
+                          (1*circle_radius))
+                pygame.draw.circle(self.window, player_color, center,
+                                   circle_radius)
+
+            # lower left hand corner
+            if column >= 4:
+                center = (x_pos - (3*circle_radius), y_pos -
+                          (1*circle_radius))
+                pygame.draw.circle(self.window, player_color, center,
+                                   circle_radius)
+
+    def _draw_blocked(self) -> None:
+        """Fills the blocked positions ("holes") of the board."""
+        for cell in np.flatnonzero(self.tables.blocked):
+            num_r, num_c = divmod(int(cell), self.width_num)
+            x_pos = self.v_lines[num_c][0] + self._row_shift(num_r)
+            y_pos = self.h_lines[num_r][1]
+            rect = (x_pos - self.box_size, y_pos - self.box_size, self.box_size, self.box_size)
+            pygame.draw.rect(self.window, (64, 64, 64), rect)
 
     def _get_player_color(self, player_num: int) -> Tuple[int, int, int]:
         """Returns the color of the player requested.
@@ -254,18 +304,14 @@ class Gameboard():
             return (0, 0, 0)
         return self.player_colors[player_num % color_len]
 
-    def _draw_bar(self, player_pos: Dict[int, np.ndarray],
-                  nicknames: Dict[int, str]) -> None:
+    def _draw_bar(self, totals: np.ndarray, nicknames: Dict[int, str]) -> None:
         """Draws the current ratio of player circles as bar diagramm.
 
         Args:
-            player_pos: Contains the number and locations of circles corresponding
-              to the "player_numbers".
+            totals: Number of circles of every player.
             nicknames: Connects "player_number" to the respective player nicknames.
         """
-        total_count = 0
-        for value in player_pos.values():
-            total_count += np.sum(value)
+        total_count = int(totals.sum())
 
         if total_count != 0:
             height_per_sphere = self.curr_grid_height / total_count
@@ -273,8 +319,7 @@ class Gameboard():
             height_per_sphere = 0
 
         last_height = 0
-        for key, item in player_pos.items():
-            count = np.sum(item)
+        for key, count in enumerate(totals.tolist()):
             color = self._get_player_color(key)
             # left, top, width, height
             curr_height = round(height_per_sphere * count)
@@ -291,14 +336,13 @@ class Gameboard():
                                                   - text_surface.get_height()/2)))
             last_height += curr_height
 
-    def _write_infos(self, player_pos: Dict[int, np.ndarray],
+    def _write_infos(self, total_count: int,
                      nicknames: Dict[int, str], round_num: int,
                      next_pl: str) -> None:
         """Draws infos and undo-button to window.
 
         Args:
-            player_pos: Contains the number and locations of circles corresponding
-              to the "player_numbers".
+            total_count: Number of circles on the board.
             nicknames: Connects "player_number" to the respective player nicknames.
             round_num: Current round number.
             next_pl (str): Name of the player to take turn.
@@ -308,9 +352,6 @@ class Gameboard():
         h_pos = 10
         text_surface = font.render('Total:', False, (255, 255, 255))
         self.window.blit(text_surface, (self.curr_grid_width + text_indent, h_pos))
-        total_count = 0
-        for value in player_pos.values():
-            total_count += np.sum(value)
         h_pos += 34
         text_surface = font.render(f'{total_count}', False, (255, 255, 255))
         self.window.blit(text_surface, (self.curr_grid_width + text_indent, h_pos))
@@ -359,6 +400,8 @@ class Gameboard():
             if mouse_y <= self.h_lines[num_r][1]:
                 row = num_r
                 break
+        if row is not None:
+            mouse_x -= self._row_shift(row)
         for num_c in range(self.width_num):
             if mouse_x <= self.v_lines[num_c][0]:
                 column = num_c
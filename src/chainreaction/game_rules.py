@@ -5,32 +5,122 @@
 
 
 from __future__ import annotations
-from typing import List, Tuple
-import time
-import copy
+from typing import Dict, Hashable, Iterable, Iterator, List, NamedTuple, Tuple
+import bisect
+import collections
+import functools
 import logging
+import operator
 import socket
 
 import numpy as np
 
 from chainreaction.network import Network_s
+from chainreaction.bitboard import Bitboard, bits_to_cells
+from chainreaction.chunked import ChunkedArray
+from chainreaction.timeline import TimeLine
+from chainreaction.tiles import TileSpreader
+from chainreaction.topology import WAVES_PER_SIDE, BoardTables, board_tables
+from chainreaction.zobrist import zobrist_keys
+
+
+ENGINES = ("numpy", "classic", "bitboard", "tiled")
+STORAGES = ("dense", "chunked")
+# share of the positions "exploding" in one wave at which the classic engine hands
+# the rest of the "chain reaction" to the whole-array waves of the "numpy" engine
+DENSE_SHARE = 1 / 16
+
+
+class WaveEvent(NamedTuple):
+    """Describes the game state after one wave of a "chain reaction".
+
+    Attributes:
+        wave: Number of the wave within the move, starting at "0".
+        changed: Flat indices ("row * width_num + column") of the positions whose
+          circles or "owner" changed with this wave.
+        totals: Number of circles of every player after the wave.
+        alive: "Player_numbers" of the players which are still alive.
+        winner: "Player_number" of the winner or None if the game goes on.
+    """
+    wave: int
+    changed: np.ndarray
+    totals: np.ndarray
+    alive: Tuple[int, ...]
+    winner: int | None
+
+
+class UndoEntry(NamedTuple):
+    """Journal of one undo step, see "Gamecalc.set_state_for_undo".
+
+    Attributes:
+        round_num: Round number when the step was started or None.
+        counter: "Counter" when the step was started.
+        alive: "Player_numbers" of the players alive when the step was started.
+        winner: "Winner" when the step was started.
+        cells: Flat indices of the positions changed by the step (net change, positions
+          which got their old values back are not included).
+        owner: "Owner" of the positions when the step was started.
+        count: Number of circles at the positions when the step was started.
+        board: Occupancy and count planes of the "Bitboard" when the step was started
+          ("bitboard" engine only, its changes are not journaled) or None.
+    """
+    round_num: int | None
+    counter: int
+    alive: Tuple[int, ...]
+    winner: int | None
+    cells: np.ndarray
+    owner: np.ndarray
+    count: np.ndarray
+    board: Tuple[Tuple[int, ...], Tuple[int, int, int]] | None = None
 
 
 class Gamecalc():
     """Calculates the game."""
     def __init__(self, player_num: int, width_num: int, height_num: int, reaction_time_step: float,
-                 network: Network_s, logger: logging.Logger | None, session_uuid: str) -> None:
+                 network: Network_s, logger: logging.Logger | None, session_uuid: str,
+                 engine: str = "numpy", undo_limit: int = 20, max_waves: int | None = None,
+                 max_frames: int = 64, storage: str = "dense",
+                 tables: BoardTables | None = None, workers: int | None = None) -> None:
         """Initializes the instance.
 
         Args:
             player_num: Number of players.
             width_num: Number of boxes in x-direction.
             height_num: Number of boxes in y-direction.
-            reaction_time_step: Time in s between each reaction step.
+            reaction_time_step: Time in s between each reaction step, used for pacing
+              the waves returned by "update_player".
             network: Main class for dealing with sending and recieving of data via sockets.
             logger: Logs the progress and state of the game/function or None for testing.
             session_uuid: Differentiates different games sessions in log-files.
+            engine: Engine used to resolve the "chain reactions". "numpy" resolves every
+              wave with whole-array operations, "classic" resolves them cell by cell and
+              "bitboard" uses integer bitboards (see "Bitboard"), which is fastest on
+              small boards. "tiled" works like "numpy" but spreads the circles of large
+              waves tile by tile on a thread pool (see "TileSpreader"), for huge boards.
+              Defaults to "numpy".
+            undo_limit: Maximum number of moves which can be undone, older steps are
+              dropped. Defaults to 20.
+            max_waves: Hard limit of waves per "chain reaction", see "_cascade_runaway".
+              Defaults to "WAVES_PER_SIDE" times "height_num + width_num".
+            max_frames: Maximum number of positions returned by "update_player" per move,
+              longer "chain reactions" skip to their final positions. Defaults to 64.
+            storage: "dense" stores "owner" and "count" as arrays, "chunked" as
+              "ChunkedArray" which only allocates occupied tiles, for very large boards.
+              "chunked" requires the "numpy" engine. Defaults to "dense".
+            tables: Topology of the board (neighbors, critical masses and blocked
+              positions), see "board_tables". Defaults to a rectangular board.
+              Other topologies do not work with the "bitboard" engine.
+            workers: Number of threads of the "tiled" engine, defaults to the number
+              of cores.
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        if storage not in STORAGES:
+            raise ValueError(f"Unknown storage {storage!r}, expected one of {STORAGES}")
+        if (storage == "chunked") and (engine != "numpy"):
+            raise ValueError(f"Storage {storage!r} requires the 'numpy' engine")
+        self.engine = engine
+        self.storage = storage
         self.player_num = int(player_num)
         self.width_num = int(width_num)
         self.height_num = int(height_num)
@@ -38,79 +128,788 @@ class Gamecalc():
         self.network = network
         self.logger = logger
         self.session_uuid = session_uuid
+        if tables is None:
+            tables = board_tables(self.height_num, self.width_num)
+        if tables.critical_mass.size != self.height_num * self.width_num:
+            raise ValueError("Board tables do not match the board size")
+        if (engine == "bitboard") and not tables.is_plain:
+            raise ValueError("The 'bitboard' engine requires a rectangular board "
+                             "without blocked positions")
+        self.tables = tables
+        self.zobrist = zobrist_keys(self.height_num, self.width_num, self.player_num)
+        if max_waves is None:
+            max_waves = WAVES_PER_SIDE * (self.height_num + self.width_num)
+        self.max_waves = max(1, int(max_waves))
+        self.max_frames = max(1, int(max_frames))
+        self._bitboard = None
+        self._arrays_stale = False  # the "Bitboard" is ahead of "owner" and "count"
+        if self.engine == "bitboard":
+            self._bitboard = Bitboard(self.player_num, self.width_num, self.height_num)
+        if self.engine == "classic":
+            self._create_scratch_boards()
+        self._tiles = None
+        if self.engine == "tiled":
+            self._tiles = TileSpreader(self.tables, self.height_num, self.width_num, workers)
         self._counter = 0
+        self._journal = collections.deque(maxlen=int(undo_limit))
+        self._move_changes = []  # changes of the current move, see "_journal_move"
         self._create_boards()
         self.winner = None
-        self.time_line = {}
+        self.time_line = TimeLine(self.player_num)
 
     def _create_boards(self) -> None:
-        """Initializes the boards/arrays and variables needed for the game calculations."""
-        self.player_pos = {}
-        self.substract_board = {}
-        self.player_alive = {}
+        """Initializes the boards/arrays and variables needed for the game calculations.
+
+        The game state is stored in two small arrays instead of one board per player:
+        "owner" contains the "player_number" owning a position ("-1" if empty) and
+        "count" the number of circles at that position.
+
+        The number of circles of every player ("totals"), the alive players and the
+        Zobrist hash of the board are updated from the changed positions only, so
+        they can be queried without looking at the whole board.
+        """
+        owner_dtype = np.int8 if self.player_num <= np.iinfo(np.int8).max else np.int16
+        shape = (self.height_num, self.width_num)
+        if self.storage == "chunked":
+            self._owner = ChunkedArray(shape, owner_dtype, fill=-1)
+            self._count = ChunkedArray(shape, np.uint8, fill=0)
+        else:
+            self._owner = np.full(shape, -1, dtype=owner_dtype)
+            self._count = np.zeros(shape, dtype=np.uint8)
+        self._set_alive(range(self.player_num))
+        self.totals = np.zeros(self.player_num, dtype=int)
+        self._empty = set(range(self.player_num))  # players without circles
+        self._hash = 0
+        if self._bitboard is not None:
+            self._load_bitboard()
+
+    @property
+    def owner(self) -> np.ndarray | ChunkedArray:
+        """"Player_number" owning every position, "-1" if empty."""
+        if self._arrays_stale:
+            self._store_bitboard()
+        return self._owner
+
+    @property
+    def count(self) -> np.ndarray | ChunkedArray:
+        """Number of circles at every position."""
+        if self._arrays_stale:
+            self._store_bitboard()
+        return self._count
+
+    @property
+    def _board_hash(self) -> int:
+        """Zobrist hash of the positions, without the player to move (see "get_hash")."""
+        if self._arrays_stale:
+            self._store_bitboard()
+        return self._hash
+
+    @_board_hash.setter
+    def _board_hash(self, board_hash: int) -> None:
+        self._hash = board_hash
+
+    def _load_bitboard(self) -> None:
+        """Replaces the "Bitboard" by "owner" and "count", used after they were written."""
+        self._arrays_stale = False
+        self._bitboard.load(self._owner, self._count)
+        self._stored_board = (tuple(self._bitboard.owned), self._bitboard.planes)
+
+    def _store_bitboard(self) -> None:
+        """Writes the "Bitboard" into "owner" and "count" and updates the hash.
+
+        The "bitboard" engine keeps the game state in its "Bitboard" across moves,
+        "owner", "count" and the hash are only brought up to date when they are read.
+        Only the positions which differ from the last call are hashed.
+        """
+        self._arrays_stale = False
+        board = self._bitboard
+        last_owned, last_planes = self._stored_board
+        changed = 0
+        for plane, last_plane in zip(board.planes, last_planes):
+            changed |= plane ^ last_plane
+        for owned, last in zip(board.owned, last_owned):
+            changed |= owned ^ last
+        self._stored_board = (tuple(board.owned), board.planes)
+        if not changed:
+            return
+        cells = np.array(bits_to_cells(changed), dtype=np.intp)
+        owner = self._owner.reshape(-1)
+        count = self._count.reshape(-1)
+        last_owner = owner[cells]
+        last_count = count[cells]
+        board.store(self._owner, self._count)
+        self._hash ^= (self.zobrist.cells_hash(cells, last_owner, last_count)
+                       ^ self.zobrist.cells_hash(cells, owner[cells], count[cells]))
+
+    def _set_bitboard_totals(self) -> None:
+        """Sets "totals" and the players without circles from the "Bitboard"."""
+        totals = self._bitboard.totals()
+        self.totals = np.array(totals, dtype=int)
+        self._empty = {num for num, total in enumerate(totals) if total == 0}
+
+    @property
+    def player_pos(self) -> Dict[int, np.ndarray]:
+        """Number and locations of circles corresponding to the "player_numbers".
+
+        Compatibility view of "owner" and "count" with one board per player, as used
+        by the clients. Assigning such a dictionary replaces the game state and clears
+        the undo history.
+        """
+        owner = np.asarray(self.owner)
+        count = np.asarray(self.count)
+        player_pos = {}
         for num in range(self.player_num):
-            self.player_pos[num] = np.zeros((self.height_num, self.width_num), dtype=int)
-            self.substract_board[num] = np.zeros((self.height_num, self.width_num), dtype=int)
-            self.player_alive[num] = True
-        self.chain_board = np.zeros((self.height_num, self.width_num), dtype=int)
-        self.last_player_pos = self.player_pos
-        self.last_player_alive = self.player_alive
-        self._last_counter = self._counter
+            player_pos[num] = np.where(owner == num, count, 0).astype(np.uint8)
+        return player_pos
+
+    @player_pos.setter
+    def player_pos(self, player_pos: Dict[int, np.ndarray]) -> None:
+        self._load_player_pos(player_pos)
+        self._recount()
+        self.clear_undo()
+
+    def board_frame(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns copies of the dense "owner" and "count" arrays.
+
+        Unlike "player_pos" the size does not grow with the number of players, so
+        these are send to the clients (message "board").
+        """
+        return np.array(self.owner), np.array(self.count)
+
+    def _load_player_pos(self, player_pos: Dict[int, np.ndarray]) -> None:
+        """Writes "player_pos" into "owner" and "count" without updating "totals" or the hash."""
+        owner = np.full((self.height_num, self.width_num), -1, dtype=self.owner.dtype)
+        count = np.zeros((self.height_num, self.width_num), dtype=self.count.dtype)
+        for num, board in player_pos.items():
+            occupied = np.asarray(board) != 0
+            owner[occupied] = num
+            count[occupied] = np.asarray(board)[occupied]
+        self._owner[:] = owner
+        self._count[:] = count
+        if self._bitboard is not None:
+            self._load_bitboard()
+
+    def _occupied(self) -> np.ndarray:
+        """Returns the flat indices of all positions with circles."""
+        if self.storage == "chunked":
+            return self.owner.stored()
+        return np.flatnonzero(self.owner.reshape(-1) >= 0)
+
+    def _recount(self) -> None:
+        """Recounts "totals" and the hash from the whole board, used after the state was replaced."""
+        cells = self._occupied()
+        owner = self.owner.reshape(-1)[cells]
+        count = self.count.reshape(-1)[cells]
+        totals = np.bincount(owner, weights=count, minlength=self.player_num)
+        self.totals = totals.astype(int)
+        self._empty = set(np.flatnonzero(self.totals == 0).tolist())
+        self._board_hash = self.zobrist.cells_hash(cells, owner, count)
+
+    def _update_cells(self, cells: np.ndarray, last_owner: np.ndarray,
+                      last_count: np.ndarray, record: bool = True) -> None:
+        """Updates "totals" and the hash after some positions changed.
+
+        Args:
+            cells: Flat indices of the changed positions.
+            last_owner: "Owner" of the positions before the change.
+            last_count: Number of circles at the positions before the change.
+            record: Wether the change is added to the current undo step. Defaults to True.
+        """
+        if record:
+            self._record_cells(cells, last_owner, last_count)
+        owner = self.owner.reshape(-1)[cells]
+        count = self.count.reshape(-1)[cells]
+        occupied = last_owner >= 0
+        np.subtract.at(self.totals, last_owner[occupied], last_count[occupied].astype(int))
+        occupied = owner >= 0
+        np.add.at(self.totals, owner[occupied], count[occupied].astype(int))
+        self._board_hash ^= (self.zobrist.cells_hash(cells, last_owner, last_count)
+                             ^ self.zobrist.cells_hash(cells, owner, count))
+        for num in np.unique(np.concatenate((last_owner, owner))).tolist():
+            if num < 0:
+                continue
+            if self.totals[num] == 0:
+                self._empty.add(num)
+            else:
+                self._empty.discard(num)
+
+    def _record_cells(self, cells: np.ndarray, last_owner: np.ndarray,
+                      last_count: np.ndarray) -> None:
+        """Adds changed positions with their previous values to the current move."""
+        if self._journal:
+            self._move_changes.append((cells, last_owner, last_count))
+
+    def _journal_move(self) -> None:
+        """Merges the changes of the current move into the net change of the undo step.
+
+        Only the positions which differ from their value when the step was started are
+        kept, so the undo step does not grow with the number of waves.
+        """
+        changes, self._move_changes = self._move_changes, []
+        if not (changes and self._journal):
+            return
+        entry = self._journal[-1]
+        # the first journaled value of a position is its value before the step
+        cells, first = np.unique(np.concatenate([entry.cells] + [item[0] for item in changes]),
+                                 return_index=True)
+        owner = np.concatenate([entry.owner] + [item[1] for item in changes])[first]
+        count = np.concatenate([entry.count] + [item[2] for item in changes])[first]
+        differs = ((self.owner.reshape(-1)[cells] != owner)
+                   | (self.count.reshape(-1)[cells] != count))
+        self._journal[-1] = entry._replace(cells=cells[differs], owner=owner[differs],
+                                           count=count[differs])
+
+    def get_hash(self) -> int:
+        """Returns the Zobrist hash of the game state (positions and player to move).
+
+        Equal game states of games with the same board shape and number of players
+        have the same hash, see "zobrist_keys".
+        """
+        player = self.player_to_move()
+        if player is None:
+            return self._board_hash
+        return self._board_hash ^ int(self.zobrist.turn[player])
 
     def update_player(self, player: int, pos_l: List[Tuple[int, int]],
                       num_l: List[int], connections: List[socket.socket] | None,
-                      round_num: int) -> None:
-        """Updates player positions and distributes those to the clients.
+                      round_num: int, as_board: bool = False
+                      ) -> List[Dict[int, np.ndarray] | Tuple[np.ndarray, np.ndarray]]:
+        """Updates player positions and returns the positions after every wave.
+
+        The waves are calculated without waiting, pacing them by "reaction_time_step"
+        is left to the caller (see "Network_s.schedule_broadcast"). "Chain reactions"
+        with more than "max_frames" waves are fast-forwarded: only the first positions
+        and the final positions are returned (and send), the "time_line" still gets
+        every wave.
 
         Args:
             player: "Player_number" of current player.
             pos_l: Positions to be updated with corresponding number of circles.
             num_l: Number of circles to be added to corresponding position.
-            connections: Sockets of connected clients or None for testing.
+            connections: Sockets of connected clients to immediately send every wave
+              to or None to only return the waves.
             round_num: Current round number.
+            as_board: Wether the positions are returned as "board_frame" instead of
+              "player_pos", used with many players. Clients always recieve the
+              "board_frame". Defaults to False.
+
+        Returns:
+            Player positions ("player_pos" or "board_frame") after every wave of the
+            "chain reaction".
         """
-        chain_reaction = []
-        for pos, num in zip(pos_l, num_l):
-            row, column = pos
-            self.player_pos[player][row][column] += num
-            max_num = 4
-            if (row == 0) or (row == self.height_num-1):
-                max_num -= 1
-            if (column == 0) or (column == self.width_num-1):
-                max_num -= 1
-            if self.player_pos[player][row][column] >= max_num:
-                self._update_chain_board(row, column)
-                chain_reaction.append((pos, max_num))
+        frames = []
+        wave_num = 0
+        for event in self._waves(player, pos_l, num_l):
+            self.time_line.append(round_num, event.wave, event.totals)
+            wave_num += 1
 
-        if self.time_line.get(round_num, None) is None:
-            self.time_line[round_num] = []
-        reaction_list = []
-        for num in range(self.player_num):
-            reaction_list.append(np.sum(self.player_pos[num]))
-        self.time_line[round_num].append(reaction_list)
+            if len(frames) < self.max_frames - 1:
+                self._add_frame(frames, connections, as_board)
+        if (not frames) or (wave_num > len(frames)):
+            self._add_frame(frames, connections, as_board)
+        return frames
+
+    def _add_frame(self, frames: List[Dict[int, np.ndarray] | Tuple[np.ndarray, np.ndarray]],
+                   connections: List[socket.socket] | None, as_board: bool = False) -> None:
+        """Adds the current positions to "frames" and sends them to "connections".
 
+        Clients always recieve the "board_frame", "as_board" only selects what is added
+        to "frames".
+        """
+        frame = self.board_frame() if as_board else self.player_pos
+        frames.append(frame)
         if connections is not None:
-            for connection in connections:
-                self.network.send(connection, ("positions", self.player_pos))
+            board = frame if as_board else self.board_frame()
+            self.network.send_board(connections, board)
             self.logger.debug("Send positions",
                               extra={"session_uuid": self.session_uuid,
-                                     "positions": self.player_pos})
-        if chain_reaction:
-            if len(self.get_alive()) == 1:
-                if self.logger is not None:
-                    self.logger.debug("Chain reaction stopped!",
-                                      extra={"session_uuid": self.session_uuid})
+                                     "positions": frame})
+
+    def play(self, player: int, pos: Tuple[int, int]) -> Iterator[WaveEvent]:
+        """Places a circle of "player" at "pos" and yields the resulting waves.
+
+        The waves are calculated lazily, the game state is updated while the events
+        are consumed and is only complete once the iterator is exhausted. Nothing is
+        send, logged or added to the "time_line".
+
+        Args:
+            player: "Player_number" of current player.
+            pos: Position (row, column) of the new circle.
+
+        Yields:
+            One "WaveEvent" for every wave of the "chain reaction".
+        """
+        return self._waves(player, [pos], [1])
+
+    def apply_move(self, pos: Tuple[int, int], round_num: int | None = None) -> int:
+        """Plays a circle of the current player at "pos" and moves on to the next player.
+
+        Starts an undo step first, so the move can be taken back with "undo" without
+        copying the game state. Nothing is send, logged or added to the "time_line",
+        which makes it the fast path for searches (see "Bot").
+
+        Args:
+            pos: Position (row, column) of the new circle.
+            round_num: Round number of the move, see "set_state_for_undo". Defaults to None.
+
+        Returns:
+            Number of waves of the "chain reaction".
+        """
+        self.set_state_for_undo(round_num)
+        waves = 0
+        for _ in self._waves(self.player_to_move(), [pos], [1]):
+            waves += 1
+        if self.winner is None:
+            self.increase_counter()
+        return waves
+
+    def valid_moves(self, player: int | None = None) -> np.ndarray:
+        """Returns the flat indices of the positions "player" is allowed to play.
+
+        Args:
+            player: "Player_number" of the player, defaults to the current player.
+        """
+        if player is None:
+            player = self.player_to_move()
+        if self._bitboard is not None:
+            # no blocked positions
+            return np.flatnonzero(self._bitboard.unmask(self._bitboard.valid_moves(player)))
+        valid = ~self.tables.blocked
+        cells = self._occupied()
+        valid[cells[self.owner.reshape(-1)[cells] != player]] = False
+        return np.flatnonzero(valid)
+
+    def load_state(self, game: Gamecalc) -> None:
+        """Replaces the game state by the state of "game" and clears the undo history.
+
+        Args:
+            game: Game with the same board (shape, topology and blocked positions)
+              and number of players.
+        """
+        if (game.tables is not self.tables) and not (
+                (game.tables.topology == self.tables.topology)
+                and np.array_equal(game.tables.blocked, self.tables.blocked)):
+            raise ValueError("Game has a different board topology or blocked positions")
+        self._owner[:] = np.asarray(game.owner)
+        self._count[:] = np.asarray(game.count)
+        if self._bitboard is not None:
+            self._load_bitboard()
+        self._set_alive(num for num, alive in game.player_alive.items() if alive)
+        self._counter = game._counter
+        self.winner = game.winner
+        self._recount()
+        self.clear_undo()
+
+    def _waves(self, player: int, pos_l: List[Tuple[int, int]],
+               num_l: List[int]) -> Iterator[WaveEvent]:
+        """Yields the waves of the selected engine.
+
+        After the last wave the changes of the move are added to the undo step (see
+        "_journal_move").
+
+        Args:
+            player: "Player_number" of current player.
+            pos_l: Positions to be updated with corresponding number of circles.
+            num_l: Number of circles to be added to corresponding position.
+
+        Yields:
+            One "WaveEvent" for every wave of the "chain reaction".
+        """
+        if self.engine == "classic":
+            waves = self._waves_classic(player, pos_l, num_l)
+        elif self.engine == "bitboard":
+            waves = self._waves_bitboard(player, pos_l, num_l)
+        elif self.engine == "tiled":
+            waves = self._waves_tiled(player, pos_l, num_l)
+        else:
+            waves = self._waves_numpy(player, pos_l, num_l)
+        try:
+            yield from waves
+        finally:
+            self._journal_move()
+
+    def _wave_event(self, wave: int, changed: np.ndarray) -> WaveEvent:
+        """Creates the "WaveEvent" of the current game state.
+
+        Args:
+            wave: Number of the wave within the move.
+            changed: Flat indices of the positions changed by the wave.
+
+        Returns:
+            Event describing the wave.
+        """
+        return WaveEvent(wave, changed, self.totals.copy(), tuple(self._turn_order),
+                         self.winner)
+
+    def _chain_reaction_stopped(self) -> bool:
+        """Returns wether the "chain reaction" has to stop because only one player is alive."""
+        if len(self.get_alive()) != 1:
+            return False
+        if self.logger is not None:
+            self.logger.debug("Chain reaction stopped!",
+                              extra={"session_uuid": self.session_uuid})
+        return True
+
+    def _cascade_runaway(self, wave: int, recieved: np.ndarray | int, seen: set,
+                         key: Hashable | None = None) -> bool:
+        """Returns wether a "chain reaction" has to be stopped because it would not end.
+
+        This is the case after "max_waves" waves or if the wave repeats an earlier
+        wave of the same "chain reaction" (same positions and recieving positions),
+        which would repeat forever. The outcome of both is the current game state.
+
+        Args:
+            wave: Number of the current wave.
+            recieved: Flat indices of the positions which recieved circles this wave.
+            seen: Keys of the earlier waves, updated in-place.
+            key: Key of the positions and "recieved". Defaults to None (the Zobrist
+              hash of both).
+        """
+        reason = None
+        if wave + 1 >= self.max_waves:
+            reason = "max_waves"
+        else:
+            if key is None:
+                key = self._board_hash ^ self.zobrist.cells_key(recieved)
+            if key in seen:
+                reason = "cycle"
+            seen.add(key)
+        if reason is None:
+            return False
+        if self.logger is not None:
+            self.logger.warning("Chain reaction stopped!",
+                                extra={"session_uuid": self.session_uuid,
+                                       "reason": reason, "wave": wave})
+        return True
+
+    def _waves_numpy(self, player: int, pos_l: List[Tuple[int, int]],
+                     num_l: List[int]) -> Iterator[WaveEvent]:
+        """Updates player positions wave by wave using array operations.
+
+        Every wave all positions which recieved circles are captured by "player" at the
+        same time (like the "substract_board" of the classic engine) by setting their
+        "owner", every overloaded position "explodes" at once and its circles are
+        handed to its neighbors taken from the precomputed "tables". Only the positions
+        recieving circles are read and written, so this also works on "ChunkedArray".
+
+        Args:
+            player: "Player_number" of current player.
+            pos_l: Positions to be updated with corresponding number of circles.
+            num_l: Number of circles to be added to corresponding position.
+
+        Yields:
+            One "WaveEvent" for every wave of the "chain reaction".
+        """
+        cells = np.array([row * self.width_num + column for row, column in pos_l], dtype=np.intp)
+        recieved, inverse = np.unique(cells, return_inverse=True)
+        incoming = np.bincount(inverse, weights=num_l).astype(int)
+        yield from self._numpy_waves(player, recieved, incoming, 0, set())
+
+    def _numpy_waves(self, player: int, recieved: np.ndarray | None, incoming: np.ndarray | None,
+                     wave: int, seen: set,
+                     overloaded: np.ndarray | None = None) -> Iterator[WaveEvent]:
+        """Calculates the waves of "_waves_numpy" starting with wave "wave".
+
+        Args:
+            player: "Player_number" of current player.
+            recieved: Sorted flat indices of the positions recieving circles in the first
+              wave, None if "overloaded" is given.
+            incoming: Number of circles added to the corresponding position of "recieved".
+            wave: Number of the first wave.
+            seen: Keys of the earlier waves, see "_cascade_runaway".
+            overloaded: Flat indices of the positions which "explode" before the first
+              wave, used to continue a "chain reaction" of another engine. Defaults to None.
+
+        Yields:
+            One "WaveEvent" for every wave of the "chain reaction".
+        """
+        max_num = self.tables.critical_mass
+        owner = self.owner.reshape(-1)
+        count = self.count.reshape(-1)
+
+        exploded = overloaded is not None
+        emptied = np.zeros(0, dtype=np.intp)
+        emptied_owner = owner[emptied]
+        emptied_count = count[emptied]
+        while True:
+            if overloaded is not None:
+                emptied = overloaded
+                emptied_owner = owner[emptied]
+                emptied_count = count[emptied]
+                rest = emptied_count - max_num[emptied]
+                count[emptied] = rest
+                owner[emptied[rest == 0]] = -1
+                recieved, incoming = np.unique(self.tables.neighbors(emptied), return_counts=True)
+
+            # positions changed since the last wave with their values at the last wave
+            touched = np.union1d(emptied, recieved)
+            last_owner = owner[touched]
+            last_count = count[touched]
+            emptied_pos = np.searchsorted(touched, emptied)
+            last_owner[emptied_pos] = emptied_owner
+            last_count[emptied_pos] = emptied_count
+
+            new_count = count[recieved] + incoming
+            owner[recieved] = player
+            count[recieved] = new_count
+            differs = (owner[touched] != last_owner) | (count[touched] != last_count)
+            changed = touched[differs]
+            self._update_cells(changed, last_owner[differs], last_count[differs])
+
+            overloaded = recieved[new_count >= max_num[recieved]]
+            stop = ((overloaded.size == 0) or self._chain_reaction_stopped()
+                    or self._cascade_runaway(wave, recieved, seen))
+            if stop and exploded:
+                alive = self.get_alive()
+                if len(alive) == 1:
+                    self.winner = alive[0]
+            yield self._wave_event(wave, changed)
+            if stop:
+                return
+            exploded = True
+            wave += 1
+
+    def _waves_tiled(self, player: int, pos_l: List[Tuple[int, int]],
+                     num_l: List[int]) -> Iterator[WaveEvent]:
+        """Updates player positions wave by wave tile by tile on a thread pool.
+
+        Works like "_waves_numpy", but the "explosions", the spreading and adding of
+        the circles and the changes of "totals" and the hash are calculated by
+        "TileSpreader" for every tile at the same time. Small waves are calculated as
+        one tile.
+
+        Args:
+            player: "Player_number" of current player.
+            pos_l: Positions to be updated with corresponding number of circles.
+            num_l: Number of circles to be added to corresponding position.
+
+        Yields:
+            One "WaveEvent" for every wave of the "chain reaction".
+        """
+        tiles = self._tiles
+        owner = self.owner.reshape(-1)
+        count = self.count.reshape(-1)
+        cells = np.array([row * self.width_num + column for row, column in pos_l], dtype=np.intp)
+        runs = [np.sort(np.repeat(cells, num_l))]
+        bounds = tiles.tile_bounds(0)
+        nothing = np.zeros(0, dtype=np.intp)
+        emptied = [(nothing, owner[nothing], count[nothing])] * (len(bounds) - 1)
+
+        exploded = False
+        seen = set()
+        wave = 0
+        while True:
+            steps = tiles.apply(owner, count, player, self.zobrist, runs, emptied, bounds)
+            changed = np.concatenate([step.changed for step in steps])
+            self._record_cells(changed, np.concatenate([step.last_owner for step in steps]),
+                               np.concatenate([step.last_count for step in steps]))
+            self.totals += sum(step.totals for step in steps)
+            self._board_hash ^= functools.reduce(operator.xor, [step.board_hash for step in steps])
+            self._empty = set(np.flatnonzero(self.totals == 0).tolist())
+
+            overloaded = np.concatenate([step.overloaded for step in steps])
+            key = self._board_hash ^ functools.reduce(operator.xor, [step.key for step in steps])
+            stop = ((overloaded.size == 0) or self._chain_reaction_stopped()
+                    or self._cascade_runaway(wave, None, seen, key))
+            if stop and exploded:
+                alive = self.get_alive()
+                if len(alive) == 1:
+                    self.winner = alive[0]
+            yield self._wave_event(wave, changed)
+            if stop:
+                return
+
+            bounds = tiles.tile_bounds(overloaded.size)
+            emptied, runs = tiles.explode(owner, count, overloaded, bounds)
+            exploded = True
+            wave += 1
+
+    def _waves_bitboard(self, player: int, pos_l: List[Tuple[int, int]],
+                        num_l: List[int]) -> Iterator[WaveEvent]:
+        """Updates player positions wave by wave using the integer "Bitboard".
+
+        The "Bitboard" is the game state of this engine and is kept across moves.
+        "Owner", "count" and the hash are only written when they are read (see
+        "_store_bitboard"), "totals" are counted on the "Bitboard".
+
+        Args:
+            player: "Player_number" of current player.
+            pos_l: Positions to be updated with corresponding number of circles.
+            num_l: Number of circles to be added to corresponding position.
+
+        Yields:
+            One "WaveEvent" for every wave of the "chain reaction".
+        """
+        board = self._bitboard
+        board.alive = [self.player_alive[num] for num in range(self.player_num)]
+        board.winner = self.winner
+        cells = [row * self.width_num + column for row, column in pos_l]
+        seen = set()
+        for wave, (changed, recieved, overloaded) in enumerate(board.waves(player, cells, num_l)):
+            self._arrays_stale = True
+            self._set_bitboard_totals()
+            for num in [num for num in self._alive if not board.alive[num]]:
+                self.set_eliminated(num)
+            self.winner = board.winner
+            # the "Bitboard" stops on its own unless the "chain reaction" runs away
+            runaway = (overloaded and (len(self._alive) != 1)
+                       and self._cascade_runaway(wave, recieved, seen,
+                                                 (tuple(board.owned), board.planes, recieved)))
+            yield self._wave_event(wave, np.array(bits_to_cells(changed), dtype=np.intp))
+            if runaway:
                 return
-            time.sleep(self.reaction_time_step)
-            for item in chain_reaction:
-                pos, max_num = item
-                row, column = pos
-                self.player_pos[player][row][column] -= max_num
+
+    def _create_scratch_boards(self) -> None:
+        """Initializes the "boards", "substract_board" and "chain_board" of the classic engine.
+
+        All of them are allocated once and reused by every move. The positions written
+        to them are remembered, so loading and clearing them only touches these positions.
+        """
+        shape = (self.height_num, self.width_num)
+        self.boards = {num: np.zeros(shape, dtype=np.int32) for num in range(self.player_num)}
+        self.substract_board = {num: np.zeros(shape, dtype=np.int32)
+                                for num in range(self.player_num)}
+        self.chain_board = np.zeros(shape, dtype=np.int32)
+        self._board_cells = set()
+        self._substract_cells = []
+        self._chain_cells = []
+
+    def _load_cell(self, row: int, column: int) -> None:
+        """Copies a position from "owner" and "count" to the "boards" of the classic engine.
+
+        Every position is only copied the first time it is used during a move, later
+        on the "boards" contain the newer value.
+
+        Args:
+            row: Row of the position.
+            column: Column of the position.
+        """
+        cell = row * self.width_num + column
+        if cell in self._board_cells:
+            return
+        self._board_cells.add(cell)
+        owner = int(self.owner[row, column])
+        if owner != -1:
+            self.boards[owner][row][column] = self.count[row, column]
+
+    def _clear_boards(self) -> None:
+        """Clears the positions of the "boards" of the classic engine used during a move."""
+        for cell in self._board_cells:
+            row, column = divmod(cell, self.width_num)
+            for board in self.boards.values():
+                board[row][column] = 0
+        self._board_cells = set()
+
+    def _waves_classic(self, player: int, pos_l: List[Tuple[int, int]],
+                       num_l: List[int]) -> Iterator[WaveEvent]:
+        """Updates player positions cell by cell.
+
+        The classic engine works on one board per player ("boards"). Only the positions
+        reached by the "chain reaction" are copied to them from "owner" and "count" and
+        cleared again after the move (see "_load_cell"). The waves are calculated in a loop
+        so long "chain reactions" do not depend on the recursion limit. Every wave
+        only visits the positions which recieved circles, "exploded" or were captured
+        (the frontier), so its cost does not depend on the size of the board.
+        Once more than "DENSE_SHARE" of the positions "explode" in one wave, the rest
+        of the "chain reaction" is calculated by "_numpy_waves", which is faster
+        for dense cascades.
+
+        Args:
+            player: "Player_number" of current player.
+            pos_l: Positions to be updated with corresponding number of circles.
+            num_l: Number of circles to be added to corresponding position.
+
+        Yields:
+            One "WaveEvent" for every wave of the "chain reaction".
+        """
+        owner = self.owner.reshape(-1)
+        count = self.count.reshape(-1)
+        dirty = {row * self.width_num + column for row, column in pos_l}
+        dense = DENSE_SHARE * self.tables.critical_mass.size
+
+        exploded = False
+        seen = set()
+        wave = 0
+        overloaded = None
+        try:
+            while True:
+                recieved = np.unique([row * self.width_num + column for row, column in pos_l])
+                cells = np.array(sorted(dirty), dtype=np.intp)
+                last_owner = owner[cells]
+                last_count = count[cells]
+                chain_reaction = self._classic_wave(player, pos_l, num_l, cells)
+                differs = (owner[cells] != last_owner) | (count[cells] != last_count)
+                changed = cells[differs]
+                self._update_cells(changed, last_owner[differs], last_count[differs])
+
+                stop = ((not chain_reaction) or self._chain_reaction_stopped()
+                        or self._cascade_runaway(wave, recieved, seen))
+                if stop and exploded:
+                    alive = self.get_alive()
+                    if len(alive) == 1:
+                        self.winner = alive[0]
+                yield self._wave_event(wave, changed)
+                if stop:
+                    break
+                if len(chain_reaction) > dense:
+                    # "owner" and "count" are up to date, the "numpy" waves go on from here
+                    overloaded = np.unique([row * self.width_num + column
+                                            for (row, column), _ in chain_reaction])
+                    break
+
+                dirty = set()
+                for item in chain_reaction:
+                    pos, max_num = item
+                    row, column = pos
+                    self.boards[player][row][column] -= max_num
+                    dirty.add(row * self.width_num + column)
+                dirty.update(self._clear_substract_board())
+                pos_l, num_l = self._clear_chain_board()
+                dirty.update(row * self.width_num + column for row, column in pos_l)
+                exploded = True
+                wave += 1
+        finally:
+            # leaves the scratch boards empty for the next move
             self._clear_substract_board()
-            self._clear_chain_board(player, connections, round_num)
-            alive = self.get_alive()
-            if len(alive) == 1:
-                self.winner = alive[0]
+            self._clear_chain_board()
+            self._clear_boards()
+        if overloaded is not None:
+            yield from self._numpy_waves(player, None, None, wave + 1, seen, overloaded)
+
+    def _classic_wave(self, player: int, pos_l: List[Tuple[int, int]],
+                      num_l: List[int], cells: np.ndarray) -> List[Tuple[Tuple[int, int], int]]:
+        """Adds the circles of one wave of the classic engine.
+
+        Args:
+            player: "Player_number" of current player.
+            pos_l: Positions to be updated with corresponding number of circles.
+            num_l: Number of circles to be added to corresponding position.
+            cells: Flat indices of all positions changed in "boards" since the last wave,
+              these are written to "owner" and "count".
+
+        Returns:
+            Overloaded positions with their critical mass ("max_num"), which "explode"
+            in the next wave.
+        """
+        chain_reaction = []
+        for pos, num in zip(pos_l, num_l):
+            row, column = pos
+            self._load_cell(row, column)
+            self.boards[player][row][column] += num
+            max_num = self.tables.critical_mass[row * self.width_num + column]
+            if self.boards[player][row][column] >= max_num:
+                self._update_chain_board(row, column)
+                chain_reaction.append((pos, max_num))
+        owner = self.owner.reshape(-1)
+        count = self.count.reshape(-1)
+        for cell in cells.tolist():
+            row, column = divmod(cell, self.width_num)
+            owner[cell], count[cell] = -1, 0
+            for num in range(self.player_num):
+                if self.boards[num][row][column] != 0:
+                    owner[cell], count[cell] = num, self.boards[num][row][column]
+                    break
+        return chain_reaction
 
     def _update_chain_board(self, row: int, column: int) -> None:
         """Updates the "chain_board".
@@ -122,91 +921,98 @@ class Gamecalc():
             row: Row at which the "explosion" takes place.
             column: Column at which the "explosion" takes place.
         """
-        try:
-            self.chain_board[row+1][column] += 1 + self.get_pos(row+1, column, True, False)
-        except IndexError:
-            pass
-        row_neg = row-1
-        if row_neg >= 0:
-            self.chain_board[row_neg][column] += 1 + self.get_pos(row_neg, column, True, False)
+        cell = row * self.width_num + column
+        ptr = self.tables.neighbor_ptr
+        for neighbor in self.tables.neighbor_idx[ptr[cell]:ptr[cell+1]]:
+            n_row, n_column = divmod(int(neighbor), self.width_num)
+            if self.chain_board[n_row][n_column] == 0:
+                self._chain_cells.append(int(neighbor))
+            self.chain_board[n_row][n_column] += 1 + self._take_pos(n_row, n_column)
 
-        try:
-            self.chain_board[row][column+1] += 1 + self.get_pos(row, column+1, True, False)
-        except IndexError:
-            pass
-        column_neg = column-1
-        if column_neg >= 0:
-            self.chain_board[row][column_neg] += 1 + self.get_pos(row, column_neg, True, False)
-
-    def get_pos(self, row: int, column:int, substract: bool, get_player: bool) -> int | Tuple[int, int]:
-        """Return the number of circles (and "player_number") of a position.
+    def _take_pos(self, row: int, column: int) -> int:
+        """Returns the number of circles of a position and updates the "substract_board".
 
-        !!Warning: "substract" and "get_player" can not be used combined!!
+        If the value in the "substract_board" is not "0" then "0" is returned, because
+        the value at this position was already returned (would duplicated this circles
+        otherwise, the "substract_board" is used for a better animation).
 
         Args:
             row: Row at which the information is requested.
             column: Column at which the information is requested.
-            substract: Wether the "substact_board" should be updated or not. Can not be used with
-              "get_player"!
-            get_player: Wether the "player_number" of the requested position should be returned.
-              Can not be used with "substract"!
 
         Returns:
-            By default ("substract" and "get_player" are "False") only the number of
-            circles at the requested position is returned.
-
-            If "substract" is "True" then "get_player" must be "False" and the
-            "substract_board" will be updated. If the value in the "substract_board"
-            is not "0" then "0" is returned, because the value at this position was
-            already returned (would duplicated this circles otherwise, the
-            "substract_board" is used for a better animation).
-
-            If "get_player" it "True" then "substract" must be "False" and additionaly
-            the "player_number" who ownes that circles is returned.
+            Number of circles at the requested position which are not yet captured.
         """
+        self._load_cell(row, column)
         for num in range(self.player_num):
-            pos_val = self.player_pos[num][row][column]
+            pos_val = self.boards[num][row][column]
             if pos_val != 0:
-                if substract:
-                    if self.substract_board[num][row][column] != 0:
-                        return 0
-                    self.substract_board[num][row][column] = pos_val
+                if self.substract_board[num][row][column] != 0:
+                    return 0
+                self.substract_board[num][row][column] = pos_val
+                self._substract_cells.append((num, row, column))
                 break
+        return pos_val
+
+    def get_pos(self, row: int, column:int, get_player: bool = False) -> int | Tuple[int, int]:
+        """Return the number of circles (and "player_number") of a position.
+
+        Args:
+            row: Row at which the information is requested.
+            column: Column at which the information is requested.
+            get_player: Wether the "player_number" of the requested position should be returned.
+              Defaults to False.
+
+        Returns:
+            By default only the number of circles at the requested position is returned.
+
+            If "get_player" it "True" then additionaly the "player_number" who ownes that
+            circles is returned ("-1" for empty positions).
+        """
+        if self._bitboard is not None:
+            pos_val, owner = self._bitboard.get_pos(row * self.width_num + column)
+        else:
+            pos_val, owner = int(self.count[row, column]), int(self.owner[row, column])
         if get_player:
-            return pos_val, num
+            return pos_val, owner
         return pos_val
 
-    def _clear_substract_board(self) -> None:
+    def _clear_substract_board(self) -> List[int]:
         """Clears the "substract_board".
 
         The "substract_board" is used to clear the circles at captured positions
         for all palyers at the same time. It makes the animation look better.
+
+        Returns:
+            Flat indices of the cleared positions.
         """
-        for num in range(self.player_num):
-            self.player_pos[num] -= self.substract_board[num]
-            self.substract_board[num] = np.zeros((self.height_num, self.width_num), dtype=int)
+        cells = []
+        for num, row, column in self._substract_cells:
+            self.boards[num][row][column] -= self.substract_board[num][row][column]
+            self.substract_board[num][row][column] = 0
+            cells.append(row * self.width_num + column)
+        self._substract_cells = []
+        return cells
 
-    def _clear_chain_board(self, player: int, connections: List[socket.socket] | None,
-                           round_num: int) -> None:
+    def _clear_chain_board(self) -> Tuple[List[Tuple[int, int]], List[int]]:
         """Clears the "chain_board".
 
         The "chain_board" is used to transfer the captured and "exploded" circles
         to their new postion and "owner".
 
-        Args:
-            player: "Player_number" of current player.
-            connections: Sockets of connected clients or None for testing.
-            round_num: Current round number.
+        Returns:
+            pos_l: Positions to be updated in the next wave.
+            num_l: Number of circles to be added to corresponding position.
         """
         pos_l = []
         num_l = []
-        for num_r, row in enumerate(self.chain_board):
-            for num_c, column in enumerate(row):
-                if column != 0:
-                    pos_l.append((num_r, num_c))
-                    num_l.append(column)
-        self.chain_board = np.zeros((self.height_num, self.width_num), dtype=int)
-        self.update_player(player, pos_l, num_l, connections, round_num)
+        for cell in sorted(self._chain_cells):
+            row, column = divmod(cell, self.width_num)
+            pos_l.append((row, column))
+            num_l.append(int(self.chain_board[row][column]))
+            self.chain_board[row][column] = 0
+        self._chain_cells = []
+        return pos_l, num_l
 
     def _check_elimination(self) -> None:
         """Checks for elimination and sets "self.player_alive".
@@ -214,10 +1020,8 @@ class Gamecalc():
         !! Should only be used after all player had at least one turn otherwise
         player will get falsely eliminated due to their "play_pos" sum beeing "0"!!
         """
-        for num in range(self.player_num):
-            sum_p = np.sum(self.player_pos[num])
-            if sum_p == 0:
-                self.player_alive[num] = False
+        for num in self._empty & self._alive:
+            self.set_eliminated(num)
 
     def get_eliminated(self) -> List[int]:
         """Returns a list with "player_numbers" of eliminated players.
@@ -226,11 +1030,7 @@ class Gamecalc():
         of "self._check_elimination"!!
         """
         self._check_elimination()
-        eliminated = []
-        for num in range(self.player_num):
-            if not self.player_alive[num]:
-                eliminated.append(num)
-        return eliminated
+        return sorted(set(range(self.player_num)) - self._alive)
 
     def get_alive(self) -> List[int]:
         """Returns a list with "player_numbers" of alive players.
@@ -239,11 +1039,20 @@ class Gamecalc():
         of "self._check_elimination"!!
         """
         self._check_elimination()
-        alive = []
-        for num in range(self.player_num):
-            if self.player_alive[num]:
-                alive.append(num)
-        return alive
+        return list(self._turn_order)
+
+    def _set_alive(self, players: Iterable[int]) -> None:
+        """Sets the alive players.
+
+        Besides "player_alive" the alive players are kept as set and as sorted list
+        ("turn order"), which is used as circular list to find the current player.
+
+        Args:
+            players: "Player_numbers" of the alive players.
+        """
+        self._alive = set(players)
+        self._turn_order = sorted(self._alive)
+        self.player_alive = {num: num in self._alive for num in range(self.player_num)}
 
     def set_eliminated(self, player) -> None:
         """Sets a player as eliminated.
@@ -252,6 +1061,22 @@ class Gamecalc():
             player: "Player_number" of player to be eliminated.
         """
         self.player_alive[player] = False
+        if player in self._alive:
+            self._alive.discard(player)
+            self._turn_order.pop(bisect.bisect_left(self._turn_order, player))
+
+    def _turn_index(self) -> int | None:
+        """Returns the index of the current player in the "turn order".
+
+        The "counter" is advanced past eliminated players, so it points to the
+        current player afterwards.
+        """
+        if not self._turn_order:
+            return None
+        start = self._counter % self.player_num
+        index = bisect.bisect_left(self._turn_order, start) % len(self._turn_order)
+        self._counter += (self._turn_order[index] - start) % self.player_num
+        return index
 
     def player_to_move(self) -> int | None:
         """Returns the "player_number" of the current player.
@@ -259,15 +1084,10 @@ class Gamecalc():
         Returns:
             "None" should in theory never be returned.
         """
-        for num in range(self.player_num):
-            # to be safe we can exit the while loop
-            if self.player_alive[num]:
-                player_move = self._counter % self.player_num
-                while not self.player_alive[player_move]:
-                    self._counter += 1
-                    player_move = self._counter % self.player_num
-                return player_move
-        return None
+        index = self._turn_index()
+        if index is None:
+            return None
+        return self._turn_order[index]
 
     def player_next_to_move(self) -> int | None:
         """Returns the "player_number" of the next player after the current one.
@@ -275,18 +1095,10 @@ class Gamecalc():
         Returns:
             "None" should in theory never be returned.
         """
-        # that way player next to move is always the one after player_to_move()
-        _ = self.player_to_move()
-        for num in range(self.player_num):
-            # to be safe we can exit the while loop
-            if self.player_alive[num]:
-                offset = 1
-                player_move = (self._counter + offset) % self.player_num
-                while not self.player_alive[player_move]:
-                    offset += 1
-                    player_move = (self._counter + offset) % self.player_num
-                return player_move
-        return None
+        index = self._turn_index()
+        if index is None:
+            return None
+        return self._turn_order[(index + 1) % len(self._turn_order)]
 
     def increase_counter(self):
         """Increases the "counter" which is used for determining the current and
@@ -294,31 +1106,82 @@ class Gamecalc():
         # "aka next round/player"
         self._counter += 1
 
-    def set_state_for_undo(self) -> None:
-        """Saves the current game state to be loaded when "undo" was pressed."""
-        self.last_player_pos = copy.deepcopy(self.player_pos)
-        self.last_player_alive = copy.deepcopy(self.player_alive)
-        self._last_counter = copy.deepcopy(self._counter)
+    def set_state_for_undo(self, round_num: int | None = None) -> None:
+        """Starts a new undo step at the current game state.
 
-    def undo(self, connections: List[socket.socket], round_num: int) -> None:
-        """Loades and distributes the saved game state thereby undoing the last move.
+        Instead of copying the game state, the net change until the next step is
+        journaled (the changed positions with their previous values), so undoing
+        only touches the positions changed since. The "bitboard" engine keeps the
+        planes of its "Bitboard" instead (a few integers). At most "undo_limit" steps
+        are kept.
 
         Args:
-            connections: Sockets of connected clients.
-            round_num: Current round number.
+            round_num: Round number of the following move, returned by "undo".
+              Defaults to None.
         """
+        self._journal_move()
+        board = None
+        if self._bitboard is not None:
+            board = (tuple(self._bitboard.owned), self._bitboard.planes)
+        nothing = np.zeros(0, dtype=np.intp)
+        self._journal.append(UndoEntry(round_num, self._counter, tuple(self._turn_order),
+                                       self.winner, nothing,
+                                       np.zeros(0, dtype=self._owner.dtype),
+                                       np.zeros(0, dtype=self._count.dtype), board))
+
+    def clear_undo(self) -> None:
+        """Drops all undo steps, e.g. after a player left the game."""
+        self._journal.clear()
+        self._move_changes = []
+
+    def undo(self, connections: List[socket.socket] | None,
+             round_num: int | None = None) -> int | None:
+        """Restores and distributes the game state of the last undo step thereby undoing
+        the last move.
+
+        Can be called repeatedly to undo several moves (see "undo_limit").
+
+        Args:
+            connections: Sockets of connected clients or None.
+            round_num: Round number of the undone move, if None the round number
+              passed to "set_state_for_undo" is used. Defaults to None.
+
+        Returns:
+            Round number of the undone move or None if there is nothing to undo.
+        """
+        self._journal_move()
+        if not self._journal:
+            return None
+        entry = self._journal.pop()
+        if round_num is None:
+            round_num = entry.round_num
         self.time_line.pop(round_num)
-        self.player_pos = copy.deepcopy(self.last_player_pos)
-        self.player_alive = copy.deepcopy(self.last_player_alive)
-        self._counter = copy.deepcopy(self._last_counter)
+        if entry.board is not None:
+            self._bitboard.owned = list(entry.board[0])
+            self._bitboard.planes = entry.board[1]
+            self._arrays_stale = True
+            self._set_bitboard_totals()
+        elif entry.cells.size:
+            owner = self.owner.reshape(-1)
+            count = self.count.reshape(-1)
+            last_owner = owner[entry.cells]
+            last_count = count[entry.cells]
+            owner[entry.cells] = entry.owner
+            count[entry.cells] = entry.count
+            self._update_cells(entry.cells, last_owner, last_count, record=False)
+        if set(entry.alive) != self._alive:
+            self._set_alive(entry.alive)
+        self._counter = entry.counter
+        self.winner = entry.winner
         next_player = self.player_to_move()
         if connections is not None:
-            for connection in connections:
-                self.network.send(connection, ("positions", self.player_pos))
-                self.network.send(connection, ("next player", (next_player, round_num)))
-        self.logger.debug("Undo position",
-                          extra={"session_uuid": self.session_uuid,
-                                 "round_num": round_num,
-                                 "next_player": next_player,
-                                 "positions": self.player_pos,
-                                 "counter": self._counter})
+            self.network.send_board(connections, self.board_frame())
+            self.network.broadcast(connections, ("next player", (next_player, round_num)))
+        if self.logger is not None:
+            self.logger.debug("Undo position",
+                              extra={"session_uuid": self.session_uuid,
+                                     "round_num": round_num,
+                                     "next_player": next_player,
+                                     "positions": self.board_frame(),
+                                     "counter": self._counter})
+        return round_num
@@ -1,22 +1,195 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-"""Handles sending and recieving of data via sockets as well as the handshake for client and server processes."""
+"""Handles sending and recieving of data via sockets as well as the handshake for client and server processes.
+
+The messages are encoded with the binary protocol of "chainreaction.protocol".
+"""
 
 
 from __future__ import annotations
-from typing import Dict, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional
 import sys
 import time
+import collections
 import socket
-import pickle
 import select
 import random
 import logging
 
+import numpy as np
+
 from chainreaction.loggingsetup import formatted_traceback
+from chainreaction import protocol
+
+SLOW_CLIENT_POLICIES = ("drop", "disconnect")
+BOARD_MESSAGES = ("board", "keyframe", "delta")  # can be replaced by a later board
+
+
+class FrameReader:
+    """Splits the byte stream of a connection into messages.
+
+    Everything available is read with one "recv_into" into a reused buffer. All
+    complete messages are decoded, the bytes of an incomplete message are kept
+    for the next read. The buffer only grows while the bytes of a large message
+    arrive (at most to twice the recieved bytes), never to the length a header
+    declares.
+    """
+    def __init__(self, size: int = 1 << 16, limits: Dict[str, int] | None = None,
+                 from_client: bool = False) -> None:
+        """Initializes the instance.
+
+        Args:
+            size: Initial size of the buffer in bytes. Defaults to 64 KiB.
+            limits: Maximum payload size of every allowed message type, messages of
+              other types or with larger payloads raise "protocol.ProtocolError".
+              Defaults to None (all types up to "protocol.MAX_PAYLOAD").
+            from_client: Wether the messages are send by a client, see "protocol.decode".
+              Defaults to False.
+        """
+        self._buffer = bytearray(size)
+        self._start = 0  # first byte not decoded yet
+        self._end = 0  # end of the recieved bytes
+        self._needed = 0  # size of the incomplete message at "_start"
+        self.limits = limits
+        self.from_client = from_client
 
-HEADERSIZE = 20
+    def read(self, connection: socket.socket) -> List[Tuple[str|None, Any]]:
+        """Reads the available bytes from "connection" and returns the complete messages.
+
+        Args:
+            connection: Readable connection.
+
+        Returns:
+            Messages in the order they were send, ends with (None, None) if the
+            connection was closed. Raises "protocol.ProtocolError" for invalid
+            messages and "OSError" for connection errors.
+        """
+        if self._end == len(self._buffer):
+            self._make_room()
+        try:
+            with memoryview(self._buffer) as view:
+                size = connection.recv_into(view[self._end:])
+        except BlockingIOError:
+            return self.messages()
+        if size == 0:
+            return self.messages() + [(None, None)]
+        self._end += size
+        return self.messages()
+
+    def messages(self) -> List[Tuple[str|None, Any]]:
+        """Decodes and returns all complete messages in the buffer."""
+        messages = []
+        self._needed = 0
+        with memoryview(self._buffer) as view:
+            while self._end - self._start >= protocol.HEADER.size:
+                type_id, length = protocol.decode_header(
+                    view[self._start:self._start + protocol.HEADER.size])
+                if self.limits is not None:
+                    self._check_limit(type_id, length)
+                frame_end = self._start + protocol.HEADER.size + length
+                if frame_end > self._end:
+                    self._needed = protocol.HEADER.size + length
+                    break
+                # the payload is copied, the arrays decoded from it outlive the buffer
+                payload = bytes(view[self._start + protocol.HEADER.size:frame_end])
+                self._start = frame_end
+                messages.append(protocol.decode(type_id, payload, self.from_client))
+        if self._start == self._end:
+            self._start = self._end = 0
+        return messages
+
+    def _check_limit(self, type_id: int, length: int) -> None:
+        """Raises "protocol.ProtocolError" if the message is not allowed by "limits"."""
+        msg_type = protocol.MESSAGE_TYPES[type_id]
+        if msg_type not in self.limits:
+            raise protocol.ProtocolError(f"Unexpected message type {msg_type!r}")
+        if length > self.limits[msg_type]:
+            raise protocol.ProtocolError(f"Payload of {length} bytes is too large "
+                                         f"for {msg_type!r}")
+
+    def _make_room(self) -> None:
+        """Moves the incomplete message to the start or grows the full buffer.
+
+        The buffer is at most doubled, so it only grows as fast as bytes arrive.
+        """
+        pending = self._end - self._start
+        if self._start:
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, pending
+            return
+        size = len(self._buffer)
+        if self._needed > size:
+            self._buffer.extend(bytes(min(self._needed, 2 * size) - size))
+        else:
+            # the header is incomplete (tiny buffer), at most doubles
+            self._buffer.extend(bytes(max(protocol.HEADER.size, size)))
+
+
+class Outbox:
+    """Bounded queue of the encoded messages waiting to be send to one connection.
+
+    Also keeps the byte and latency statistics of the connection, the latency of a
+    message is the time from queuing it until its last byte was written.
+    """
+    def __init__(self) -> None:
+        """Initializes the instance."""
+        self.messages = collections.deque()  # [bytes, time queued, droppable]
+        self.offset = 0  # bytes of the first message which were already written
+        self.queued = 0  # bytes waiting to be written
+        self.sent = 0
+        self.sent_num = 0
+        self.dropped = 0
+        self.latency_sum = 0.0
+        self.max_latency = 0.0
+
+    def append(self, msg: bytes, droppable: bool) -> None:
+        """Queues "msg", "droppable" messages may be dropped if the client is too slow."""
+        self.messages.append([msg, time.monotonic(), droppable])
+        self.queued += len(msg)
+
+    def drop(self) -> int:
+        """Drops all droppable messages which were not started yet and returns their number."""
+        kept = collections.deque()
+        dropped = 0
+        for num, entry in enumerate(self.messages):
+            if entry[2] and ((num > 0) or (self.offset == 0)):
+                self.queued -= len(entry[0])
+                dropped += 1
+            else:
+                kept.append(entry)
+        self.messages = kept
+        self.dropped += dropped
+        return dropped
+
+    def write(self, connection: socket.socket) -> None:
+        """Writes as many queued bytes as "connection" accepts without blocking.
+
+        Raises "OSError" for connection errors.
+        """
+        while self.messages:
+            msg = self.messages[0][0]
+            try:
+                size = connection.send(memoryview(msg)[self.offset:])
+            except (BlockingIOError, InterruptedError):
+                return
+            self.offset += size
+            self.queued -= size
+            self.sent += size
+            if self.offset < len(msg):
+                return
+            latency = time.monotonic() - self.messages.popleft()[1]
+            self.offset = 0
+            self.sent_num += 1
+            self.latency_sum += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def stats(self) -> Dict[str, int|float]:
+        """Returns the byte and latency statistics."""
+        return {"sent_bytes": self.sent, "sent_messages": self.sent_num,
+                "queued_bytes": self.queued, "dropped_messages": self.dropped,
+                "mean_latency": self.latency_sum / max(self.sent_num, 1),
+                "max_latency": self.max_latency}
 
 
 class Network_c:
@@ -36,6 +209,9 @@ class Network_c:
         self.addr = (self.ip, self.port)
         self.logger = logger
         self.client_uuid = client_uuid
+        self.protocol = protocol.negotiate(None)
+        self._reader = FrameReader()
+        self._pending = collections.deque()  # messages recieved but not returned yet
 
     def connect(self) -> bool:
         """Connects to the server.
@@ -58,8 +234,7 @@ class Network_c:
         Args:
             data: Will be send to the server.
         """
-        msg = pickle.dumps(data)
-        msg = bytes(f"{len(msg):<{HEADERSIZE}}", "utf-8") + msg
+        msg = protocol.encode(data)
         try:
             self.client.sendall(msg)
         except (OSError, UnboundLocalError) as err:
@@ -70,23 +245,35 @@ class Network_c:
             self.close()
             sys.exit()
 
-    def recieve(self) -> Tuple[str|None, Any]:
+    def recieve(self) -> List[Tuple[str|None, Any]]:
         """Recieves data from the server.
 
+        Messages which were already recieved (e.g. together with the handshake) are
+        returned without reading from the socket, see "has_pending".
+
         Returns:
-            Data send by the server.
+            Data send by the server, one tuple per message. Ends with (None, None) if
+            the connection was closed or broken.
         """
+        if self._pending:
+            messages = list(self._pending)
+            self._pending.clear()
+            return messages
         try:
-            msg = self.client.recv(HEADERSIZE).decode("utf-8")
-            if msg != "":
-                msg_len = int(msg)
-                recv = pickle.loads(self.client.recv(msg_len))
-                return recv
+            return self._reader.read(self.client)
+        except protocol.ProtocolError as err:
+            self.logger.error("Invalid message!",
+                              extra={"session_uuid": self.client_uuid,
+                                     "traceback": formatted_traceback(err)})
         except (OSError, UnboundLocalError) as err:
             self.logger.error("Error while sending!",
                               extra={"session_uuid": self.client_uuid,
                                      "traceback": formatted_traceback(err)})
-        return (None, None)
+        return [(None, None)]
+
+    def has_pending(self) -> bool:
+        """Returns wether messages were recieved which "recieve" did not return yet."""
+        return bool(self._pending)
 
     def close(self) -> None:
         """Closes connection to the server."""
@@ -109,7 +296,9 @@ class Network_c:
         """Deals with the "handshake" between server and client.
 
         After 100 sec the handshake will be aborted and the client process will be
-        closed via "sys.exit()".
+        closed via "sys.exit()". The protocol version and capabilities of the client
+        are offered with the handshake, the ones agreed on by the server are stored
+        in "protocol".
 
         Args:
             nickname: Nickname of the client.
@@ -120,11 +309,13 @@ class Network_c:
         """
         tries = 0
         if be_player:
-            self.send(("handshake", ("player", nickname, self.client_uuid)))
+            self.send(("handshake", ("player", nickname, self.client_uuid,
+                                     protocol.offer())))
             self.logger.debug("Handshake player",
                               extra={"client_uuid": self.client_uuid})
         else:
-            self.send(("handshake", ("spectator", None, self.client_uuid)))
+            self.send(("handshake", ("spectator", None, self.client_uuid,
+                                     protocol.offer())))
             self.logger.debug("Handshake spectator",
                               extra={"client_uuid": self.client_uuid})
         while tries < 100:
@@ -134,8 +325,14 @@ class Network_c:
             readable, _, errored = select.select([self.client], [self.client],
                                                  [self.client], 1)
             if readable:
-                msg = self.recieve()
+                messages = self.recieve()
+                if not messages:
+                    # handshake is incomplete
+                    continue
+                msg = messages[0]
                 if msg[0] == "handshake":
+                    self.protocol = msg[1].get("protocol", protocol.negotiate(None))
+                    self._pending.extend(messages[1:])
                     return msg[1]
                 else:
                     self.logger.warning("Handshake, Unkown message",
@@ -159,7 +356,9 @@ class Network_c:
 
 class Network_s:
     """Deals with the server side socket connection to the clients."""
-    def __init__(self, ip: str, port: int, logger: logging.Logger, session_uuid: str) -> None:
+    def __init__(self, ip: str, port: int, logger: logging.Logger, session_uuid: str,
+                 keyframe_interval: int = 32, queue_limit: int = 4 << 20,
+                 slow_client: str = "drop") -> None:
         """Initializes the instance.
 
         Args:
@@ -167,7 +366,17 @@ class Network_s:
             port: Port to bind.
             logger: Logs the progress and state of the game/function.
             session_uuid: Differentiates different games sessions in log-files.
+            keyframe_interval: Every "keyframe_interval"-th board is send completely
+              to clients recieving "delta" messages. Defaults to 32.
+            queue_limit: Maximum number of bytes waiting to be send to one connection.
+              Defaults to 4 MiB.
+            slow_client: What happens if a connection exceeds "queue_limit", one of
+              "SLOW_CLIENT_POLICIES": "drop" drops the queued boards (the client
+              recieves the next board as "keyframe"), "disconnect" closes the
+              connection. Defaults to "drop".
         """
+        if slow_client not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"slow_client must be one of {SLOW_CLIENT_POLICIES}")
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.ip = ip
         self.port = port
@@ -175,6 +384,17 @@ class Network_s:
         self.connections = []
         self.logger = logger
         self.session_uuid = session_uuid
+        self.peers = {}  # negotiated protocol of every connection
+        self._readers = {}  # "FrameReader" of every connection
+        self._outboxes = {}  # "Outbox" of every connection
+        self.queue_limit = int(queue_limit)
+        self.slow_client = slow_client
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self._scheduled = collections.deque()
+        self._board = None  # last board send with "send_board"
+        self._board_seq = 0
+        self._synced = set()  # connections which recieved the last board
+        self._dropped = []  # connections closed while sending, see "pop_dropped"
 
     def bind_address(self, listen: int) -> bool:
         """Binds the "ip" and "port" and defines the maximum of unaccepted connections.
@@ -211,52 +431,256 @@ class Network_s:
         self.connections.append(connection)
         return connection, addr
 
-    def send(self, connection: socket.socket, data: Tuple[str, Any]) -> None:
-        """Sends "data" to "connection", closes connection if an error occurse.
+    def send(self, connection: socket.socket, data: Tuple[str, Any]) -> bool:
+        """Queues "data" to be send to "connection" and writes as much as possible.
+
+        Nothing blocks, the rest of the queue is written by "flush" once the socket
+        is writable. If the queue exceeds "queue_limit", the "slow_client" policy is
+        applied. The connection is closed if an error occurse.
 
         Args:
             connection: Client which should receive the data.
             data: Will be send to "connection".
+
+        Returns:
+            Wether "data" was queued.
         """
-        msg = pickle.dumps(data)
-        msg = bytes(f"{len(msg):<{HEADERSIZE}}", "utf-8") + msg
+        return self._queue(connection, protocol.encode(data), data[0])
+
+    def broadcast(self, connections: List[socket.socket],
+                  data: Tuple[str, Any]) -> List[socket.socket]:
+        """Sends "data" to all "connections", see "send".
+
+        "data" is encoded only once, the queues of all connections share the same
+        immutable buffer, so every further connection costs no encoding and no copy.
+
+        Args:
+            connections: Clients which should receive the data.
+            data: Will be send to "connections".
+
+        Returns:
+            Connections which queued "data".
+        """
+        if not connections:
+            return []
+        msg = protocol.encode(data)
+        return [connection for connection in list(connections)
+                if self._queue(connection, msg, data[0])]
+
+    def _queue(self, connection: socket.socket, msg: bytes, msg_type: str) -> bool:
+        """Queues the encoded "msg" for "connection" and writes as much as possible."""
+        outbox = self._outboxes.get(connection)
+        if outbox is None:
+            outbox = self._outboxes[connection] = Outbox()
+        if outbox.queued + len(msg) > self.queue_limit:
+            if not self._too_slow(connection, outbox, msg_type):
+                return False
+        outbox.append(msg, msg_type in BOARD_MESSAGES)
+        return self._write(connection, msg_type)
+
+    def _too_slow(self, connection: socket.socket, outbox: Outbox, msg_type: str) -> bool:
+        """Applies the "slow_client" policy, returns wether the message can still be queued."""
+        if self.slow_client == "drop":
+            dropped = outbox.drop()
+            # the client waits for the next keyframe
+            self._synced.discard(connection)
+            self.logger.warning("Dropped boards of slow client!",
+                                extra={"session_uuid": self.session_uuid,
+                                       "dropped": dropped,
+                                       "queued_bytes": outbox.queued})
+            if msg_type == "delta":
+                outbox.dropped += 1
+                return False
+            if outbox.queued <= self.queue_limit:
+                return True
+        self.logger.warning("Disconnected slow client!",
+                            extra={"session_uuid": self.session_uuid,
+                                   "queued_bytes": outbox.queued,
+                                   "stats": outbox.stats()})
+        self._drop(connection)
+        return False
+
+    def _write(self, connection: socket.socket, msg_type: str | None = None) -> bool:
+        """Writes the queue of "connection", returns "False" if it had to be closed."""
         try:
-            connection.sendall(msg)
+            self._outboxes[connection].write(connection)
+            return True
         except (OSError, UnboundLocalError) as err:
             self.logger.error("Error while sending!",
                               extra={"session_uuid": self.session_uuid,
                                      "traceback": formatted_traceback(err),
-                                     "data": data})
-            self.close_connection(connection)
+                                     "msg_type": msg_type})
+            self._drop(connection)
+            return False
+
+    def _drop(self, connection: socket.socket) -> None:
+        """Closes "connection" while sending and remembers it for "pop_dropped"."""
+        self.close_connection(connection)
+        self._dropped.append(connection)
+
+    def pop_dropped(self) -> List[socket.socket]:
+        """Returns (and forgets) the connections closed while sending.
 
-    def recieve(self, connection: socket.socket) -> Tuple[str|None, Any]:
+        Connections are closed by "send", "broadcast", "flush", etc. if writing fails
+        or a slow client is disconnected (see "slow_client"). The game loop has to
+        remove the players of these connections like players who left.
+        """
+        dropped, self._dropped = self._dropped, []
+        return dropped
+
+    def flush(self, connections: List[socket.socket]) -> None:
+        """Writes the queued messages of the (writable) "connections"."""
+        for connection in list(connections):
+            outbox = self._outboxes.get(connection)
+            if (outbox is not None) and outbox.messages:
+                self._write(connection)
+
+    def pending(self) -> List[socket.socket]:
+        """Returns the connections with messages waiting to be send."""
+        return [connection for connection, outbox in self._outboxes.items() if outbox.messages]
+
+    def stats(self, connection: socket.socket) -> Dict[str, int|float]:
+        """Returns the byte and latency statistics of "connection", see "Outbox.stats"."""
+        outbox = self._outboxes.get(connection)
+        return (outbox or Outbox()).stats()
+
+    def send_board(self, connections: List[socket.socket],
+                   board: Tuple[np.ndarray, np.ndarray]) -> None:
+        """Sends "board" ("owner" and "count" arrays) to "connections".
+
+        Every board gets the next sequence number. Clients which support "delta"
+        messages and recieved the last board only get the changed positions, all
+        other clients (and every "keyframe_interval"-th board) get a "keyframe".
+        Clients without the capability get the plain "board" message. Every message
+        is encoded once for all clients (see "broadcast").
+
+        Args:
+            connections: Clients which should receive the board.
+            board: "Owner" and "count" arrays, not changed afterwards.
+        """
+        self._board_seq += 1
+        delta = None
+        if ((self._board is not None) and (self._board_seq % self.keyframe_interval)
+                and (self._board[0].shape == board[0].shape)):
+            delta = protocol.board_delta(self._board, board)
+        self._board = board
+        streams = [connection for connection in connections
+                   if "delta" in self.peers.get(connection, {}).get("capabilities", ())]
+        self.broadcast([connection for connection in connections if connection not in streams],
+                       ("board", board))
+        queued = []
+        if delta is not None:
+            queued = self.broadcast([connection for connection in streams
+                                     if connection in self._synced],
+                                    ("delta", (self._board_seq, *delta)))
+        # also clients whose "delta" was dropped (slow clients)
+        queued += self.broadcast([connection for connection in streams
+                                  if (connection not in queued) and (connection in self.connections)],
+                                 ("keyframe", (self._board_seq, *board)))
+        self._synced = set(queued)
+
+    def send_keyframe(self, connection: socket.socket) -> None:
+        """Sends the last board of "send_board" to a new "connection" if there is one."""
+        if self._board is None:
+            return
+        if "delta" in self.peers.get(connection, {}).get("capabilities", ()):
+            if self.send(connection, ("keyframe", (self._board_seq, *self._board))):
+                self._synced.add(connection)
+        else:
+            self.send(connection, ("board", self._board))
+
+    def schedule_broadcast(self, messages: List[Tuple[str, Any]], time_step: float) -> None:
+        """Schedules "messages" to be send to all connections, one every "time_step" seconds.
+
+        The first message is due immediately. The deadlines are absolute (based on
+        "time.monotonic") so sending late does not delay the following messages.
+        Scheduled messages are send by "send_scheduled".
+
+        Args:
+            messages: Will be send to all connections in the given order.
+            time_step: Time in s between two messages.
+        """
+        start = time.monotonic()
+        for num, data in enumerate(messages):
+            self._scheduled.append((start + num * time_step, data))
+
+    def send_scheduled(self) -> float | None:
+        """Sends all scheduled messages which are due to all connections.
+
+        "board" messages are send with "send_board".
+
+        Returns:
+            Time in s until the next scheduled message is due or None if no message
+            is scheduled anymore.
+        """
+        now = time.monotonic()
+        while self._scheduled and self._scheduled[0][0] <= now:
+            _, data = self._scheduled.popleft()
+            if data[0] == "board":
+                self.send_board(list(self.connections), data[1])
+            else:
+                self.broadcast(self.connections, data)
+        if self._scheduled:
+            return max(0.0, self._scheduled[0][0] - time.monotonic())
+        return None
+
+    def has_scheduled(self) -> bool:
+        """Returns wether there are scheduled messages which were not send yet."""
+        return bool(self._scheduled)
+
+    def clear_scheduled(self) -> None:
+        """Drops all scheduled messages which were not send yet."""
+        self._scheduled.clear()
+
+    def recieve(self, connection: socket.socket) -> List[Tuple[str|None, Any]]:
         """Recieves data from "connection".
 
         Args:
             connection: Connection who send data.
 
         Returns:
-            Data send by "connection".
+            Data send by "connection", one tuple per complete message. Ends with
+            (None, None) if the connection was closed, broken or send an invalid
+            message.
         """
+        reader = self._readers.get(connection)
+        if reader is None:
+            reader = self._readers[connection] = FrameReader(
+                size=4096, limits=protocol.CLIENT_MESSAGE_LIMITS, from_client=True)
         try:
-            msg = connection.recv(HEADERSIZE).decode("utf-8")
-            if msg != "":
-                msg_len = int(msg)
-                recv = pickle.loads(connection.recv(msg_len))
-                return recv
+            return reader.read(connection)
+        except protocol.ProtocolError as err:
+            # the caller closes the connection
+            self.logger.warning("Invalid message, connection dropped!",
+                                extra={"session_uuid": self.session_uuid,
+                                       "traceback": formatted_traceback(err)})
         except (OSError, UnboundLocalError) as err:
             self.logger.error("Error while sending!",
                               extra={"session_uuid": self.session_uuid,
                                      "traceback": formatted_traceback(err)})
-        return (None, None)
+        return [(None, None)]
 
-    def close_connection(self, connection: socket.socket) -> None:
+    def close_connection(self, connection: socket.socket, linger: float = 0.0) -> None:
         """Closes connection to "connection".
 
         Args:
             connection: Connection which should be closed.
+            linger: Time in s to wait for queued messages to be written before closing.
+              Defaults to 0.0 (queued messages which can not be written immediately
+              are dropped).
         """
-        self.connections.remove(connection)
+        if linger > 0:
+            self._linger([connection], linger)
+        outbox = self._outboxes.pop(connection, None)
+        if outbox is not None:
+            self.logger.debug("Connection statistics",
+                              extra={"session_uuid": self.session_uuid,
+                                     "stats": outbox.stats()})
+        if connection in self.connections:
+            self.connections.remove(connection)
+        self.peers.pop(connection, None)
+        self._readers.pop(connection, None)
+        self._synced.discard(connection)
         try:
             connection.close()
         except (OSError, UnboundLocalError) as err:
@@ -264,6 +688,49 @@ class Network_s:
                               extra={"session_uuid": self.session_uuid,
                                      "traceback": formatted_traceback(err)})
 
+    def close_all(self, linger: float = 0.0) -> None:
+        """Closes all connections.
+
+        Args:
+            linger: Time in s to wait for the queued messages of all connections to
+              be written before closing (shared by all connections). Defaults to 0.0.
+        """
+        if linger > 0:
+            self._linger(self.connections, linger)
+        for connection in list(self.connections):
+            self.close_connection(connection)
+        self._dropped = []
+        self._reset_board_stream()
+
+    def _reset_board_stream(self) -> None:
+        """Forgets the boards of the last game, the next "send_board" starts with a keyframe."""
+        self._scheduled.clear()
+        self._board = None
+        self._board_seq = 0
+        self._synced = set()
+
+    def _linger(self, connections: List[socket.socket], linger: float) -> None:
+        """Writes the queued messages of "connections" until they are empty or "linger"
+        seconds passed."""
+        deadline = time.monotonic() + linger
+        waiting = [connection for connection in connections
+                   if (connection in self._outboxes) and self._outboxes[connection].messages]
+        while waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                _, writable, _ = select.select([], waiting, [], remaining)
+            except (OSError, ValueError):
+                return
+            for connection in writable:
+                try:
+                    self._outboxes[connection].write(connection)
+                except OSError:
+                    self._outboxes[connection].messages.clear()
+            waiting = [connection for connection in waiting
+                       if self._outboxes[connection].messages]
+
     def setblocking(self, flag: bool) -> None:
         """Set blocking or non-blocking mode of the socket.
 
@@ -272,6 +739,27 @@ class Network_s:
         """
         self.server.setblocking(flag)
 
+    def add_peer(self, connection: socket.socket, client_handshake: Tuple[Any, ...]) -> None:
+        """Negotiates the protocol with "connection" from its handshake.
+
+        Args:
+            connection: Client which send the handshake.
+            client_handshake: Role, nickname, uuid and (optionally) the protocol offered
+              by the client.
+        """
+        offered = client_handshake[3] if len(client_handshake) > 3 else None
+        self.peers[connection] = protocol.negotiate(offered)
+
+    def send_handshake(self, connection: socket.socket, handshake_dict: Dict[str, Any]) -> None:
+        """Sends "handshake_dict" and the protocol negotiated with "connection".
+
+        Args:
+            connection: Client which should receive the handshake.
+            handshake_dict: Dictionary containing the information from the handshake.
+        """
+        agreed = self.peers.get(connection, protocol.negotiate(None))
+        self.send(connection, ("handshake", {**handshake_dict, "protocol": agreed}))
+
     def handshake(self, s_inputs: Dict[str, int|str]) -> Tuple[Dict[int, str],
                                                                Dict[socket.socket, int],
                                                                Dict[str, Any],
@@ -290,6 +778,7 @@ class Network_s:
             conn_uuid: Connects the sockets to their respective uuids for connection with
               client log-files.
         """
+        self._reset_board_stream()
         finished = False
         players = {}
         spectators = []
@@ -307,42 +796,43 @@ class Network_s:
                     self.logger.debug("New connection",
                                       extra={"session_uuid": self.session_uuid})
                 else:
-                    msg = self.recieve(read)
-                    if msg[0] == "handshake":
-                        if msg[1][0] == "player":
-                            if len(players) == s_inputs["player_num"]:
-                                finished = True
-                                spectators.append(read)
-                                self.logger.info("Added player as spectator",
-                                                  extra={"session_uuid": self.session_uuid,
-                                                         "client_uuid": msg[1][2]})
-                                conn_uuid[read] = msg[1][2]
+                    for msg in self.recieve(read):
+                        if msg[0] == "handshake":
+                            self.add_peer(read, msg[1])
+                            if msg[1][0] == "player":
+                                if len(players) == s_inputs["player_num"]:
+                                    finished = True
+                                    spectators.append(read)
+                                    self.logger.info("Added player as spectator",
+                                                      extra={"session_uuid": self.session_uuid,
+                                                             "client_uuid": msg[1][2]})
+                                    conn_uuid[read] = msg[1][2]
+                                else:
+                                    players[read] = msg[1][1]
+                                    self.logger.info("Added player",
+                                                      extra={"session_uuid": self.session_uuid,
+                                                             "client_uuid": msg[1][2]})
+                                    conn_uuid[read] = msg[1][2]
                             else:
-                                players[read] = msg[1][1]
-                                self.logger.info("Added player",
+                                self.logger.info("Added spectator",
                                                   extra={"session_uuid": self.session_uuid,
                                                          "client_uuid": msg[1][2]})
+                                spectators.append(read)
                                 conn_uuid[read] = msg[1][2]
-                        else:
-                            self.logger.info("Added spectator",
+                        elif (msg[0] == "ByeBye") or (msg[0] is None):
+                            print(f"Closed connection to {read}")
+                            self.logger.debug("Closed connection",
                                               extra={"session_uuid": self.session_uuid,
-                                                     "client_uuid": msg[1][2]})
-                            spectators.append(read)
-                            conn_uuid[read] = msg[1][2]
-                    elif msg[0] == "ByeBye":
-                        print(f"Closed connection to {read}")
-                        self.logger.debug("Closed connection",
-                                          extra={"session_uuid": self.session_uuid,
-                                                 "client_uuid": conn_uuid.pop(read)})
-                        if players.pop(read, None) is None:
-                            spectators.remove(read)
-                        self.close_connection(read)
-                    else:
-                        self.logger.warning("Handshake, Unkown message",
-                                            extra={"session_uuid": self.session_uuid,
-                                                   "client_uuid": conn_uuid[read],
-                                                   "recieved": msg})
-
+                                                     "client_uuid": conn_uuid.pop(read, None)})
+                            if (players.pop(read, None) is None) and (read in spectators):
+                                spectators.remove(read)
+                            self.close_connection(read)
+                            break
+                        else:
+                            self.logger.warning("Handshake, Unkown message",
+                                                extra={"session_uuid": self.session_uuid,
+                                                       "client_uuid": conn_uuid.get(read),
+                                                       "recieved": msg})
 
             for error in errored:
                 self.logger.error("Connection failed!",
@@ -372,9 +862,11 @@ class Network_s:
         handshake_dict["player_num"] = s_inputs["player_num"]
         handshake_dict["width"] = s_inputs["width"]
         handshake_dict["height"] = s_inputs["height"]
+        handshake_dict["topology"] = s_inputs.get("topology", "rect")
+        handshake_dict["blocked"] = s_inputs.get("blocked", [])
         handshake_dict["session_uuid"] = self.session_uuid
         for conn, num in player_dict.items():
-            self.send(conn, ("handshake", handshake_dict))
+            self.send_handshake(conn, handshake_dict)
             self.send(conn, ("your number", num))
             self.logger.debug("Send handshake and number",
                               extra={"session_uuid": self.session_uuid,
@@ -382,9 +874,9 @@ class Network_s:
                                      "number": num})
 
         for spectator in spectators:
-            self.send(spectator, ("handshake", handshake_dict))
+            self.send_handshake(spectator, handshake_dict)
             self.send(spectator, ("spectator", None))
             self.logger.debug("Send handshake and spectator",
                               extra={"session_uuid": self.session_uuid,
-                                     "client_uuid": conn_uuid[conn]})
+                                     "client_uuid": conn_uuid[spectator]})
         return nicknames_dict, player_dict, handshake_dict, conn_uuid
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the binary wire protocol used between server and clients.
+
+Every message ("frame") starts with a fixed header of the protocol version, the
+message type and the length of the payload ("HEADER", little-endian). The payload
+depends on the message type:
+
+- Numbers are packed with "struct".
+- Boards are send as raw little-endian "owner" (int8/int16) and "count" (uint8)
+  buffers, which are read back with "np.frombuffer" without copying.
+- The "time line" is send as raw float64 and int32 buffers.
+- The handshake information is encoded as JSON. The client sends a list (role,
+  nickname, uuid and offered protocol), the server a dictionary. Both directions
+  have their own decoder, so a peer can not send the handshake of the other side.
+- Clients with the capability "delta" recieve numbered boards: a full "keyframe"
+  from time to time and in between only the changed positions ("delta"), see
+  "board_delta" and "apply_delta".
+
+Nothing is unpickled, so a peer can not execute code with a crafted message. Payloads
+which do not match their message type raise a "ProtocolError".
+
+The client offers its protocol version and capabilities with its handshake, the
+server answers with the version and capabilities both sides support ("negotiate").
+"""
+
+
+from __future__ import annotations
+from typing import Any, Dict, Tuple
+import json
+import struct
+
+import numpy as np
+
+from chainreaction.timeline import TimeSeries
+
+
+PROTOCOL_VERSION = 1
+CAPABILITIES = ("board", "delta")
+
+HEADER = struct.Struct("<BBI")  # version, message type, payload length
+MAX_PAYLOAD = 1 << 28  # larger payloads are rejected
+
+MESSAGE_TYPES = ("handshake", "your number", "spectator", "next player", "board",
+                 "finished", "position", "undo", "ByeBye", "keyframe", "delta")
+# maximum payload of the messages a client may send to the server
+CLIENT_MESSAGE_LIMITS = {"handshake": 4096, "position": 8, "undo": 0, "ByeBye": 0}
+_TYPE_IDS = {name: num for num, name in enumerate(MESSAGE_TYPES)}
+
+_INT = struct.Struct("<i")
+_TWO_INTS = struct.Struct("<ii")
+_BOARD = struct.Struct("<IIB")  # height, width, itemsize of "owner"
+_SEQ = struct.Struct("<I")  # sequence number of a "keyframe"
+_DELTA = struct.Struct("<IIB")  # sequence number, number of cells, itemsize of "owner"
+_SERIES = struct.Struct("<iII")  # winner, number of points, number of players
+_OWNER_DTYPES = {1: np.dtype("<i1"), 2: np.dtype("<i2")}
+
+
+class ProtocolError(ValueError):
+    """Raised when a message can not be encoded or decoded."""
+
+
+def negotiate(offer: Dict[str, Any] | None) -> Dict[str, Any]:
+    """Returns the protocol version and capabilities supported by both sides.
+
+    Args:
+        offer: Version and capabilities offered by the peer, None for peers which
+          did not offer any (only the basic messages of version 1 are used).
+
+    Returns:
+        Agreed "version" and "capabilities".
+    """
+    if not offer:
+        return {"version": 1, "capabilities": []}
+    version = min(int(offer.get("version", 1)), PROTOCOL_VERSION)
+    capabilities = [name for name in CAPABILITIES if name in offer.get("capabilities", [])]
+    return {"version": version, "capabilities": capabilities}
+
+
+def offer() -> Dict[str, Any]:
+    """Returns the version and capabilities offered with the handshake."""
+    return {"version": PROTOCOL_VERSION, "capabilities": list(CAPABILITIES)}
+
+
+def encode(data: Tuple[str, Any]) -> bytes:
+    """Encodes a message including its header.
+
+    Args:
+        data: Message type and content.
+
+    Returns:
+        Bytes to be send.
+    """
+    msg_type, content = data
+    if msg_type not in _TYPE_IDS:
+        raise ProtocolError(f"Unknown message type {msg_type!r}")
+    payload = _ENCODERS[msg_type](content)
+    return HEADER.pack(PROTOCOL_VERSION, _TYPE_IDS[msg_type], len(payload)) + payload
+
+
+def decode_header(header: bytes) -> Tuple[int, int]:
+    """Returns the message type id and the payload length of a header."""
+    version, type_id, length = HEADER.unpack(header)
+    if (version == 0) or (version > PROTOCOL_VERSION):
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    if type_id >= len(MESSAGE_TYPES):
+        raise ProtocolError(f"Unknown message type id {type_id}")
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Payload of {length} bytes is too large")
+    return type_id, length
+
+
+def decode(type_id: int, payload: bytes | memoryview,
+           from_client: bool = False) -> Tuple[str, Any]:
+    """Decodes the payload of a message.
+
+    Args:
+        type_id: Message type id from the header.
+        payload: Payload of the message.
+        from_client: Wether the message was send by a client (decoded by the server).
+          Defaults to False.
+
+    Returns:
+        Message type and content.
+    """
+    msg_type = MESSAGE_TYPES[type_id]
+    decoders = _CLIENT_DECODERS if from_client else _DECODERS
+    try:
+        return msg_type, decoders[msg_type](payload)
+    except ProtocolError:
+        raise
+    except (struct.error, ValueError, TypeError, KeyError, AttributeError) as err:
+        raise ProtocolError(f"Invalid {msg_type!r} message: {err}") from err
+
+
+def _encode_empty(content: None) -> bytes:
+    return b""
+
+
+def _decode_empty(payload: bytes | memoryview) -> None:
+    if len(payload):
+        raise ProtocolError("Unexpected payload")
+    return None
+
+
+def _encode_json(content: Any) -> bytes:
+    return json.dumps(content, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_server_handshake(payload: bytes | memoryview) -> Dict[str, Any]:
+    content = json.loads(bytes(payload).decode("utf-8"))
+    if not (isinstance(content, dict) and isinstance(content.get("nicknames"), dict)):
+        raise ProtocolError("Invalid server handshake")
+    # JSON keys are strings
+    content["nicknames"] = {int(num): name for num, name in content["nicknames"].items()}
+    return content
+
+
+def _decode_client_handshake(payload: bytes | memoryview) -> Tuple[Any, ...]:
+    content = json.loads(bytes(payload).decode("utf-8"))
+    if not (isinstance(content, list) and (len(content) in (3, 4))):
+        raise ProtocolError("Invalid client handshake")
+    # role, nickname, uuid and the offered protocol
+    _check_client_handshake(content)
+    return tuple(content)
+
+
+def _check_client_handshake(content: list) -> None:
+    """Raises "ProtocolError" if the fields of a client handshake have wrong types."""
+    role, nickname, client_uuid = content[:3]
+    if role not in ("player", "spectator"):
+        raise ProtocolError(f"Invalid role {role!r}")
+    if not ((nickname is None) or isinstance(nickname, str)):
+        raise ProtocolError("Invalid nickname")
+    if not isinstance(client_uuid, str):
+        raise ProtocolError("Invalid uuid")
+    if len(content) == 4:
+        offered = content[3]
+        if not (isinstance(offered, dict)
+                and isinstance(offered.get("version"), int)
+                and not isinstance(offered["version"], bool)
+                and isinstance(offered.get("capabilities"), list)
+                and all(isinstance(name, str) for name in offered["capabilities"])):
+            raise ProtocolError("Invalid protocol offer")
+
+
+def _encode_int(content: int) -> bytes:
+    return _INT.pack(int(content))
+
+
+def _decode_int(payload: bytes | memoryview) -> int:
+    return _INT.unpack(payload)[0]
+
+
+def _encode_two_ints(content: Tuple[int | None, int]) -> bytes:
+    first, second = content
+    return _TWO_INTS.pack(-1 if first is None else int(first), int(second))
+
+
+def _decode_position(payload: bytes | memoryview) -> Tuple[int, int]:
+    return _TWO_INTS.unpack(payload)
+
+
+def _decode_next_player(payload: bytes | memoryview) -> Tuple[int | None, int]:
+    player, round_num = _TWO_INTS.unpack(payload)
+    return (None if player < 0 else player), round_num
+
+
+def _owner_dtype(owner: np.ndarray) -> np.dtype:
+    return _OWNER_DTYPES[2 if owner.dtype.itemsize > 1 else 1]
+
+
+def encode_board(owner: np.ndarray, count: np.ndarray) -> bytes:
+    """Returns the payload of a board ("owner" and "count" arrays)."""
+    owner = np.asarray(owner)
+    owner = owner.astype(_owner_dtype(owner), copy=False)
+    count = np.asarray(count).astype(np.uint8, copy=False)
+    height_num, width_num = owner.shape
+    return (_BOARD.pack(height_num, width_num, owner.dtype.itemsize)
+            + owner.tobytes() + count.tobytes())
+
+
+def decode_board(payload: bytes | memoryview) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the (read-only) "owner" and "count" arrays of a board payload."""
+    height_num, width_num, itemsize = _BOARD.unpack_from(payload)
+    cell_num = height_num * width_num
+    if (itemsize not in _OWNER_DTYPES) or (len(payload) != _BOARD.size + cell_num * (itemsize + 1)):
+        raise ProtocolError("Invalid board size")
+    owner = np.frombuffer(payload, dtype=_OWNER_DTYPES[itemsize], count=cell_num,
+                          offset=_BOARD.size)
+    count = np.frombuffer(payload, dtype=np.uint8, count=cell_num,
+                          offset=_BOARD.size + cell_num * itemsize)
+    return owner.reshape(height_num, width_num), count.reshape(height_num, width_num)
+
+
+def _encode_board(content: Tuple[np.ndarray, np.ndarray]) -> bytes:
+    return encode_board(*content)
+
+
+def _encode_keyframe(content: Tuple[int, np.ndarray, np.ndarray]) -> bytes:
+    seq, owner, count = content
+    return _SEQ.pack(seq) + encode_board(owner, count)
+
+
+def _decode_keyframe(payload: bytes | memoryview) -> Tuple[int, np.ndarray, np.ndarray]:
+    (seq,) = _SEQ.unpack_from(payload)
+    return (seq, *decode_board(memoryview(payload)[_SEQ.size:]))
+
+
+def board_delta(previous: Tuple[np.ndarray, np.ndarray], board: Tuple[np.ndarray, np.ndarray]
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the changes from "previous" to "board".
+
+    Args:
+        previous: "Owner" and "count" arrays of the last board.
+        board: "Owner" and "count" arrays of the new board (same shape).
+
+    Returns:
+        cells: Flat indices of the changed positions in ascending order.
+        owner: New "owner" of the changed positions.
+        count: New number of circles at the changed positions.
+    """
+    owner, count = np.ravel(board[0]), np.ravel(board[1])
+    changed = (owner != np.ravel(previous[0])) | (count != np.ravel(previous[1]))
+    cells = np.flatnonzero(changed)
+    return cells, owner[cells], count[cells]
+
+
+def apply_delta(board: Tuple[np.ndarray, np.ndarray], cells: np.ndarray,
+                owner: np.ndarray, count: np.ndarray) -> None:
+    """Writes the changes of a "delta" message into "board" (in place)."""
+    np.put(board[0], cells, owner)
+    np.put(board[1], cells, count)
+
+
+def _encode_delta(content: Tuple[int, np.ndarray, np.ndarray, np.ndarray]) -> bytes:
+    seq, cells, owner, count = content
+    owner = np.asarray(owner)
+    owner = owner.astype(_owner_dtype(owner), copy=False)
+    return (_DELTA.pack(seq, len(cells), owner.dtype.itemsize)
+            + np.asarray(cells).astype("<u4", copy=False).tobytes()
+            + owner.tobytes() + np.asarray(count).astype(np.uint8, copy=False).tobytes())
+
+
+def _decode_delta(payload: bytes | memoryview
+                  ) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    seq, cell_num, itemsize = _DELTA.unpack_from(payload)
+    if (itemsize not in _OWNER_DTYPES) or (len(payload) != _DELTA.size + cell_num * (5 + itemsize)):
+        raise ProtocolError("Invalid delta size")
+    offset = _DELTA.size
+    cells = np.frombuffer(payload, dtype="<u4", count=cell_num, offset=offset)
+    offset += 4 * cell_num
+    owner = np.frombuffer(payload, dtype=_OWNER_DTYPES[itemsize], count=cell_num, offset=offset)
+    offset += itemsize * cell_num
+    count = np.frombuffer(payload, dtype=np.uint8, count=cell_num, offset=offset)
+    return seq, cells, owner, count
+
+
+def _encode_finished(content: Tuple[int, TimeSeries]) -> bytes:
+    winner, series = content
+    x = np.asarray(series.x, dtype="<f8")
+    totals = np.asarray(series.totals, dtype="<i4")
+    point_num, player_num = totals.shape
+    return _SERIES.pack(int(winner), point_num, player_num) + x.tobytes() + totals.tobytes()
+
+
+def _decode_finished(payload: bytes | memoryview) -> Tuple[int, TimeSeries]:
+    winner, point_num, player_num = _SERIES.unpack_from(payload)
+    if len(payload) != _SERIES.size + point_num * (8 + 4 * player_num):
+        raise ProtocolError("Invalid time line size")
+    x = np.frombuffer(payload, dtype="<f8", count=point_num, offset=_SERIES.size)
+    totals = np.frombuffer(payload, dtype="<i4", count=point_num * player_num,
+                           offset=_SERIES.size + 8 * point_num)
+    return winner, TimeSeries(x, totals.reshape(point_num, player_num))
+
+
+_ENCODERS = {"handshake": _encode_json,
+             "your number": _encode_int,
+             "spectator": _encode_empty,
+             "next player": _encode_two_ints,
+             "board": _encode_board,
+             "finished": _encode_finished,
+             "position": _encode_two_ints,
+             "undo": _encode_empty,
+             "ByeBye": _encode_empty,
+             "keyframe": _encode_keyframe,
+             "delta": _encode_delta}
+
+_DECODERS = {"handshake": _decode_server_handshake,
+             "your number": _decode_int,
+             "spectator": _decode_empty,
+             "next player": _decode_next_player,
+             "board": decode_board,
+             "finished": _decode_finished,
+             "position": _decode_position,
+             "undo": _decode_empty,
+             "ByeBye": _decode_empty,
+             "keyframe": _decode_keyframe,
+             "delta": _decode_delta}
+# messages send by clients, see "decode"
+_CLIENT_DECODERS = {**_DECODERS, "handshake": _decode_client_handshake}
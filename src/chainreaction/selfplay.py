@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Plays many games between computer players on all cores for bot tuning.
+
+The games are split into chunks which are played by a "ProcessPoolExecutor". The
+workers write their results and final boards straight into shared memory created
+by "run_selfplay", only the small chunk descriptions are pickled. Chunks are seeded
+by their first game, so with a fixed "chunk_size" the results do not depend on the
+number of workers.
+"""
+
+
+from __future__ import annotations
+from typing import NamedTuple, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from chainreaction.batch_rules import Batchcalc
+from chainreaction.game_rules import Gamecalc
+from chainreaction.bot import Bot
+
+
+POLICIES = ("random", "bot")
+
+# columns of the shared "results" array
+WINNER = 0
+MOVES = 1
+WAVES = 2
+MAX_WAVES = 3
+
+
+class SelfplayStats(NamedTuple):
+    """Aggregated results of "run_selfplay".
+
+    Attributes:
+        game_num: Number of games played.
+        wins: Number of wins of every "player_number".
+        unfinished: Number of games stopped by "max_moves".
+        average_length: Average number of moves per game.
+        average_waves: Average number of waves per move.
+        max_waves: Longest "chain reaction" (in waves) of all games.
+        results: "Winner" ("-1" if unfinished), moves, waves and longest "chain reaction"
+          of every game (games x 4).
+        owner: Final "owner" of every game (games x cells).
+        count: Final number of circles of every game (games x cells).
+    """
+    game_num: int
+    wins: np.ndarray
+    unfinished: int
+    average_length: float
+    average_waves: float
+    max_waves: int
+    results: np.ndarray
+    owner: np.ndarray
+    count: np.ndarray
+
+    @property
+    def win_rates(self) -> np.ndarray:
+        """Share of the games won by every "player_number"."""
+        return self.wins / max(self.game_num, 1)
+
+
+class _Chunk(NamedTuple):
+    """Description of the games played by one task of the pool."""
+    start: int
+    stop: int
+    seed: int
+    policy: str
+    player_num: int
+    width_num: int
+    height_num: int
+    max_moves: int
+    time_budget: float
+    shm_names: Tuple[str, str, str]
+    game_num: int
+
+
+def _attach(chunk: _Chunk) -> Tuple[Tuple[shared_memory.SharedMemory, ...], Tuple[np.ndarray, ...]]:
+    """Attaches the shared "results", "owner" and "count" arrays of all games."""
+    cell_num = chunk.width_num * chunk.height_num
+    specs = (((chunk.game_num, 4), np.int64), ((chunk.game_num, cell_num), np.int16),
+             ((chunk.game_num, cell_num), np.uint8))
+    blocks = tuple(shared_memory.SharedMemory(name=name) for name in chunk.shm_names)
+    arrays = tuple(np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                   for block, (shape, dtype) in zip(blocks, specs))
+    return blocks, arrays
+
+
+def _play_random(chunk: _Chunk, results: np.ndarray, owner: np.ndarray,
+                 count: np.ndarray) -> None:
+    """Plays the games of "chunk" with random valid moves, all at once on a "Batchcalc"."""
+    rng = np.random.default_rng([chunk.seed, chunk.start])
+    game_num = chunk.stop - chunk.start
+    batch = Batchcalc(game_num, chunk.player_num, chunk.width_num, chunk.height_num)
+    moves = np.zeros(game_num, dtype=np.int64)
+    waves = np.zeros(game_num, dtype=np.int64)
+    max_waves = np.zeros(game_num, dtype=np.int64)
+    for _ in range(chunk.max_moves):
+        valid = batch.valid_moves()
+        playing = valid.any(axis=1)
+        if not playing.any():
+            break
+        scores = rng.random(valid.shape)
+        scores[~valid] = -1
+        move = np.argmax(scores, axis=1)
+        move[~playing] = -1
+        step_waves = batch.step(move)
+        moves += step_waves > 0
+        waves += step_waves
+        np.maximum(max_waves, step_waves, out=max_waves)
+    games = slice(chunk.start, chunk.stop)
+    results[games, WINNER] = batch.winner
+    results[games, MOVES] = moves
+    results[games, WAVES] = waves
+    results[games, MAX_WAVES] = max_waves
+    owner[games] = batch.owner
+    count[games] = batch.count
+
+
+def _play_bot(chunk: _Chunk, results: np.ndarray, owner: np.ndarray,
+              count: np.ndarray) -> None:
+    """Plays the games of "chunk" one after another between "Bot" players."""
+    for game_idx in range(chunk.start, chunk.stop):
+        game = Gamecalc(chunk.player_num, chunk.width_num, chunk.height_num, 0, None, None, None)
+        bots = [Bot(num, chunk.player_num, chunk.width_num, chunk.height_num,
+                    time_budget=chunk.time_budget) for num in range(chunk.player_num)]
+        moves = waves = max_waves = 0
+        while (game.winner is None) and (moves < chunk.max_moves):
+            move_waves = game.apply_move(bots[game.player_to_move()].choose_move(game))
+            game.clear_undo()
+            moves += 1
+            waves += move_waves
+            max_waves = max(max_waves, move_waves)
+        results[game_idx] = (-1 if game.winner is None else game.winner, moves, waves, max_waves)
+        owner[game_idx] = game.owner.reshape(-1)
+        count[game_idx] = game.count.reshape(-1)
+
+
+def _play_chunk(chunk: _Chunk) -> None:
+    """Plays the games of "chunk" in a worker and writes them to shared memory."""
+    blocks, arrays = _attach(chunk)
+    try:
+        if chunk.policy == "bot":
+            _play_bot(chunk, *arrays)
+        else:
+            _play_random(chunk, *arrays)
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def run_selfplay(game_num: int, player_num: int, width_num: int, height_num: int,
+                 policy: str = "random", workers: int | None = None, seed: int = 0,
+                 max_moves: int | None = None, time_budget: float = 0.05,
+                 chunk_size: int | None = None) -> SelfplayStats:
+    """Plays "game_num" games in parallel and aggregates the results.
+
+    Args:
+        game_num: Number of games.
+        player_num: Number of players per game.
+        width_num: Number of boxes in x-direction.
+        height_num: Number of boxes in y-direction.
+        policy: "random" for random valid moves or "bot" for "Bot" players.
+          Defaults to "random".
+        workers: Number of processes, defaults to the number of cores.
+        seed: Seed of the random moves. Defaults to "0".
+        max_moves: Games are stopped unfinished after this number of moves. Defaults
+          to ten moves per position.
+        time_budget: Time in s per move of the "Bot" players. Defaults to 0.05.
+        chunk_size: Games per task, defaults to four tasks per worker.
+
+    Returns:
+        Aggregated results of all games.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+    workers = workers or os.cpu_count() or 1
+    cell_num = width_num * height_num
+    if max_moves is None:
+        max_moves = 10 * cell_num
+    if chunk_size is None:
+        chunk_size = max(1, -(-game_num // (4 * workers)))
+
+    specs = (((game_num, 4), np.int64), ((game_num, cell_num), np.int16),
+             ((game_num, cell_num), np.uint8))
+    blocks = [shared_memory.SharedMemory(create=True,
+                                         size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+              for shape, dtype in specs]
+    try:
+        arrays = [np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                  for block, (shape, dtype) in zip(blocks, specs)]
+        chunks = [_Chunk(start, min(start + chunk_size, game_num), seed, policy, player_num,
+                         width_num, height_num, max_moves, time_budget,
+                         tuple(block.name for block in blocks), game_num)
+                  for start in range(0, game_num, chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(_play_chunk, chunks):
+                pass
+        results, owner, count = (array.copy() for array in arrays)
+        del arrays
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    finished = results[:, WINNER] >= 0
+    moves = results[:, MOVES].sum()
+    return SelfplayStats(game_num=game_num,
+                         wins=np.bincount(results[finished, WINNER], minlength=player_num),
+                         unfinished=int(game_num - finished.sum()),
+                         average_length=float(results[:, MOVES].mean()) if game_num else 0.0,
+                         average_waves=float(results[:, WAVES].sum() / moves) if moves else 0.0,
+                         max_waves=int(results[:, MAX_WAVES].max(initial=0)),
+                         results=results, owner=owner, count=count)
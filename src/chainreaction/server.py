@@ -19,11 +19,40 @@ import logging
 
 from chainreaction.network import Network_s
 from chainreaction.game_rules import Gamecalc
+from chainreaction.topology import board_tables
 from chainreaction.server_gui import server_gui, server_gui_restart
 from chainreaction.configfile import load_config_s
 from chainreaction.loggingsetup import setup_logging, formatted_traceback
 
 
+TIME_LINE_POINTS = 1000  # maximum number of points of the "time line" send at the end
+
+
+def _player_left(server: Network_s, game: Gamecalc, player: Dict[socket.socket, int],
+                 nicknames: Dict[int, str], connection: socket.socket, round_num: int) -> None:
+    """Eliminates the player of a closed connection.
+
+    The undo history is dropped (moves of players who left can not be undone), the
+    last remaining player wins and the other connections are told who is next.
+
+    Args:
+        server: Main class for dealing with sending and recieving of data via sockets.
+        game: Class containing the game logic.
+        player: Connects the socket to their respective "player_number".
+        nicknames: Connects "player_number" to the respective player nicknames.
+        connection: Closed connection of the player.
+        round_num: Current round number.
+    """
+    print(f"Closed conncetion to player {nicknames[player[connection]]}")
+    game.set_eliminated(player[connection])
+    game.clear_undo()  # can not undo moves of players who left
+    player.pop(connection)
+    if len(player) == 1:
+        game.winner = list(player.values())[0]
+    others = [conn for conn in server.connections if conn != connection]
+    server.broadcast(others, ("next player", (game.player_to_move(), round_num)))
+
+
 def _game_loop(logger: logging.Logger, session_uuid: str, conn_uuid: Dict[socket.socket, str],
                server: Network_s, game: Gamecalc, player: Dict[socket.socket, int], nicknames: Dict[int, str],
                handshake_dict: Dict[str, Any]) -> None:
@@ -47,16 +76,21 @@ def _game_loop(logger: logging.Logger, session_uuid: str, conn_uuid: Dict[socket
     """
     logger.debug("Game loop started!", extra={"session_uuid": session_uuid})
     round_num = 0
-    last_round_num = round_num
+    announce_next = False  # "next player" is send after the waves of the last move
+    wait = None
     run = True
     while run:
         pos_l = []
         # Game loop
         connections = server.connections
+        timeout = 0.5 if wait is None else min(0.5, wait)
         readable, writable, errored = select.select(connections + [server.server],
-                                                    connections, connections, 0.5)
+                                                    connections, connections, timeout)
+        server.flush(writable)
 
         for read in readable:
+            if (read != server.server) and (read not in server.connections):
+                continue  # closed while sending, see "pop_dropped"
             if read == server.server:
                 conn, addr = server.accept_connection(False)
                 print(f"New connection to {conn}, {addr}")
@@ -64,106 +98,133 @@ def _game_loop(logger: logging.Logger, session_uuid: str, conn_uuid: Dict[socket
                              extra={"session_uuid": session_uuid})
                 continue
 
-            msg = server.recieve(read)
-            if (msg[0] == "ByeBye") or (msg[0] == None):
-                if player.get(read, 'spectator') != "spectator":
-                    print(f"Closed conncetion to player {nicknames[player[read]]}")
-                    game.set_eliminated(player[read])
-                    game.set_state_for_undo()
-                    last_round_num = round_num
-                    player.pop(read)
-                    writable.remove(read)
-                    if len(player) == 1:
-                        game.winner = list(player.values())[0]
-                    for write in writable:
-                        server.send(write, ("next player", (game.player_to_move(),
-                                                            round_num)))
-                else:
-                    print(f"Closed conncetion to spectator at {read}")
-                server.close_connection(read)
-                logger.debug("Connection closed",
-                             extra={"session_uuid": session_uuid,
-                                    "client_uuid": conn_uuid.pop(read),
-                                    "next_player": game.player_to_move(),
-                                    "round_num": round_num,
-                                    "alive": game.player_alive,
-                                    "counter": game._counter,
-                                    "recieved": msg[0]})
-
-            elif msg[0] == "position":
-                pos = msg[1]
-                logger.debug("Recieved position",
-                             extra={"session_uuid": session_uuid,
-                                    "client_uuid": conn_uuid[read],
-                                    "position": pos})
-                if player.get(read, "spectator") == game.player_to_move():
-                    pos_val, pos_player = game.get_pos(pos[0], pos[1], False, True)
-                    if (pos_player == game.player_to_move()) or (pos_val == 0):
-                        pos_l = [pos]
-
-            elif msg[0] == "undo":
-                logger.debug("Recieved undo",
-                             extra={"session_uuid": session_uuid,
-                                    "client_uuid": conn_uuid[read]})
-                if player.get(read, "spectator") != "spectator":
-                    round_num = last_round_num
-                    game.undo(writable, round_num)
-
-            elif msg[0] == "handshake":
-                logger.info("Added spectator",
-                            extra={"session_uuid": session_uuid,
-                                   "client_uuid": msg[1][2]})
-                conn_uuid[read] = msg[1][2]
-                server.send(conn, ("handshake", handshake_dict))
-                server.send(conn, ("spectator", None))
+            for msg in server.recieve(read):
+                if (msg[0] == "ByeBye") or (msg[0] == None):
+                    if player.get(read, 'spectator') != "spectator":
+                        _player_left(server, game, player, nicknames, read, round_num)
+                    else:
+                        print(f"Closed conncetion to spectator at {read}")
+                    server.close_connection(read)
+                    logger.debug("Connection closed",
+                                 extra={"session_uuid": session_uuid,
+                                        "client_uuid": conn_uuid.pop(read, None),
+                                        "next_player": game.player_to_move(),
+                                        "round_num": round_num,
+                                        "alive": game.player_alive,
+                                        "counter": game._counter,
+                                        "recieved": msg[0]})
+                    break  # messages after "ByeBye" are dropped
+
+                elif msg[0] == "position":
+                    pos = msg[1]
+                    logger.debug("Recieved position",
+                                 extra={"session_uuid": session_uuid,
+                                        "client_uuid": conn_uuid[read],
+                                        "position": pos})
+                    if server.has_scheduled():
+                        # waves of the last move are still shown
+                        pass
+                    elif not ((0 <= pos[0] < game.height_num) and (0 <= pos[1] < game.width_num)):
+                        logger.warning("Recieved position outside of the board",
+                                       extra={"session_uuid": session_uuid,
+                                              "client_uuid": conn_uuid[read],
+                                              "position": pos})
+                    elif player.get(read, "spectator") == game.player_to_move():
+                        pos_val, pos_player = game.get_pos(pos[0], pos[1], get_player=True)
+                        blocked = game.tables.blocked[pos[0] * game.width_num + pos[1]]
+                        if ((pos_player == game.player_to_move()) or (pos_val == 0)) and not blocked:
+                            pos_l = [pos]
+
+                elif msg[0] == "undo":
+                    logger.debug("Recieved undo",
+                                 extra={"session_uuid": session_uuid,
+                                        "client_uuid": conn_uuid[read]})
+                    if player.get(read, "spectator") != "spectator":
+                        server.clear_scheduled()
+                        announce_next = False
+                        undone_round_num = game.undo(list(server.connections))
+                        if undone_round_num is not None:
+                            round_num = undone_round_num
+
+                elif msg[0] == "handshake":
+                    logger.info("Added spectator",
+                                extra={"session_uuid": session_uuid,
+                                       "client_uuid": msg[1][2]})
+                    conn_uuid[read] = msg[1][2]
+                    server.add_peer(read, msg[1])
+                    server.send_handshake(read, handshake_dict)
+                    server.send(read, ("spectator", None))
+                    server.send_keyframe(read)
 
-            else:
-                logger.warning("Recieved unknown msg",
-                               extra={"session_uuid": session_uuid,
-                                      "client_uuid": conn_uuid[read],
-                                      "recieved": msg})
+                else:
+                    logger.warning("Recieved unknown msg",
+                                   extra={"session_uuid": session_uuid,
+                                          "client_uuid": conn_uuid[read],
+                                          "recieved": msg})
 
         for error in errored:
+            if error not in server.connections:
+                continue  # already closed
+            server.close_connection(error)
             if player.get(error, 'spectator') == "spectator":
                 print(f"Closed conncetion to spectator at {error}")
             else:
-                print(f"Closed conncetion to player {nicknames[player[error]]}")
-                player.pop(error)
-                if len(player) == 1:
-                    game.winner = list(player.values())[0]
+                _player_left(server, game, player, nicknames, error, round_num)
             logger.error("Connection failed!",
                          extra={"session_uuid": session_uuid,
-                                "client_uuid": conn_uuid.pop(error)})
-            server.close_connection(error)
+                                "client_uuid": conn_uuid.pop(error, None)})
 
         if pos_l:
             logger.debug("Make move", extra={"session_uuid": session_uuid,
                                              "player_to_move": game.player_to_move(),
                                              "round_num": round_num,
                                              "move": pos_l[0]})
-            game.set_state_for_undo()
-            last_round_num = round_num
-            game.update_player(game.player_to_move(), pos_l, [1], writable, round_num)
+            game.set_state_for_undo(round_num)
+            frames = game.update_player(game.player_to_move(), pos_l, [1], None, round_num,
+                                        as_board=True)
+            server.schedule_broadcast([("board", frame) for frame in frames],
+                                      game.reaction_time_step)
+            logger.debug("Send positions", extra={"session_uuid": session_uuid,
+                                                  "waves": len(frames),
+                                                  "positions": frames[-1]})
 
             if game.winner is None:
                 round_num += 1
-                for write in writable:
-                    server.send(write, ("next player", (game.player_next_to_move(), round_num)))
                 logger.debug("Next player", extra={"session_uuid": session_uuid,
                                                    "next_player": game.player_next_to_move(),
                                                    "round_num": round_num})
                 game.increase_counter()
-
-        if game.winner is not None:
+                announce_next = True
+
+        wait = server.send_scheduled()
+        if announce_next and wait is None:
+            # queued for all connections, also for those which are not writable now
+            server.broadcast(server.connections, ("next player", (game.player_to_move(),
+                                                                  round_num)))
+            announce_next = False
+
+        # connections closed by "server" while sending (errors or too slow)
+        for dropped in server.pop_dropped():
+            if player.get(dropped, "spectator") == "spectator":
+                print(f"Closed conncetion to spectator at {dropped}")
+            else:
+                _player_left(server, game, player, nicknames, dropped, round_num)
+            logger.warning("Connection dropped while sending!",
+                           extra={"session_uuid": session_uuid,
+                                  "client_uuid": conn_uuid.pop(dropped, None),
+                                  "next_player": game.player_to_move(),
+                                  "round_num": round_num})
+
+        if (game.winner is not None) and (wait is None):
+            time_series = game.time_line.downsample(TIME_LINE_POINTS)
             logger.info("Game finished!",
                         extra={"session_uuid": session_uuid,
                                "winner": game.winner,
-                               "time_line": game.time_line})
-            for write in writable:
-                server.send(write, ("finished", (game.winner, game.time_line)))
-                time.sleep(0.2)
-                server.close_connection(write)
-                conn_uuid.pop(write)
+                               "time_line": time_series.to_lists()})
+            server.broadcast(server.connections, ("finished", (game.winner, time_series)))
+            time.sleep(0.2)
+            server.close_all(linger=1.0)
+            conn_uuid.clear()
             run = False
 
 
@@ -207,8 +268,12 @@ def _main(session_uuid: str, logger: logging.Logger) -> None:
     logger.debug("Inputs", extra={"session_uuid": session_uuid,
                                   "s_inputs": s_inputs})
 
+    s_inputs["topology"] = config["topology"]
+
     # initial handshake
-    server = Network_s(s_inputs["ip"], s_inputs["port"], logger, session_uuid)
+    server = Network_s(s_inputs["ip"], s_inputs["port"], logger, session_uuid,
+                       queue_limit=config["send_queue_limit"],
+                       slow_client=config["slow_client"])
 
     if not server.bind_address(2):
         sys.exit()
@@ -220,13 +285,31 @@ def _main(session_uuid: str, logger: logging.Logger) -> None:
         # restart loop
         logger.debug("restart", extra={"session_uuid": session_uuid})
 
+        # blocked positions outside of the (restarted) board are ignored
+        s_inputs["blocked"] = [(row, column) for row, column in config["blocked"]
+                               if (0 <= row < s_inputs["height"])
+                               and (0 <= column < s_inputs["width"])]
+        # validated before any client joins
+        try:
+            tables = board_tables(s_inputs["height"], s_inputs["width"], s_inputs["topology"],
+                                  tuple(s_inputs["blocked"]))
+        except ValueError as err:
+            print(f"Blocked cells are ignored: {err}")
+            logger.warning("Invalid blocked cells, ignored!",
+                           extra={"session_uuid": session_uuid,
+                                  "blocked": s_inputs["blocked"],
+                                  "traceback": formatted_traceback(err)})
+            s_inputs["blocked"] = []
+            tables = board_tables(s_inputs["height"], s_inputs["width"], s_inputs["topology"])
         nicknames, player, handshake_dict, conn_uuid = server.handshake(s_inputs)
         logger.info("Handshake done!", extra={"session_uuid": session_uuid})
 
         # start game
         game = Gamecalc(s_inputs["player_num"], s_inputs["width"],
                         s_inputs["height"], config["reaction_time_step"],
-                        server, logger, session_uuid)
+                        server, logger, session_uuid, engine=config["engine"],
+                        undo_limit=config["undo_limit"], storage=config["storage"],
+                        tables=tables)
 
         _game_loop(logger, session_uuid, conn_uuid, server, game, player,
                   nicknames, handshake_dict)
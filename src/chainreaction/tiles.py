@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the "TileSpreader" class, which calculates the waves of the "tiled" engine in parallel.
+
+The board is split into tiles of whole rows, so every tile is a contiguous range of
+flat indices. Every wave runs in two steps on a thread pool:
+
+1. "explode": Every tile removes the circles of its "exploding" positions, looks up
+   their neighbors and sorts them. Neighbors outside of the tile (the "halo") are
+   found by their position in the sorted array and handed to the tile they belong to.
+2. "apply": Every tile merges the sorted neighbors it recieved from its own and the
+   other tiles, counts the circles of every position, adds them to the board, finds
+   its changed and overloaded positions and their share of the "totals" and the hash.
+
+Both steps are large NumPy operations (gather, sort, scatter), which release the GIL,
+so the tiles are processed at the same time. The tiles write disjoint ranges of the
+board and are joined in order, so the result is exactly the result of the serial
+"numpy" engine. Only the joining of the tiles (a concatenation and a few sums per
+wave) is left serial.
+"""
+
+
+from __future__ import annotations
+from typing import Any, Callable, Iterable, List, NamedTuple, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+
+import numpy as np
+
+from chainreaction.topology import BoardTables
+from chainreaction.zobrist import ZobristKeys
+
+
+@functools.lru_cache(maxsize=4)
+def thread_pool(workers: int) -> ThreadPoolExecutor:
+    """Returns a thread pool with "workers" threads, shared by all games."""
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chainreaction-tile")
+
+
+class TileStep(NamedTuple):
+    """Result of the "apply" step of one tile.
+
+    Attributes:
+        changed: Flat indices of the positions of the tile which changed with the wave.
+        last_owner: "Owner" of the changed positions at the last wave.
+        last_count: Number of circles at the changed positions at the last wave.
+        overloaded: Flat indices of the positions which "explode" with the next wave.
+        totals: Change of the number of circles of every player.
+        board_hash: Change of the hash of the board (XOR).
+        key: Key of the positions of the tile which recieved circles, see
+          "ZobristKeys.cells_key".
+    """
+    changed: np.ndarray
+    last_owner: np.ndarray
+    last_count: np.ndarray
+    overloaded: np.ndarray
+    totals: np.ndarray
+    board_hash: int
+    key: int
+
+
+class TileSpreader():
+    """Calculates the waves of the "tiled" engine tile by tile."""
+    def __init__(self, tables: BoardTables, height_num: int, width_num: int,
+                 workers: int | None = None, min_cells: int = 4096) -> None:
+        """Initializes the instance.
+
+        Args:
+            tables: Topology of the board.
+            height_num: Number of boxes in y-direction.
+            width_num: Number of boxes in x-direction.
+            workers: Number of threads and tiles, defaults to the number of cores.
+            min_cells: Waves with fewer "exploding" positions are calculated as one tile
+              without the thread pool, where it would only add overhead. Defaults to "4096".
+        """
+        self.tables = tables
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.min_cells = int(min_cells)
+        tile_num = min(self.workers, height_num)
+        rows = -(-height_num // tile_num)
+        self.bounds = np.minimum(np.arange(tile_num + 1) * rows, height_num) * width_num
+        self.tile_num = len(self.bounds) - 1
+        self._whole = np.array([0, height_num * width_num])
+
+    def tile_bounds(self, size: int) -> np.ndarray:
+        """Returns the bounds of the tiles of a wave with "size" "exploding" positions.
+
+        Small waves are calculated as one tile covering the whole board.
+        """
+        if (size < self.min_cells) or (self.tile_num == 1):
+            return self._whole
+        return self.bounds
+
+    def _map(self, function: Callable[[Any], Any], items: Iterable[Any], tile_num: int) -> List[Any]:
+        """Calls "function" for every tile, on the thread pool if there is more than one."""
+        if tile_num == 1:
+            return [function(item) for item in items]
+        return list(thread_pool(self.workers).map(function, items))
+
+    def explode(self, owner: np.ndarray, count: np.ndarray, overloaded: np.ndarray,
+                bounds: np.ndarray) -> Tuple[List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                                             List[np.ndarray]]:
+        """Removes the circles of the "overloaded" positions and spreads them (step 1).
+
+        Args:
+            owner: Flat "owner" array of the board, changed in-place.
+            count: Flat "count" array of the board, changed in-place.
+            overloaded: Flat indices of the "exploding" positions in ascending order.
+            bounds: Bounds of the tiles, see "tile_bounds".
+
+        Returns:
+            emptied: "Exploding" positions of every tile with their "owner" and number
+              of circles before the "explosion".
+            runs: Sorted neighbors of the "exploding" positions of every tile, one entry
+              per circle handed to a neighbor.
+        """
+        starts = np.searchsorted(overloaded, bounds)
+        parts = [overloaded[starts[tile]:starts[tile + 1]] for tile in range(len(bounds) - 1)]
+        exploded = self._map(functools.partial(self._explode_tile, owner, count), parts,
+                             len(parts))
+        emptied = [(cells, emptied_owner, emptied_count)
+                   for cells, (emptied_owner, emptied_count, _) in zip(parts, exploded)]
+        return emptied, [neighbors for _, _, neighbors in exploded]
+
+    def _explode_tile(self, owner: np.ndarray, count: np.ndarray, cells: np.ndarray
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Explodes the "cells" of one tile, see "explode"."""
+        emptied_owner = owner[cells]
+        emptied_count = count[cells]
+        rest = emptied_count - self.tables.critical_mass[cells]
+        count[cells] = rest
+        owner[cells[rest == 0]] = -1
+        return emptied_owner, emptied_count, np.sort(self.tables.neighbors(cells))
+
+    def apply(self, owner: np.ndarray, count: np.ndarray, player: int, keys: ZobristKeys,
+              runs: List[np.ndarray], emptied: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+              bounds: np.ndarray) -> List[TileStep]:
+        """Adds the spread circles to the board (step 2).
+
+        The positions recieving circles are captured by "player".
+
+        Args:
+            owner: Flat "owner" array of the board, changed in-place.
+            count: Flat "count" array of the board, changed in-place.
+            player: "Player_number" of current player.
+            keys: Zobrist keys of the board.
+            runs: Sorted positions recieving one circle each, see "explode".
+            emptied: "Exploding" positions of every tile, see "explode".
+            bounds: Bounds of the tiles used by "explode".
+
+        Returns:
+            Result of every tile, in the order of the tiles.
+        """
+        splits = [np.searchsorted(run, bounds) for run in runs]
+        apply_tile = functools.partial(self._apply_tile, owner, count, player, keys, runs,
+                                       splits)
+        return self._map(lambda tile: apply_tile(tile, *emptied[tile]), range(len(bounds) - 1),
+                         len(bounds) - 1)
+
+    def _apply_tile(self, owner: np.ndarray, count: np.ndarray, player: int, keys: ZobristKeys,
+                    runs: List[np.ndarray], splits: List[np.ndarray], tile: int,
+                    emptied: np.ndarray, emptied_owner: np.ndarray,
+                    emptied_count: np.ndarray) -> TileStep:
+        """Adds the circles of one tile, see "apply" and "Gamecalc._waves_numpy"."""
+        recieved, incoming = _count_runs([run[split[tile]:split[tile + 1]]
+                                          for run, split in zip(runs, splits)])
+        # positions changed since the last wave with their values at the last wave
+        touched = np.union1d(emptied, recieved)
+        last_owner = owner[touched]
+        last_count = count[touched]
+        emptied_pos = np.searchsorted(touched, emptied)
+        last_owner[emptied_pos] = emptied_owner
+        last_count[emptied_pos] = emptied_count
+
+        new_count = count[recieved] + incoming
+        owner[recieved] = player
+        count[recieved] = new_count
+        differs = (owner[touched] != last_owner) | (count[touched] != last_count)
+        changed = touched[differs]
+        last_owner = last_owner[differs]
+        last_count = last_count[differs]
+        changed_owner = owner[changed]
+        changed_count = count[changed]
+
+        player_num = keys.player_num
+        occupied = changed_owner >= 0
+        totals = np.bincount(changed_owner[occupied], weights=changed_count[occupied],
+                             minlength=player_num)
+        occupied = last_owner >= 0
+        totals -= np.bincount(last_owner[occupied], weights=last_count[occupied],
+                              minlength=player_num)
+        board_hash = (keys.cells_hash(changed, last_owner, last_count)
+                      ^ keys.cells_hash(changed, changed_owner, changed_count))
+        overloaded = recieved[new_count >= self.tables.critical_mass[recieved]]
+        return TileStep(changed, last_owner, last_count, overloaded, totals.astype(int),
+                        board_hash, keys.cells_key(recieved))
+
+    def spread(self, emptied: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the positions recieving circles and the number of circles they recieve.
+
+        Args:
+            emptied: Flat indices of the "exploding" positions in ascending order.
+
+        Returns:
+            recieved: Flat indices of the recieving positions in ascending order.
+            incoming: Number of circles every recieving position gets.
+        """
+        if (emptied.size < self.min_cells) or (self.tile_num == 1):
+            return np.unique(self.tables.neighbors(emptied), return_counts=True)
+        pool = thread_pool(self.workers)
+        starts = np.searchsorted(emptied, self.bounds)
+        parts = [emptied[starts[tile]:starts[tile + 1]] for tile in range(self.tile_num)]
+        sorted_neighbors = list(pool.map(self._tile_neighbors, parts))
+        counted = list(pool.map(functools.partial(self._tile_count, sorted_neighbors),
+                                range(self.tile_num)))
+        recieved = np.concatenate([cells for cells, _ in counted])
+        incoming = np.concatenate([counts for _, counts in counted])
+        return recieved, incoming
+
+    def _tile_neighbors(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the sorted neighbors of "cells" and where every tile starts in them."""
+        neighbors = np.sort(self.tables.neighbors(cells))
+        return neighbors, np.searchsorted(neighbors, self.bounds)
+
+    def _tile_count(self, sorted_neighbors: List[Tuple[np.ndarray, np.ndarray]],
+                    tile: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Counts the circles recieved by the positions of "tile" from all tiles."""
+        return _count_runs([neighbors[splits[tile]:splits[tile + 1]]
+                            for neighbors, splits in sorted_neighbors])
+
+
+def _count_runs(runs: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Merges sorted runs of positions and counts how often every position occurs.
+
+    Returns:
+        Positions in ascending order and their number of occurrences.
+    """
+    runs = [run for run in runs if run.size]
+    if not runs:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    inside = np.concatenate(runs)
+    if len(runs) > 1:
+        # merges the sorted runs ("timsort" finds them)
+        inside.sort(kind="stable")
+    first = np.empty(inside.size, dtype=bool)
+    first[0] = True
+    np.not_equal(inside[1:], inside[:-1], out=first[1:])
+    starts = np.flatnonzero(first)
+    return inside[starts], np.diff(np.append(starts, inside.size))
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the "TimeLine" class, which records the game evolution ("time line").
+
+The number of circles of every player is recorded after every wave. Instead of one
+list per round and wave, the values are appended to a few arrays (round number,
+wave number and the circles of all players), which grow by doubling their capacity.
+For sending, logging and plotting "downsample" returns a "TimeSeries" with a bounded
+number of points, so the end-of-game message stays small even in long games.
+"""
+
+
+from __future__ import annotations
+from typing import Dict, List, NamedTuple, Any
+
+import numpy as np
+
+
+class TimeSeries(NamedTuple):
+    """Game evolution prepared for plotting.
+
+    Attributes:
+        x: Position of every point on the x-axis ("round_num" + fraction of the round).
+        totals: Number of circles of every player at every point (points x players).
+    """
+    x: np.ndarray
+    totals: np.ndarray
+
+    def to_lists(self) -> Dict[str, List[Any]]:
+        """Returns the series as lists, e.g. for logging it as JSON."""
+        return {"x": self.x.tolist(), "totals": self.totals.tolist()}
+
+
+class TimeLine():
+    """Append-only record of the number of circles of every player after every wave."""
+    def __init__(self, player_num: int, capacity: int = 64) -> None:
+        """Initializes an empty "time line".
+
+        Args:
+            player_num: Number of players.
+            capacity: Number of waves which can be recorded before the arrays grow.
+              Defaults to "64".
+        """
+        self.player_num = int(player_num)
+        capacity = max(1, int(capacity))
+        self._rounds = np.zeros(capacity, dtype=np.int32)
+        self._waves = np.zeros(capacity, dtype=np.int32)
+        self._totals = np.zeros((capacity, self.player_num), dtype=np.int32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, round_num: int) -> bool:
+        return bool(np.any(self.rounds == round_num))
+
+    def __getitem__(self, round_num: int) -> np.ndarray:
+        """Returns the number of circles of every player after every wave of a round (waves x players)."""
+        return self.totals[self.rounds == round_num]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TimeLine):
+            return NotImplemented
+        return (np.array_equal(self.rounds, other.rounds)
+                and np.array_equal(self.waves, other.waves)
+                and np.array_equal(self.totals, other.totals))
+
+    @property
+    def rounds(self) -> np.ndarray:
+        """Round number of every recorded wave."""
+        return self._rounds[:self._size]
+
+    @property
+    def waves(self) -> np.ndarray:
+        """Number of every recorded wave within its round."""
+        return self._waves[:self._size]
+
+    @property
+    def totals(self) -> np.ndarray:
+        """Number of circles of every player after every recorded wave (waves x players)."""
+        return self._totals[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes used by the arrays (including the unused capacity)."""
+        return self._rounds.nbytes + self._waves.nbytes + self._totals.nbytes
+
+    def append(self, round_num: int, wave: int, totals: np.ndarray) -> None:
+        """Records the number of circles of every player after a wave.
+
+        Args:
+            round_num: Round number of the move.
+            wave: Number of the wave within the move.
+            totals: Number of circles of every player.
+        """
+        if self._size == len(self._rounds):
+            self._grow(2 * self._size)
+        self._rounds[self._size] = round_num
+        self._waves[self._size] = wave
+        self._totals[self._size] = totals
+        self._size += 1
+
+    def _grow(self, capacity: int) -> None:
+        """Moves the recorded waves to arrays with "capacity" entries."""
+        for name in ("_rounds", "_waves", "_totals"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def pop(self, round_num: int) -> None:
+        """Removes all waves of a round (e.g. of an undone move)."""
+        keep = np.flatnonzero(self.rounds != round_num)
+        if len(keep) == self._size:
+            return
+        for name in ("_rounds", "_waves", "_totals"):
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self._size = len(keep)
+
+    def clear(self) -> None:
+        """Removes all recorded waves."""
+        self._size = 0
+
+    def downsample(self, max_points: int = 1000) -> TimeSeries:
+        """Returns the game evolution with at most "max_points" points.
+
+        The waves of a round are spread evenly over the round on the x-axis. If more
+        waves are recorded than "max_points", evenly spaced waves are selected, the
+        first and the last wave are always part of the series.
+
+        Args:
+            max_points: Maximum number of points. Defaults to "1000".
+
+        Returns:
+            Points of the game evolution.
+        """
+        rounds = self.rounds
+        if self._size == 0:
+            return TimeSeries(np.zeros(0), np.zeros((0, self.player_num), dtype=np.int32))
+        starts = np.flatnonzero(np.diff(rounds, prepend=rounds[0] - 1))
+        lengths = np.diff(np.append(starts, self._size))
+        wave_num = np.repeat(lengths, lengths)
+        step = np.arange(self._size) - np.repeat(starts, lengths)
+        x = rounds + step / wave_num
+        if self._size > max(2, int(max_points)):
+            selected = np.unique(np.linspace(0, self._size - 1, max(2, int(max_points))).round()
+                                 .astype(np.intp))
+            return TimeSeries(x[selected], self.totals[selected].copy())
+        return TimeSeries(x, self.totals.copy())
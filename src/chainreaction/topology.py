@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains the precomputed tables describing the positions of a board and their neighbors.
+
+The engines only use these tables, so every board "topology" runs on the same code:
+
+- "rect": Rectangular board, positions at the edges have fewer neighbors.
+- "torus": Rectangular board whose edges wrap around, every position has four neighbors.
+- "hex": Hexagonal positions in rows, every odd row is shifted by half a position to
+  the right ("odd-r" layout), inner positions have six neighbors.
+
+Every topology can have blocked positions ("holes"), which can not be played and do
+not count as neighbors.
+"""
+
+
+from __future__ import annotations
+from typing import NamedTuple, Tuple
+import functools
+
+import numpy as np
+
+
+TOPOLOGIES = ("rect", "torus", "hex")
+# default hard limit of waves per "chain reaction" is this times "height_num + width_num",
+# a "chain reaction" crossing the board takes about "height_num + width_num" waves
+WAVES_PER_SIDE = 8
+
+# offsets (row, column) of the neighbors, same order as the classic engine: down, up, right, left
+_RECT_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_HEX_OFFSETS = {0: ((1, -1), (1, 0), (-1, -1), (-1, 0), (0, 1), (0, -1)),
+                1: ((1, 0), (1, 1), (-1, 0), (-1, 1), (0, 1), (0, -1))}
+
+
+class BoardTables(NamedTuple):
+    """Precomputed tables of a board used by every "explosion".
+
+    Positions are adressed by their flat index "row * width_num + column".
+
+    Attributes:
+        critical_mass: Critical mass ("max_num") of every position.
+        neighbor_ptr: Neighbors of position "i" are
+          "neighbor_idx[neighbor_ptr[i]:neighbor_ptr[i+1]]".
+        neighbor_idx: Flat indices of the neighbors of all positions (CSR style).
+        blocked: Wether a position is blocked ("hole").
+        topology: "rect", "torus" or "hex".
+    """
+    critical_mass: np.ndarray
+    neighbor_ptr: np.ndarray
+    neighbor_idx: np.ndarray
+    blocked: np.ndarray
+    topology: str = "rect"
+
+    def neighbors(self, cells: np.ndarray) -> np.ndarray:
+        """Returns the neighbors of all "cells" (once per cell they neighbor).
+
+        Args:
+            cells: Flat indices of the positions whose neighbors are requested.
+
+        Returns:
+            Flat indices of the neighbors, one entry for every neighboring cell.
+        """
+        starts = self.neighbor_ptr[cells]
+        lengths = self.neighbor_ptr[cells + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.neighbor_idx[offsets + np.arange(offsets.size)]
+
+    @property
+    def is_plain(self) -> bool:
+        """Wether the board is a rectangle without blocked positions."""
+        return (self.topology == "rect") and not self.blocked.any()
+
+
+def _neighbor_table(height_num: int, width_num: int, topology: str) -> np.ndarray:
+    """Returns the flat indices of the neighbors of every position ("-1" if none).
+
+    Args:
+        height_num: Number of boxes in y-direction.
+        width_num: Number of boxes in x-direction.
+        topology: "rect", "torus" or "hex".
+
+    Returns:
+        Neighbors of all positions (positions x directions).
+    """
+    rows, columns = np.divmod(np.arange(height_num * width_num), width_num)
+    if topology == "hex":
+        offsets = np.where((rows % 2 == 1)[:, np.newaxis, np.newaxis],
+                           np.array(_HEX_OFFSETS[1])[np.newaxis],
+                           np.array(_HEX_OFFSETS[0])[np.newaxis])
+    else:
+        offsets = np.broadcast_to(np.array(_RECT_OFFSETS), (rows.size, 4, 2))
+    n_rows = rows[:, np.newaxis] + offsets[:, :, 0]
+    n_columns = columns[:, np.newaxis] + offsets[:, :, 1]
+    if topology == "torus":
+        n_rows %= height_num
+        n_columns %= width_num
+    valid = ((n_rows >= 0) & (n_rows < height_num)
+             & (n_columns >= 0) & (n_columns < width_num))
+    return np.where(valid, n_rows * width_num + n_columns, -1)
+
+
+@functools.lru_cache(maxsize=16)
+def board_tables(height_num: int, width_num: int, topology: str = "rect",
+                 blocked: Tuple[Tuple[int, int], ...] = ()) -> BoardTables:
+    """Builds the "BoardTables" of a board, cached for boards with the same description.
+
+    The critical mass of a position is its number of neighbors. On rectangular
+    boards it is "4" minus the number of edges the position lies on (also for boards
+    only one position wide) minus its blocked neighbors.
+
+    Args:
+        height_num: Number of boxes in y-direction.
+        width_num: Number of boxes in x-direction.
+        topology: "rect", "torus" or "hex". Defaults to "rect".
+        blocked: Positions (row, column) which are blocked. Defaults to none.
+
+    Returns:
+        Read-only tables shared by all games with the same board.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+    cell_num = height_num * width_num
+    blocked_cells = np.zeros(cell_num, dtype=bool)
+    for row, column in blocked:
+        if not ((0 <= row < height_num) and (0 <= column < width_num)):
+            raise ValueError(f"Blocked position {(row, column)} is not on the board")
+        blocked_cells[row * width_num + column] = True
+
+    neighbors = _neighbor_table(height_num, width_num, topology)
+    neighbors[blocked_cells] = -1
+    neighbors[(neighbors >= 0) & blocked_cells[np.maximum(neighbors, 0)]] = -1
+    valid = neighbors >= 0
+    neighbor_ptr = np.zeros(cell_num + 1, dtype=np.intp)
+    neighbor_ptr[1:] = np.cumsum(valid.sum(axis=1))
+    neighbor_idx = neighbors[valid].astype(np.intp)
+
+    if topology == "rect":
+        row_edge = np.zeros(height_num, dtype=np.uint8)
+        row_edge[[0, -1]] = 1
+        column_edge = np.zeros(width_num, dtype=np.uint8)
+        column_edge[[0, -1]] = 1
+        critical_mass = (4 - row_edge[:, np.newaxis] - column_edge[np.newaxis, :]).reshape(-1)
+        all_neighbors = _neighbor_table(height_num, width_num, topology)
+        hole_num = ((all_neighbors >= 0) & blocked_cells[np.maximum(all_neighbors, 0)]).sum(axis=1)
+        critical_mass = (critical_mass - hole_num).astype(np.uint8)
+    else:
+        critical_mass = np.diff(neighbor_ptr).astype(np.uint8)
+    critical_mass[blocked_cells] = 0
+    if blocked and (critical_mass[~blocked_cells] == 0).any():
+        raise ValueError("Every position which is not blocked needs a neighbor")
+
+    for table in (critical_mass, neighbor_ptr, neighbor_idx, blocked_cells):
+        table.setflags(write=False)
+    return BoardTables(critical_mass, neighbor_ptr, neighbor_idx, blocked_cells, topology)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Contains Zobrist keys to hash game states and a bounded "TranspositionTable".
+
+The hash of a game state is the XOR of one random key per ("position", "owner")
+and per ("position", number of circles) of every occupied position and the key of
+the player to move. Changing a position only needs the keys of its old and new
+value, so "Gamecalc" keeps the hash up to date while the waves are calculated.
+The keys only depend on the board shape and the number of players, hashes of
+different games and processes can be compared. Keys of positions are calculated
+(with the "splitmix64" mixing function) instead of stored, so they do not take
+memory on large boards.
+"""
+
+
+from __future__ import annotations
+from typing import List, NamedTuple
+import functools
+
+import numpy as np
+
+
+MAX_COUNT = 15  # positions with more circles share the key of "MAX_COUNT"
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Scrambles "uint64" values with the finalizer of "splitmix64"."""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class ZobristKeys(NamedTuple):
+    """Random keys of one board shape and number of players.
+
+    Attributes:
+        seed: Start of the key stream of the positions.
+        player_num: Number of players.
+        turn: Key of every "player_number" to move.
+    """
+    seed: np.uint64
+    player_num: int
+    turn: np.ndarray
+
+    def _keys(self, cells: np.ndarray, index: np.ndarray) -> np.ndarray:
+        """Returns the keys of entry "index" of flat indices "cells".
+
+        Every position has "player_num" keys for its "owner" followed by "MAX_COUNT" + 1
+        keys for its number of circles.
+        """
+        stride = self.player_num + MAX_COUNT + 1
+        stream = cells.astype(np.uint64) * np.uint64(stride) + index.astype(np.uint64)
+        return _mix(self.seed + stream * _GOLDEN)
+
+    def cells_hash(self, cells: np.ndarray, owner: np.ndarray, count: np.ndarray) -> int:
+        """Returns the hash contribution of some positions.
+
+        Args:
+            cells: Flat indices of the positions.
+            owner: "Owner" of the positions, "-1" if empty.
+            count: Number of circles at the positions.
+
+        Returns:
+            XOR of the keys of all occupied positions.
+        """
+        occupied = owner >= 0
+        cells = cells[occupied]
+        keys = self._keys(cells, owner[occupied])
+        keys ^= self._keys(cells, self.player_num + np.minimum(count[occupied], MAX_COUNT))
+        return int(np.bitwise_xor.reduce(keys, initial=np.uint64(0)))
+
+    def cells_key(self, cells: np.ndarray) -> int:
+        """Returns a key of a set of positions.
+
+        Uses the keys for "0" circles, which are never part of a board hash.
+        """
+        keys = self._keys(cells, np.full(len(cells), self.player_num))
+        return int(np.bitwise_xor.reduce(keys, initial=np.uint64(0)))
+
+    def board_hash(self, owner: np.ndarray, count: np.ndarray) -> int:
+        """Returns the hash of a whole board given by its "owner" and "count" arrays."""
+        owner = np.asarray(owner).reshape(-1)
+        return self.cells_hash(np.arange(owner.size), owner, np.asarray(count).reshape(-1))
+
+
+@functools.lru_cache(maxsize=16)
+def zobrist_keys(height_num: int, width_num: int, player_num: int) -> ZobristKeys:
+    """Returns the (cached) Zobrist keys of a board shape.
+
+    The keys are derived from a fixed seed, so they are the same in every process.
+
+    Args:
+        height_num: Number of boxes in y-direction.
+        width_num: Number of boxes in x-direction.
+        player_num: Number of players.
+
+    Returns:
+        Keys of the board shape.
+    """
+    rng = np.random.default_rng([height_num, width_num, player_num])
+    turn = rng.integers(1, 2**64, size=player_num, dtype=np.uint64)
+    turn.flags.writeable = False
+    return ZobristKeys(rng.integers(1, 2**64, dtype=np.uint64), int(player_num), turn)
+
+
+class TTEntry(NamedTuple):
+    """Entry of the "TranspositionTable".
+
+    Attributes:
+        key: Hash of the game state.
+        depth: Search depth the "value" was calculated with.
+        value: Evaluation of the game state.
+        move: Best move found (flat index) or "-1".
+        flag: "EXACT", "LOWER" or "UPPER" bound of the "value".
+    """
+    key: int
+    depth: int
+    value: float
+    move: int
+    flag: int
+
+
+class TranspositionTable():
+    """Hash table of evaluated game states with a fixed number of slots.
+
+    Every hash maps to a bucket of two slots. The first keeps the entry searched
+    deepest, the second is always replaced by newer entries, so deep results
+    survive while recent positions are still found.
+    """
+    def __init__(self, size: int = 2**16) -> None:
+        """Initializes an empty table.
+
+        Args:
+            size: Number of entries the table can hold. Defaults to 2**16.
+        """
+        self.bucket_num = max(1, int(size) // 2)
+        self._slots: List[TTEntry | None] = [None] * (2 * self.bucket_num)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self._slots)
+
+    def get(self, key: int) -> TTEntry | None:
+        """Returns the entry of the game state with hash "key" or None if not stored."""
+        slot = 2 * (key % self.bucket_num)
+        for entry in self._slots[slot:slot + 2]:
+            if (entry is not None) and (entry.key == key):
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: float, move: int = -1, flag: int = EXACT) -> None:
+        """Stores the evaluation of a game state.
+
+        Args:
+            key: Hash of the game state.
+            depth: Search depth the "value" was calculated with.
+            value: Evaluation of the game state.
+            move: Best move found (flat index). Defaults to "-1".
+            flag: "EXACT", "LOWER" or "UPPER" bound of the "value". Defaults to "EXACT".
+        """
+        slot = 2 * (key % self.bucket_num)
+        entry = TTEntry(key, depth, value, move, flag)
+        deepest = self._slots[slot]
+        if (deepest is None) or (deepest.key == key) or (depth >= deepest.depth):
+            self._slots[slot] = entry
+            if (deepest is not None) and (deepest.key != key):
+                self._slots[slot + 1] = deepest
+            elif (self._slots[slot + 1] is not None) and (self._slots[slot + 1].key == key):
+                self._slots[slot + 1] = None
+        else:
+            self._slots[slot + 1] = entry
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        self._slots = [None] * (2 * self.bucket_num)
+        self.hits = 0
+        self.misses = 0
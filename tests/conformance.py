@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Conformance corpus shared by the tests of all engines.
+
+Every case places one circle of "player" at "pos" on a board in state "start_pos"
+and expects the state "goal_pos" after the "chain reaction".
+"""
+
+from __future__ import annotations
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+
+class Case(NamedTuple):
+    """One conformance case."""
+    name: str
+    width_num: int
+    height_num: int
+    player: int
+    pos: Tuple[int, int]
+    start_pos: Dict[int, np.ndarray]
+    goal_pos: Dict[int, np.ndarray]
+
+
+CASES = [
+    Case("corner_reaction_tl", 3, 3, 0, (0, 0),
+         {0: np.array([[1, 0, 0],
+                       [0, 0, 0],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [0, 0, 1]])},
+         {0: np.array([[0, 1, 0],
+                       [1, 0, 0],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [0, 0, 1]])}),
+    Case("corner_reaction_tr", 3, 3, 0, (0, 2),
+         {0: np.array([[0, 0, 1],
+                       [0, 0, 0],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [1, 0, 0]])},
+         {0: np.array([[0, 1, 0],
+                       [0, 0, 1],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [1, 0, 0]])}),
+    Case("corner_reaction_bl", 3, 3, 0, (2, 0),
+         {0: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [1, 0, 0]]),
+          1: np.array([[0, 0, 1],
+                       [0, 0, 0],
+                       [0, 0, 0]])},
+         {0: np.array([[0, 0, 0],
+                       [1, 0, 0],
+                       [0, 1, 0]]),
+          1: np.array([[0, 0, 1],
+                       [0, 0, 0],
+                       [0, 0, 0]])}),
+    Case("corner_reaction_br", 3, 3, 0, (2, 2),
+         {0: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [0, 0, 1]]),
+          1: np.array([[1, 0, 0],
+                       [0, 0, 0],
+                       [0, 0, 0]])},
+         {0: np.array([[0, 0, 0],
+                       [0, 0, 1],
+                       [0, 1, 0]]),
+          1: np.array([[1, 0, 0],
+                       [0, 0, 0],
+                       [0, 0, 0]])}),
+    Case("edge_reaction_tc", 3, 3, 0, (0, 1),
+         {0: np.array([[0, 2, 0],
+                       [0, 0, 0],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [0, 1, 0]])},
+         {0: np.array([[1, 0, 1],
+                       [0, 1, 0],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [0, 1, 0]])}),
+    Case("edge_reaction_rc", 3, 3, 0, (1, 2),
+         {0: np.array([[0, 0, 0],
+                       [0, 0, 2],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [1, 0, 0],
+                       [0, 0, 0]])},
+         {0: np.array([[0, 0, 1],
+                       [0, 1, 0],
+                       [0, 0, 1]]),
+          1: np.array([[0, 0, 0],
+                       [1, 0, 0],
+                       [0, 0, 0]])}),
+    Case("edge_reaction_bc", 3, 3, 0, (2, 1),
+         {0: np.array([[0, 0, 0],
+                       [0, 0, 0],
+                       [0, 2, 0]]),
+          1: np.array([[0, 1, 0],
+                       [0, 0, 0],
+                       [0, 0, 0]])},
+         {0: np.array([[0, 0, 0],
+                       [0, 1, 0],
+                       [1, 0, 1]]),
+          1: np.array([[0, 1, 0],
+                       [0, 0, 0],
+                       [0, 0, 0]])}),
+    Case("edge_reaction_lc", 3, 3, 0, (1, 0),
+         {0: np.array([[0, 0, 0],
+                       [2, 0, 0],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 1],
+                       [0, 0, 0]])},
+         {0: np.array([[1, 0, 0],
+                       [0, 1, 0],
+                       [1, 0, 0]]),
+          1: np.array([[0, 0, 0],
+                       [0, 0, 1],
+                       [0, 0, 0]])}),
+    Case("center_reaction_cc", 3, 3, 0, (1, 1),
+         {0: np.array([[0, 0, 0],
+                       [0, 3, 0],
+                       [0, 0, 0]]),
+          1: np.array([[0, 0, 1],
+                       [0, 0, 0],
+                       [0, 0, 0]])},
+         {0: np.array([[0, 1, 0],
+                       [1, 0, 1],
+                       [0, 1, 0]]),
+          1: np.array([[0, 0, 1],
+                       [0, 0, 0],
+                       [0, 0, 0]])}),
+    Case("capture_with_overloading_tl", 5, 5, 1, (0, 0),
+         {0: np.array([[0, 2, 0, 0, 0],
+                       [2, 3, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 1]]),
+          1: np.array([[1, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0]])},
+         {0: np.array([[0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 1]]),
+          1: np.array([[0, 2, 1, 0, 0],
+                       [2, 1, 1, 0, 0],
+                       [1, 1, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0]])}),
+    Case("capture_with_overloading_tr", 5, 5, 1, (0, 4),
+         {0: np.array([[0, 0, 0, 2, 0],
+                       [0, 0, 0, 3, 2],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [1, 0, 0, 0, 0]]),
+          1: np.array([[0, 0, 0, 0, 1],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0]])},
+         {0: np.array([[0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [1, 0, 0, 0, 0]]),
+          1: np.array([[0, 0, 1, 2, 0],
+                       [0, 0, 1, 1, 2],
+                       [0, 0, 0, 1, 1],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0]])}),
+    Case("capture_with_overloading_br", 5, 5, 1, (4, 4),
+         {0: np.array([[1, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 3, 2],
+                       [0, 0, 0, 2, 0]]),
+          1: np.array([[0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 1]])},
+         {0: np.array([[1, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0]]),
+          1: np.array([[0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 1, 1],
+                       [0, 0, 1, 1, 2],
+                       [0, 0, 1, 2, 0]])}),
+    Case("capture_with_overloading_bl", 5, 5, 1, (4, 0),
+         {0: np.array([[0, 0, 0, 0, 1],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [2, 3, 0, 0, 0],
+                       [0, 2, 0, 0, 0]]),
+          1: np.array([[0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [1, 0, 0, 0, 0]])},
+         {0: np.array([[0, 0, 0, 0, 1],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0]]),
+          1: np.array([[0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0],
+                       [1, 1, 0, 0, 0],
+                       [2, 1, 1, 0, 0],
+                       [0, 2, 1, 0, 0]])}),
+]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests Batchcalc."""
+
+from __future__ import annotations
+
+import pytest
+import numpy as np
+
+from batch_rules import Batchcalc
+from game_rules import Gamecalc
+from tests.conformance import CASES
+from tests.test_game_rules import compare_positions
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_conformance(case):
+    b_calc = Batchcalc(1, len(case.start_pos), case.width_num, case.height_num)
+    b_calc.set_player_pos(0, case.start_pos)
+    b_calc.counter[0] = case.player
+    b_calc.step([case.pos[0] * case.width_num + case.pos[1]])
+    assert compare_positions(case.goal_pos, b_calc.player_pos(0))
+
+
+@pytest.mark.parametrize("player_num, width_num, height_num", [(2, 3, 3), (3, 6, 9)])
+def test_batch_matches_gamecalc(player_num, width_num, height_num):
+    game_num = 16
+    b_calc = Batchcalc(game_num, player_num, width_num, height_num)
+    g_calcs = [Gamecalc(player_num, width_num, height_num, 0, None, None, None)
+               for _ in range(game_num)]
+    rng = np.random.default_rng(player_num)
+    for round_num in range(500):
+        valid = b_calc.valid_moves()
+        if not valid.any():
+            break
+        moves = np.array([rng.choice(np.flatnonzero(game_valid)) if game_valid.any() else -1
+                          for game_valid in valid])
+        waves = b_calc.step(moves)
+        for game, g_calc in enumerate(g_calcs):
+            if moves[game] < 0:
+                assert waves[game] == 0
+                continue
+            pos = divmod(int(moves[game]), width_num)
+            frames = g_calc.update_player(g_calc.player_to_move(), [pos], [1], None, round_num)
+            if g_calc.winner is None:
+                g_calc.increase_counter()
+            assert waves[game] == len(frames)
+            assert compare_positions(g_calc.player_pos, b_calc.player_pos(game))
+    assert np.all(b_calc.winner == [g_calc.winner for g_calc in g_calcs])
+    assert np.all(b_calc.winner >= 0)
+
+
+def test_wave_cap():
+    batch = Batchcalc(1, 2, 2, 100, max_waves=30)
+    g_calc = Gamecalc(2, 2, 100, 0, None, None, None, max_waves=30)
+    start_pos = {0: g_calc.tables.critical_mass.reshape(100, 2) - 1,
+                 1: np.zeros((100, 2), dtype=int)}
+    start_pos[0][-1, :] = 0
+    start_pos[1][-1, :] = 1
+    g_calc.player_pos = start_pos
+    batch.set_player_pos(0, start_pos)
+    g_calc.update_player(0, [(0, 0)], [1], None, 0)
+    assert list(batch.step([0])) == [30]
+    assert batch.winner[0] == -1
+    assert np.array_equal(batch.owner[0], g_calc.owner.reshape(-1))
+    assert np.array_equal(batch.count[0], g_calc.count.reshape(-1))
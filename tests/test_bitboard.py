@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests Bitboard."""
+
+
+import pytest
+import numpy as np
+
+from bitboard import Bitboard, bits_to_cells
+from game_rules import Gamecalc
+
+
+def test_bits_to_cells():
+    assert bits_to_cells(0) == []
+    assert bits_to_cells(0b1011) == [0, 1, 3]
+    assert bits_to_cells(1 << 53) == [53]
+
+
+def test_load_store():
+    rng = np.random.default_rng(0)
+    owner = rng.integers(-1, 3, size=(9, 6)).astype(np.int8)
+    count = np.where(owner >= 0, rng.integers(1, 4, size=(9, 6)), 0).astype(np.uint8)
+    board = Bitboard(3, 6, 9)
+    board.load(owner, count)
+    new_owner = np.zeros_like(owner)
+    new_count = np.zeros_like(count)
+    board.store(new_owner, new_count)
+    assert np.array_equal(owner, new_owner)
+    assert np.array_equal(count, new_count)
+    assert board.totals() == [int(count[owner == num].sum()) for num in range(3)]
+    for cell in range(54):
+        assert board.get_pos(cell) == (count.flat[cell], owner.flat[cell])
+
+
+def test_load_too_many_circles():
+    board = Bitboard(2, 3, 3)
+    with pytest.raises(ValueError):
+        board.load(np.zeros((3, 3)), np.full((3, 3), 8))
+
+
+def test_play_matches_gamecalc():
+    rng = np.random.default_rng(1)
+    board = Bitboard(2, 6, 9)
+    g_calc = Gamecalc(2, 6, 9, 0, None, None, None)
+    player = 0
+    while g_calc.winner is None:
+        valid = bits_to_cells(board.valid_moves(player))
+        cell = int(rng.choice(valid))
+        waves = board.play(player, cell)
+        assert waves == len(list(g_calc.play(player, divmod(cell, 6))))
+        owner = np.zeros(54, dtype=np.int8)
+        count = np.zeros(54, dtype=np.uint8)
+        board.store(owner, count)
+        assert np.array_equal(owner, g_calc.owner.reshape(-1))
+        assert np.array_equal(count, g_calc.count.reshape(-1))
+        assert board.winner == g_calc.winner
+        player = 1 - player
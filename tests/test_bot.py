@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests Bot."""
+
+
+import time
+
+import pytest
+import numpy as np
+
+from bot import Bot, WIN, _value_from_table, _value_to_table
+from zobrist import EXACT
+from game_rules import Gamecalc
+from topology import board_tables
+
+
+def test_apply_move_undo():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    hashes = [g_calc.get_hash()]
+    for pos in [(0, 0), (2, 2), (0, 0), (2, 2)]:
+        g_calc.apply_move(pos)
+        hashes.append(g_calc.get_hash())
+    assert g_calc.count[0, 1] == 1
+    assert g_calc.player_to_move() == 0
+    for board_hash in reversed(hashes[:-1]):
+        g_calc.undo(None)
+        assert g_calc.get_hash() == board_hash
+    assert not g_calc.count.any()
+
+
+def test_valid_moves():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    g_calc.apply_move((1, 1))
+    assert list(g_calc.valid_moves()) == [0, 1, 2, 3, 5, 6, 7, 8]
+    assert list(g_calc.valid_moves(0)) == list(range(9))
+
+
+def test_bot_finds_win():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    g_calc.player_pos = {0: np.array([[1, 0, 0],
+                                      [0, 0, 0],
+                                      [0, 0, 0]]),
+                         1: np.array([[0, 1, 0],
+                                      [0, 0, 0],
+                                      [0, 0, 0]])}
+    bot = Bot(0, 2, 3, 3, time_budget=5)
+    before = g_calc.get_hash()
+    assert bot.choose_move(g_calc) == (0, 0)
+    assert g_calc.get_hash() == before
+    assert bot.depth == 1
+
+
+def test_win_values_in_table():
+    # a win one move after the position at ply 2 is stored as a win in one move
+    assert _value_to_table(WIN - 3, 2) == WIN - 1
+    assert _value_to_table(-WIN + 3, 2) == -WIN + 1
+    assert _value_to_table(12.5, 2) == 12.5
+    for value in [WIN - 1, -WIN + 1, 12.5]:
+        assert _value_from_table(_value_to_table(value - 4, 4), 4) == value - 4
+    # reached at ply 1 it is a win in two moves from the root
+    assert _value_from_table(WIN - 1, 1) == WIN - 2
+
+
+def test_bot_table_keeps_win_distance():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    g_calc.player_pos = {0: np.array([[1, 0, 0],
+                                      [0, 0, 0],
+                                      [0, 0, 0]]),
+                         1: np.array([[0, 1, 0],
+                                      [0, 0, 0],
+                                      [0, 0, 0]])}
+    bot = Bot(0, 2, 3, 3)
+    bot.game.load_state(g_calc)
+    bot._deadline = time.monotonic() + 60
+    # searched one move below the root the win is two moves away from the root ...
+    assert bot._search(1, 1, -np.inf, np.inf) == (WIN - 2, 0)
+    # ... but stored as a win in one move
+    assert bot.table.get(bot.game.get_hash()).value == WIN - 1
+
+    # a stored win in one move after (1, 1) is a win in two moves at the root
+    bot = Bot(0, 2, 3, 3)
+    bot.game.apply_move((1, 1))
+    bot.table.store(bot.game.get_hash(), 10, WIN - 1, 0, EXACT)
+    bot.game.undo(None)
+    bot._deadline = time.monotonic() + 60
+    assert bot._search(2, 0, -np.inf, np.inf) == (WIN - 2, 4)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "bitboard"])
+def test_bot_game(engine):
+    g_calc = Gamecalc(2, 4, 4, 0, None, None, None)
+    bots = [Bot(num, 2, 4, 4, time_budget=0.05, engine=engine) for num in range(2)]
+    for _ in range(60):
+        if g_calc.winner is not None:
+            break
+        bot = bots[g_calc.player_to_move()]
+        start = time.monotonic()
+        pos = bot.choose_move(g_calc)
+        assert time.monotonic() - start < 1
+        assert bot.game._journal.maxlen > len(bot.game._journal)
+        assert pos[0] * 4 + pos[1] in g_calc.valid_moves()
+        g_calc.apply_move(pos)
+    assert g_calc.winner is not None
+
+
+def test_bot_not_current_player():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    with pytest.raises(ValueError):
+        Bot(1, 2, 3, 3).choose_move(g_calc)
+
+
+@pytest.mark.parametrize("topology", ["torus", "hex"])
+def test_bot_topology(topology):
+    tables = board_tables(4, 4, topology, ((1, 1), (2, 2)))
+    g_calc = Gamecalc(2, 4, 4, 0, None, None, None, tables=tables)
+    bots = [Bot(num, 2, 4, 4, time_budget=0.02, tables=tables) for num in range(2)]
+    for _ in range(20):
+        if g_calc.winner is not None:
+            break
+        pos = bots[g_calc.player_to_move()].choose_move(g_calc)
+        assert not tables.blocked[pos[0] * 4 + pos[1]]
+        g_calc.apply_move(pos)
+
+
+def test_bot_wrong_topology():
+    tables = board_tables(3, 3, "torus")
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None, tables=tables)
+    with pytest.raises(ValueError):
+        Bot(0, 2, 3, 3).choose_move(g_calc)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests ChunkedArray."""
+
+
+import pytest
+import numpy as np
+
+from chunked import ChunkedArray
+from game_rules import Gamecalc
+from tests.test_game_rules import compare_positions
+
+
+def test_chunked_array():
+    array = ChunkedArray((40, 70), np.int8, fill=-1, tile_size=16)
+    assert array.tile_num == 0
+    array[np.array([0, 69, 39 * 70 + 69])] = [1, 2, 3]
+    assert array.tile_num == 3
+    assert array[0, 69] == 2
+    assert list(array.reshape(-1)[np.array([69, 1, 0])]) == [2, -1, 1]
+    assert list(array.stored()) == [0, 69, 39 * 70 + 69]
+    dense = np.asarray(array)
+    assert dense.shape == (40, 70)
+    assert dense[39, 69] == 3
+    assert (dense == -1).sum() == 40 * 70 - 3
+    array[np.array([0, 69])] = -1
+    assert array.tile_num == 1
+    array[:] = dense
+    assert array.tile_num == 3
+    copy = array.copy()
+    array[0, 0] = -1
+    assert copy[0, 0] == 1
+    with pytest.raises(ValueError):
+        array.reshape(70, 40)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_chunked_storage_agrees(seed):
+    rng = np.random.default_rng(seed)
+    dense = Gamecalc(3, 7, 9, 0, None, None, None)
+    chunked = Gamecalc(3, 7, 9, 0, None, None, None, storage="chunked")
+    for _ in range(150):
+        if dense.winner is not None:
+            break
+        valid = dense.valid_moves()
+        assert list(chunked.valid_moves()) == list(valid)
+        pos = divmod(int(rng.choice(valid)), 7)
+        assert dense.apply_move(pos) == chunked.apply_move(pos)
+        assert compare_positions(dense.player_pos, chunked.player_pos)
+        assert dense.get_hash() == chunked.get_hash()
+        assert list(dense.totals) == list(chunked.totals)
+    assert dense.winner == chunked.winner
+    chunked.undo(None)
+    dense.undo(None)
+    assert compare_positions(dense.player_pos, chunked.player_pos)
+
+
+def test_large_board():
+    g_calc = Gamecalc(2, 500, 500, 0, None, None, None, storage="chunked")
+    for pos in [(0, 0), (499, 499), (0, 0), (499, 499), (0, 0)]:
+        g_calc.apply_move(pos)
+    assert g_calc.get_pos(0, 1, get_player=True) == (1, 0)
+    assert g_calc.owner.tile_num == 2
+    assert g_calc.owner.nbytes + g_calc.count.nbytes < 10_000
+
+
+def test_chunked_engine():
+    with pytest.raises(ValueError):
+        Gamecalc(2, 3, 3, 0, None, None, None, engine="classic", storage="chunked")
+    with pytest.raises(ValueError):
+        Gamecalc(2, 3, 3, 0, None, None, None, storage="sparse")
@@ -4,12 +4,14 @@
 """Tests Gamecalc."""
 
 from __future__ import annotations
-from typing import Dict
+from typing import Dict, Iterator
+import sys
 
 import pytest
 import numpy as np
 
-from game_rules import Gamecalc
+from game_rules import Gamecalc, board_tables
+from tests.conformance import CASES
 
 
 def compare_positions(goal_pos: Dict[int, np.ndarray],
@@ -28,281 +30,390 @@ def compare_positions(goal_pos: Dict[int, np.ndarray],
     return np.all(compare_arrays)
 
 
+def play_random_moves(g_calc: Gamecalc, moves: int, seed: int) -> Iterator[int]:
+    """Plays up to "moves" random but valid moves on "g_calc".
 
-def test_corner_reaction_tl():
-    start_pos = {0: np.array([[1, 0, 0],
-                              [0, 0, 0],
-                              [0, 0, 0]]),
-                 1: np.array([[0, 0, 0],
-                              [0, 0, 0],
-                              [0, 0, 1]])}
-    goal_pos = {0: np.array([[0, 1, 0],
-                             [1, 0, 0],
-                             [0, 0, 0]]),
-                1: np.array([[0, 0, 0],
-                             [0, 0, 0],
-                             [0, 0, 1]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(0, 0)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_corner_reaction_tr():
-    start_pos = {0: np.array([[0, 0, 1],
-                              [0, 0, 0],
-                              [0, 0, 0]]),
-                 1: np.array([[0, 0, 0],
-                              [0, 0, 0],
-                              [1, 0, 0]])}
-    goal_pos = {0: np.array([[0, 1, 0],
-                             [0, 0, 1],
-                             [0, 0, 0]]),
-                1: np.array([[0, 0, 0],
-                             [0, 0, 0],
-                             [1, 0, 0]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(0, 2)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
+    Args:
+        g_calc: Game to play the moves on.
+        moves: Maximum number of moves to play.
+        seed: Seed of the random number generator choosing the moves.
 
-def test_corner_reaction_bl():
-    start_pos = {0: np.array([[0, 0, 0],
-                              [0, 0, 0],
+    Yields:
+        Round number of the move just played.
+    """
+    rng = np.random.default_rng(seed)
+    for round_num in range(moves):
+        if g_calc.winner is not None:
+            break
+        player = g_calc.player_to_move()
+        valid = [(row, column) for row in range(g_calc.height_num)
+                 for column in range(g_calc.width_num)
+                 if g_calc.get_pos(row, column, get_player=True)[0] == 0
+                 or g_calc.get_pos(row, column, get_player=True)[1] == player]
+        pos = valid[rng.integers(len(valid))]
+        g_calc.set_state_for_undo(round_num)
+        g_calc.update_player(player, [pos], [1], None, round_num)
+        if g_calc.winner is None:
+            g_calc.increase_counter()
+        yield round_num
+
+
+@pytest.mark.parametrize("engine", ["numpy", "bitboard"])
+@pytest.mark.parametrize("player_num, width_num, height_num, seed",
+                         [(2, 3, 3, 0), (2, 6, 9, 1), (3, 6, 9, 2), (4, 5, 7, 3), (2, 1, 5, 4)])
+def test_engines_agree(engine, player_num, width_num, height_num, seed):
+    numpy_calc = Gamecalc(player_num, width_num, height_num, 0, None, None, None, engine=engine)
+    classic_calc = Gamecalc(player_num, width_num, height_num, 0, None, None, None, engine="classic")
+    numpy_moves = play_random_moves(numpy_calc, 300, seed)
+    for _ in play_random_moves(classic_calc, 300, seed):
+        next(numpy_moves)
+        assert compare_positions(classic_calc.player_pos, numpy_calc.player_pos)
+        assert classic_calc.time_line == numpy_calc.time_line
+        assert classic_calc.winner == numpy_calc.winner
+    assert classic_calc.winner is not None
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Gamecalc(2, 3, 3, 0, None, None, None, engine="unknown")
+
+
+def test_owner_count_view():
+    start_pos = {0: np.array([[0, 2, 0],
                               [1, 0, 0]]),
-                 1: np.array([[0, 0, 1],
-                              [0, 0, 0],
-                              [0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 0, 0],
-                             [1, 0, 0],
-                             [0, 1, 0]]),
-                1: np.array([[0, 0, 1],
-                             [0, 0, 0],
-                             [0, 0, 0]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+                 1: np.array([[0, 0, 3],
+                              [0, 0, 1]])}
+    g_calc = Gamecalc(2, 3, 2, 0, None, None, None)
     g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(2, 0)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_corner_reaction_br():
-    start_pos = {0: np.array([[0, 0, 0],
-                              [0, 0, 0],
-                              [0, 0, 1]]),
-                 1: np.array([[1, 0, 0],
-                              [0, 0, 0],
-                              [0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 0, 0],
-                             [0, 0, 1],
-                             [0, 1, 0]]),
-                1: np.array([[1, 0, 0],
-                             [0, 0, 0],
-                             [0, 0, 0]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    assert g_calc.owner.dtype == np.int8
+    assert g_calc.count.dtype == np.uint8
+    assert np.all(g_calc.owner == np.array([[-1, 0, 1],
+                                            [0, -1, 1]]))
+    assert compare_positions(start_pos, g_calc.player_pos)
+    assert g_calc.get_pos(0, 2, get_player=True) == (3, 1)
+
+
+def test_board_tables():
+    tables = board_tables(3, 4)
+    assert tables is board_tables(3, 4)
+    assert np.all(tables.critical_mass.reshape(3, 4) == np.array([[2, 3, 3, 2],
+                                                                  [3, 4, 4, 3],
+                                                                  [2, 3, 3, 2]]))
+    assert sorted(tables.neighbors(np.array([0]))) == [1, 4]
+    assert sorted(tables.neighbors(np.array([5, 0]))) == [1, 1, 4, 4, 6, 9]
+    assert tables.neighbor_ptr[-1] == tables.neighbor_idx.size == 2 * (2 * 3 * 4 - 3 - 4)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "classic", "bitboard"])
+def test_long_chain_reaction(engine):
+    height_num = 400
+    g_calc = Gamecalc(2, 2, height_num, 0, None, None, None, engine=engine)
+    start_pos = {0: g_calc.tables.critical_mass.reshape(height_num, 2) - 1,
+                 1: np.zeros((height_num, 2), dtype=int)}
+    start_pos[0][-1, :] = 0
+    start_pos[1][-1, :] = 1
     g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(2, 2)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(250)
+    try:
+        g_calc.update_player(0, [(0, 0)], [1], None, 0)
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert len(g_calc.time_line[0]) > height_num
+    assert g_calc.winner == 0
 
 
-def test_edge_reaction_tc():
-    start_pos = {0: np.array([[0, 2, 0],
+def test_update_player_returns_waves():
+    start_pos = {0: np.array([[1, 0, 0],
                               [0, 0, 0],
                               [0, 0, 0]]),
                  1: np.array([[0, 0, 0],
                               [0, 0, 0],
-                              [0, 1, 0]])}
-    goal_pos = {0: np.array([[1, 0, 1],
-                             [0, 1, 0],
-                             [0, 0, 0]]),
-                1: np.array([[0, 0, 0],
-                             [0, 0, 0],
-                             [0, 1, 0]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(0, 1)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_edge_reaction_rc():
-    start_pos = {0: np.array([[0, 0, 0],
-                              [0, 0, 2],
-                              [0, 0, 0]]),
-                 1: np.array([[0, 0, 0],
-                              [1, 0, 0],
-                              [0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 0, 1],
-                             [0, 1, 0],
-                             [0, 0, 1]]),
-                1: np.array([[0, 0, 0],
-                             [1, 0, 0],
-                             [0, 0, 0]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+                              [0, 0, 1]])}
+    g_calc = Gamecalc(2, 3, 3, 60, None, None, None)
     g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(1, 2)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
+    frames = g_calc.update_player(0, [(0, 0)], [1], None, 0)
+    assert len(frames) == len(g_calc.time_line[0]) == 2
+    assert frames[0][0][0, 0] == 2
+    assert compare_positions(frames[-1], g_calc.player_pos)
 
 
-def test_edge_reaction_bc():
-    start_pos = {0: np.array([[0, 0, 0],
+def test_play_events():
+    start_pos = {0: np.array([[1, 0, 0],
                               [0, 0, 0],
-                              [0, 2, 0]]),
+                              [0, 0, 0]]),
                  1: np.array([[0, 1, 0],
                               [0, 0, 0],
-                              [0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 0, 0],
-                             [0, 1, 0],
-                             [1, 0, 1]]),
-                1: np.array([[0, 1, 0],
-                             [0, 0, 0],
-                             [0, 0, 0]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+                              [0, 0, 1]])}
+    for engine in ["numpy", "classic", "bitboard"]:
+        g_calc = Gamecalc(2, 3, 3, 0, None, None, None, engine=engine)
+        g_calc.player_pos = start_pos
+        events = list(g_calc.play(0, (0, 0)))
+        assert [event.wave for event in events] == [0, 1]
+        assert list(events[0].changed) == [0]
+        assert list(events[1].changed) == [0, 1, 3]
+        assert list(events[1].totals) == [3, 1]
+        assert events[1].alive == (0, 1)
+        assert events[1].winner is None
+        assert not g_calc.time_line
+
+
+@pytest.mark.parametrize("engine", ["numpy", "bitboard"])
+@pytest.mark.parametrize("seed", [5, 6])
+def test_play_events_agree(engine, seed):
+    numpy_calc = Gamecalc(3, 4, 5, 0, None, None, None, engine=engine)
+    classic_calc = Gamecalc(3, 4, 5, 0, None, None, None, engine="classic")
+    rng = np.random.default_rng(seed)
+    while classic_calc.winner is None:
+        player = classic_calc.player_to_move()
+        valid = np.flatnonzero((classic_calc.owner.reshape(-1) == player)
+                               | (classic_calc.count.reshape(-1) == 0))
+        pos = divmod(int(rng.choice(valid)), 4)
+        numpy_events = list(numpy_calc.play(player, pos))
+        classic_events = list(classic_calc.play(player, pos))
+        assert len(numpy_events) == len(classic_events)
+        for numpy_event, classic_event in zip(numpy_events, classic_events):
+            assert np.all(numpy_event.changed == classic_event.changed)
+            assert np.all(numpy_event.totals == classic_event.totals)
+            assert numpy_event.alive == classic_event.alive
+            assert numpy_event.winner == classic_event.winner
+        numpy_calc.increase_counter()
+        classic_calc.increase_counter()
+
+
+def test_classic_dense_cascade():
+    rng = np.random.default_rng(3)
+    owner = rng.integers(0, 2, (12, 12))
+    owner[0, 0] = 0
+    games = [Gamecalc(2, 12, 12, 0, None, None, None, engine=engine)
+             for engine in ["numpy", "classic"]]
+    for game in games:
+        critical_mass = game.tables.critical_mass.reshape(12, 12)
+        game.player_pos = {num: np.where(owner == num, critical_mass - 1, 0) for num in range(2)}
+        game.set_state_for_undo(0)
+    # the whole board "explodes", the classic engine hands over to the "numpy" waves
+    numpy_events, classic_events = [list(game.play(0, (0, 0))) for game in games]
+    assert len(numpy_events) == len(classic_events) > 2
+    for numpy_event, classic_event in zip(numpy_events, classic_events):
+        assert np.all(numpy_event.changed == classic_event.changed)
+        assert np.all(numpy_event.totals == classic_event.totals)
+    assert games[0].winner == games[1].winner == 0
+    assert compare_positions(games[0].player_pos, games[1].player_pos)
+    assert games[0].get_hash() == games[1].get_hash()
+    # the scratch boards are empty again and undo restores the board
+    assert not any(board.any() for board in games[1].boards.values())
+    assert games[1].undo(None) is not None
+    assert np.all(games[1].owner == owner) and games[1].winner is None
+
+
+@pytest.mark.parametrize("engine", ["numpy", "classic", "bitboard"])
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_conformance(engine, case):
+    g_calc = Gamecalc(len(case.start_pos), case.width_num, case.height_num, 0, None, None, None,
+                      engine=engine)
+    g_calc.player_pos = case.start_pos
+    g_calc.update_player(case.player, [case.pos], [1], None, 0)
+    assert compare_positions(case.goal_pos, g_calc.player_pos)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "classic", "bitboard"])
+def test_incremental_totals(engine):
+    g_calc = Gamecalc(3, 5, 6, 0, None, None, None, engine=engine)
+    for round_num in play_random_moves(g_calc, 200, 7):
+        totals = [int(board.sum()) for board in g_calc.player_pos.values()]
+        assert list(g_calc.totals) == totals
+        if round_num >= 3:
+            alive = g_calc.get_alive()
+            assert alive == [num for num in range(3) if totals[num] > 0]
+            assert g_calc.get_eliminated() == [num for num in range(3) if num not in alive]
+            assert alive == [num for num in range(3) if g_calc.player_alive[num]]
+
+
+@pytest.mark.parametrize("engine", ["numpy", "classic", "bitboard"])
+def test_multi_level_undo(engine):
+    g_calc = Gamecalc(3, 4, 5, 0, None, None, None, engine=engine, undo_limit=100)
+    states = []
+    for round_num in play_random_moves(g_calc, 60, 8):
+        states.append((g_calc.owner.copy(), g_calc.count.copy(), dict(g_calc.player_alive),
+                       g_calc._counter, g_calc.winner, list(g_calc.totals)))
+    assert len(states) > 10
+    rounds = len(states)
+    for round_num in reversed(range(1, rounds)):
+        assert g_calc.undo(None) == round_num
+        owner, count, alive, counter, winner, totals = states[round_num - 1]
+        assert np.array_equal(g_calc.owner, owner)
+        assert np.array_equal(g_calc.count, count)
+        assert g_calc.player_alive == alive
+        assert g_calc._counter == counter
+        assert g_calc.winner == winner
+        assert list(g_calc.totals) == totals
+        assert round_num not in g_calc.time_line
+    assert g_calc.undo(None) == 0
+    assert not g_calc.count.any()
+    assert g_calc.undo(None) is None
+
+
+def test_bitboard_arrays_on_read():
+    g_calc = Gamecalc(2, 6, 9, 0, None, None, None, engine="bitboard", undo_limit=0)
+    numpy_calc = Gamecalc(2, 6, 9, 0, None, None, None)
+    for pos in [(0, 0), (8, 5), (0, 0), (8, 5), (0, 1)]:
+        owner = g_calc._owner.copy()
+        g_calc.apply_move(pos)
+        numpy_calc.apply_move(pos)
+        # the "Bitboard" is ahead until the arrays are read
+        assert np.array_equal(g_calc._owner, owner)
+        assert list(g_calc.valid_moves()) == list(numpy_calc.valid_moves())
+        assert list(g_calc.totals) == list(numpy_calc.totals)
+        assert g_calc.get_hash() == numpy_calc.get_hash()
+        assert np.array_equal(g_calc._owner, numpy_calc.owner)
+        assert np.array_equal(g_calc.count, numpy_calc.count)
+
+
+def test_undo_limit():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None, undo_limit=2)
+    for _ in play_random_moves(g_calc, 4, 9):
+        pass
+    assert g_calc.undo(None) == 3
+    assert g_calc.undo(None) == 2
+    assert g_calc.undo(None) is None
+    assert g_calc.count.sum() == 2
+
+
+@pytest.mark.parametrize("engine", ["numpy", "classic", "tiled"])
+def test_undo_journals_net_change(engine):
+    g_calc = long_chain_game(engine)
+    owner, count = g_calc.owner.copy(), g_calc.count.copy()
+    g_calc.set_state_for_undo(0)
+    g_calc.update_player(0, [(0, 0)], [1], None, 0)
+    assert len(g_calc.time_line[0]) > 100
+    # one entry per changed position instead of one per wave
+    entry = g_calc._journal[-1]
+    differs = (g_calc.owner != owner) | (g_calc.count != count)
+    assert np.array_equal(entry.cells, np.flatnonzero(differs))
+    assert np.array_equal(entry.owner, owner.reshape(-1)[entry.cells])
+    assert np.array_equal(entry.count, count.reshape(-1)[entry.cells])
+    assert g_calc.undo(None) == 0
+    assert np.array_equal(g_calc.owner, owner) and np.array_equal(g_calc.count, count)
+
+
+def long_chain_game(engine: str, **kwargs) -> Gamecalc:
+    """Returns a game on a 2x100 board where a move at (0, 0) "explodes" every position."""
+    g_calc = Gamecalc(2, 2, 100, 0, None, None, None, engine=engine, **kwargs)
+    start_pos = {0: g_calc.tables.critical_mass.reshape(100, 2) - 1,
+                 1: np.zeros((100, 2), dtype=int)}
+    start_pos[0][-1, :] = 0
+    start_pos[1][-1, :] = 1
     g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(2, 1)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
+    return g_calc
 
 
-def test_edge_reaction_lc():
-    start_pos = {0: np.array([[0, 0, 0],
-                              [2, 0, 0],
-                              [0, 0, 0]]),
-                 1: np.array([[0, 0, 0],
-                              [0, 0, 1],
-                              [0, 0, 0]])}
-    goal_pos = {0: np.array([[1, 0, 0],
-                             [0, 1, 0],
-                             [1, 0, 0]]),
-                1: np.array([[0, 0, 0],
-                             [0, 0, 1],
-                             [0, 0, 0]])}
-    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(1, 0)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_center_reaction_cc():
-    start_pos = {0: np.array([[0, 0, 0],
-                             [0, 3, 0],
-                             [0, 0, 0]]),
-                 1: np.array([[0, 0, 1],
-                             [0, 0, 0],
-                             [0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 1, 0],
-                             [1, 0, 1],
-                             [0, 1, 0]]),
-                1: np.array([[0, 0, 1],
-                             [0, 0, 0],
-                             [0, 0, 0]])}
+def test_wave_cap():
+    results = []
+    for engine in ["numpy", "classic", "bitboard"]:
+        g_calc = long_chain_game(engine, max_waves=30)
+        g_calc.update_player(0, [(0, 0)], [1], None, 0)
+        assert len(g_calc.time_line[0]) == 30
+        assert g_calc.winner is None
+        results.append((g_calc.owner, g_calc.count))
+    for owner, count in results[1:]:
+        assert np.array_equal(owner, results[0][0])
+        assert np.array_equal(count, results[0][1])
+
+
+def test_cascade_cycle():
     g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    list(g_calc.play(0, (1, 1)))
+    seen = set()
+    assert not g_calc._cascade_runaway(0, np.array([4]), seen)
+    assert not g_calc._cascade_runaway(1, np.array([3, 4]), seen)
+    assert g_calc._cascade_runaway(2, np.array([4]), seen)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "classic", "tiled"])
+def test_cascade_cycle_frames(engine):
+    # the left half can never calm down and the right half is out of reach
+    tables = board_tables(2, 5, "rect", ((0, 2), (1, 2)))
+    g_calc = Gamecalc(2, 5, 2, 0, None, None, None, engine=engine, tables=tables, max_frames=3)
+    start_pos = {0: np.zeros((2, 5), dtype=int), 1: np.zeros((2, 5), dtype=int)}
+    start_pos[0][:, :2] = 1
+    start_pos[1][:, 3:] = 1
     g_calc.player_pos = start_pos
-    g_calc.update_player(0, [(1, 1)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_capture_with_overloading_tl():
-    start_pos = {0: np.array([[0, 2, 0, 0, 0],
-                              [2, 3, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 1]]),
-                 1: np.array([[1, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 1]]),
-                1: np.array([[0, 2, 1, 0, 0],
-                             [2, 1, 1, 0, 0],
-                             [1, 1, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0]])}
-    g_calc = Gamecalc(2, 5, 5, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(1, [(0, 0)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_capture_with_overloading_tr():
-    start_pos = {0: np.array([[0, 0, 0, 2, 0],
-                              [0, 0, 0, 3, 2],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [1, 0, 0, 0, 0]]),
-                 1: np.array([[0, 0, 0, 0, 1],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [1, 0, 0, 0, 0]]),
-                1: np.array([[0, 0, 1, 2, 0],
-                             [0, 0, 1, 1, 2],
-                             [0, 0, 0, 1, 1],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0]])}
-    g_calc = Gamecalc(2, 5, 5, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(1, [(0, 4)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_capture_with_overloading_br():
-    start_pos = {0: np.array([[1, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 3, 2],
-                              [0, 0, 0, 2, 0]]),
-                 1: np.array([[0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 1]])}
-    goal_pos = {0: np.array([[1, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0]]),
-                1: np.array([[0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 1, 1],
-                             [0, 0, 1, 1, 2],
-                             [0, 0, 1, 2, 0]])}
-    g_calc = Gamecalc(2, 5, 5, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(1, [(4, 4)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
-
-
-def test_capture_with_overloading_bl():
-    start_pos = {0: np.array([[0, 0, 0, 0, 1],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [2, 3, 0, 0, 0],
-                              [0, 2, 0, 0, 0]]),
-                 1: np.array([[0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0],
-                              [1, 0, 0, 0, 0]])}
-    goal_pos = {0: np.array([[0, 0, 0, 0, 1],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0]]),
-                1: np.array([[0, 0, 0, 0, 0],
-                             [0, 0, 0, 0, 0],
-                             [1, 1, 0, 0, 0],
-                             [2, 1, 1, 0, 0],
-                             [0, 2, 1, 0, 0]])}
-    g_calc = Gamecalc(2, 5, 5, 0, None, None, None)
-    g_calc.player_pos = start_pos
-    g_calc.update_player(1, [(4, 0)], [1], None, 0)
-    assert compare_positions(goal_pos, g_calc.player_pos)
+    g_calc.set_state_for_undo(0)
+    frames = g_calc.update_player(0, [(0, 0)], [1], None, 0)
+    assert 3 < len(g_calc.time_line[0]) < g_calc.max_waves
+    assert len(frames) == 3
+    assert compare_positions(frames[-1], g_calc.player_pos)
+    assert g_calc.winner is None and g_calc.get_alive() == [0, 1]
+    # the game goes on
+    g_calc.increase_counter()
+    frames = g_calc.update_player(1, [(0, 3)], [1], None, 0)
+    assert compare_positions(frames[-1], g_calc.player_pos)
+
+
+def test_default_wave_cap():
+    assert Gamecalc(2, 6, 9, 0, None, None, None).max_waves == 120
+    g_calc = long_chain_game("numpy")
+    g_calc.update_player(0, [(0, 0)], [1], None, 0)
+    assert g_calc.winner == 0
+
+
+def test_fast_forward_frames():
+    g_calc = long_chain_game("numpy", max_frames=5)
+    full = long_chain_game("numpy", max_frames=1000)
+    frames = g_calc.update_player(0, [(0, 0)], [1], None, 0)
+    full_frames = full.update_player(0, [(0, 0)], [1], None, 0)
+    assert len(full_frames) > 100
+    assert len(frames) == 5
+    assert g_calc.time_line == full.time_line
+    assert g_calc.winner == full.winner == 0
+    for frame, full_frame in zip(frames[:4] + frames[-1:], full_frames[:4] + full_frames[-1:]):
+        assert compare_positions(frame, full_frame)
+
+
+def test_classic_scratch_boards_reused():
+    g_calc = long_chain_game("classic")
+    chain_board = g_calc.chain_board
+    substract_board = g_calc.substract_board[0]
+    board = g_calc.boards[0]
+    assert g_calc.apply_move((0, 0)) > 1
+    # the scratch boards are not reallocated and left empty for the next move
+    assert g_calc.chain_board is chain_board
+    assert g_calc.substract_board[0] is substract_board
+    assert g_calc.boards[0] is board
+    assert not g_calc.chain_board.any()
+    assert not any(board.any() for board in g_calc.boards.values())
+    assert not any(board.any() for board in g_calc.substract_board.values())
+    assert g_calc._chain_cells == [] and g_calc._substract_cells == []
+    assert g_calc._board_cells == set()
+
+
+def test_turn_order_many_players():
+    g_calc = Gamecalc(64, 4, 4, 0, None, None, None)
+    for num in [1, 2, 3, 40, 63]:
+        g_calc.set_eliminated(num)
+    order = []
+    for _ in range(62):
+        order.append(g_calc.player_to_move())
+        g_calc.increase_counter()
+    expected = [num for num in range(64) if num not in [1, 2, 3, 40, 63]]
+    assert order == expected + expected[:3]
+    assert g_calc.player_to_move() == 6
+    assert g_calc.player_next_to_move() == 7
+    g_calc.set_eliminated(7)
+    assert g_calc.player_next_to_move() == 8
+    assert [num for num, alive in g_calc.player_alive.items() if alive] == [
+        num for num in expected if num != 7]
+
+
+def test_board_frames():
+    sizes = []
+    for player_num in [2, 64]:
+        g_calc = Gamecalc(player_num, 3, 3, 0, None, None, None)
+        g_calc.player_pos = {0: np.array([[1, 0, 0], [0, 0, 0], [0, 0, 0]]),
+                             1: np.array([[0, 0, 0], [0, 0, 0], [0, 0, 1]])}
+        frames = g_calc.update_player(0, [(0, 0)], [1], None, 0, as_board=True)
+        owner, count = frames[-1]
+        assert np.array_equal(owner, g_calc.owner) and np.array_equal(count, g_calc.count)
+        assert owner[0, 1] == 0 and count[0, 1] == 1
+        sizes.append(owner.nbytes + count.nbytes)
+    assert sizes[0] == sizes[1]
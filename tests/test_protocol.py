@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests the binary wire protocol."""
+
+
+from __future__ import annotations
+import json
+import logging
+import pickle
+import socket
+import time
+
+import numpy as np
+import pytest
+
+import network
+import protocol
+from network import FrameReader, Network_s
+from game_rules import Gamecalc
+from timeline import TimeLine
+
+
+def round_trip(data, from_client=False):
+    msg = protocol.encode(data)
+    type_id, length = protocol.decode_header(msg[:protocol.HEADER.size])
+    assert length == len(msg) - protocol.HEADER.size
+    return protocol.decode(type_id, msg[protocol.HEADER.size:], from_client)
+
+
+@pytest.mark.parametrize("data", [("your number", 3), ("spectator", None),
+                                  ("next player", (2, 17)), ("next player", (None, 4)),
+                                  ("position", (5, 1)), ("undo", None), ("ByeBye", None)])
+def test_small_messages(data):
+    assert round_trip(data) == data
+
+
+def test_handshake():
+    client = ("player", "nick", "uuid", protocol.offer())
+    assert round_trip(("handshake", client), from_client=True) == ("handshake", client)
+    with pytest.raises(ValueError):  # "ProtocolError"
+        round_trip(("handshake", client))
+    server = {"nicknames": {0: "a", 1: "b"}, "player_num": 2, "width": 6, "height": 9,
+              "topology": "rect", "blocked": [(1, 2)], "session_uuid": "uuid",
+              "protocol": protocol.negotiate(protocol.offer())}
+    msg_type, content = round_trip(("handshake", server))
+    assert msg_type == "handshake"
+    assert content["nicknames"] == {0: "a", 1: "b"}
+    assert content["blocked"] == [[1, 2]]
+    assert content["protocol"] == {"version": protocol.PROTOCOL_VERSION,
+                                   "capabilities": list(protocol.CAPABILITIES)}
+    with pytest.raises(ValueError):  # "ProtocolError"
+        round_trip(("handshake", server), from_client=True)
+
+
+@pytest.mark.parametrize("client", [["spectator", None, "u", "abc"], ["king", None, "u"],
+                                    ["player", 3, "u"], ["player", "nick", None],
+                                    ["player", "nick", "u", {"version": "1", "capabilities": []}],
+                                    ["player", "nick", "u", {"version": 1, "capabilities": "delta"}],
+                                    ["player", "nick", "u", {"version": 1, "capabilities": [1]}],
+                                    {"nicknames": {}}, ["player", "nick"]])
+def test_invalid_client_handshake(client):
+    payload = json.dumps(client).encode("utf-8")
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode(protocol.MESSAGE_TYPES.index("handshake"), payload, from_client=True)
+
+
+def test_server_drops_server_handshake():
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "session")
+    sender, reciever = socket.socketpair()
+    try:
+        sender.sendall(protocol.encode(("handshake", {"nicknames": {}})))
+        # the caller closes the connection
+        assert server.recieve(reciever) == [(None, None)]
+    finally:
+        sender.close()
+        reciever.close()
+        server.server.close()
+
+
+@pytest.mark.parametrize("player_num", [2, 200])
+def test_board(player_num):
+    g_calc = Gamecalc(player_num, 7, 5, 0, None, None, None)
+    g_calc.update_player(1, [(0, 0), (2, 3)], [1, 2], None, 0)
+    owner, count = g_calc.board_frame()
+    msg_type, (r_owner, r_count) = round_trip(("board", (owner, count)))
+    assert msg_type == "board"
+    assert np.array_equal(r_owner, owner) and r_owner.shape == (5, 7)
+    assert np.array_equal(r_count, count) and r_count.dtype == np.uint8
+    assert r_owner.dtype.itemsize == owner.dtype.itemsize
+
+
+def test_board_smaller_than_pickle():
+    g_calc = Gamecalc(4, 30, 30, 0, None, None, None)
+    frame = g_calc.board_frame()
+    assert len(protocol.encode(("board", frame))) < len(pickle.dumps(("board", frame)))
+    assert len(protocol.encode(("board", frame))) == protocol.HEADER.size + 9 + 2 * 900
+
+
+def test_finished():
+    time_line = TimeLine(3)
+    for round_num in range(5):
+        time_line.append(round_num, 0, [round_num, 1, 2])
+    series = time_line.downsample()
+    msg_type, (winner, r_series) = round_trip(("finished", (2, series)))
+    assert (msg_type, winner) == ("finished", 2)
+    assert r_series.to_lists() == series.to_lists()
+
+
+def test_negotiate():
+    assert protocol.negotiate(None) == {"version": 1, "capabilities": []}
+    agreed = protocol.negotiate({"version": 99, "capabilities": ["board", "unknown"]})
+    assert agreed == {"version": protocol.PROTOCOL_VERSION, "capabilities": ["board"]}
+
+
+def test_invalid_messages():
+    with pytest.raises(protocol.ProtocolError):
+        protocol.encode(("positions", {}))
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode_header(protocol.HEADER.pack(protocol.PROTOCOL_VERSION + 1, 0, 0))
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode_header(protocol.HEADER.pack(protocol.PROTOCOL_VERSION, 255, 0))
+    board_id = protocol.MESSAGE_TYPES.index("board")
+    payload = protocol.encode(("board", (np.zeros((2, 2), np.int8),
+                                         np.zeros((2, 2), np.uint8))))[protocol.HEADER.size:]
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode(board_id, payload[:-1])
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode(protocol.MESSAGE_TYPES.index("position"), b"\x00")
+
+
+def test_reader_partial_and_coalesced():
+    sender, reciever = socket.socketpair()
+    reader = FrameReader(size=8)
+    try:
+        board = (np.arange(-1, 99, dtype=np.int8).reshape(10, 10), np.ones((10, 10), np.uint8))
+        msg = (protocol.encode(("position", (3, 4))) + protocol.encode(("undo", None))
+               + protocol.encode(("board", board)))
+        messages = []
+        for start in range(0, len(msg), 7):
+            sender.sendall(msg[start:start + 7])
+            messages += reader.read(reciever)
+        assert messages[:2] == [("position", (3, 4)), ("undo", None)]
+        assert len(messages) == 3 and np.array_equal(messages[2][1][0], board[0])
+        # many messages in one read
+        reader = FrameReader()
+        sender.sendall(protocol.encode(("undo", None)) * 50)
+        assert reader.read(reciever) == [("undo", None)] * 50
+        sender.close()
+        assert reader.read(reciever) == [(None, None)]
+    finally:
+        reciever.close()
+
+
+def test_reader_nonblocking():
+    sender, reciever = socket.socketpair()
+    reciever.setblocking(False)
+    reader = FrameReader()
+    try:
+        assert reader.read(reciever) == []
+        msg = protocol.encode(("next player", (1, 2)))
+        sender.sendall(msg[:5])
+        assert reader.read(reciever) == []
+        sender.sendall(msg[5:])
+        assert reader.read(reciever) == [("next player", (1, 2))]
+        with pytest.raises(ValueError):  # "ProtocolError"
+            sender.sendall(protocol.HEADER.pack(protocol.PROTOCOL_VERSION, 0,
+                                                protocol.MAX_PAYLOAD + 1))
+            reader.read(reciever)
+    finally:
+        sender.close()
+        reciever.close()
+
+
+def test_reader_does_not_allocate_declared_length():
+    sender, reciever = socket.socketpair()
+    reciever.setblocking(False)
+    reader = FrameReader(size=4096)
+    try:
+        sender.sendall(protocol.HEADER.pack(protocol.PROTOCOL_VERSION,
+                                            protocol.MESSAGE_TYPES.index("board"),
+                                            protocol.MAX_PAYLOAD))
+        for _ in range(3):
+            assert reader.read(reciever) == []
+        assert len(reader._buffer) == 4096
+        # grows only with the recieved bytes
+        sender.sendall(bytes(20000))
+        for _ in range(10):
+            reader.read(reciever)
+        assert len(reader._buffer) <= 2 * (20000 + protocol.HEADER.size)
+    finally:
+        sender.close()
+        reciever.close()
+
+
+@pytest.mark.parametrize("msg", [protocol.HEADER.pack(protocol.PROTOCOL_VERSION,
+                                                      protocol.MESSAGE_TYPES.index("board"), 10),
+                                 protocol.HEADER.pack(protocol.PROTOCOL_VERSION,
+                                                      protocol.MESSAGE_TYPES.index("handshake"),
+                                                      1 << 20),
+                                 protocol.HEADER.pack(protocol.PROTOCOL_VERSION,
+                                                      protocol.MESSAGE_TYPES.index("position"), 9)])
+def test_reader_client_limits(msg):
+    sender, reciever = socket.socketpair()
+    reader = FrameReader(limits=protocol.CLIENT_MESSAGE_LIMITS)
+    try:
+        sender.sendall(msg)
+        with pytest.raises(ValueError):  # "ProtocolError"
+            reader.read(reciever)
+    finally:
+        sender.close()
+        reciever.close()
+
+
+def test_keyframe_and_delta():
+    g_calc = Gamecalc(3, 6, 5, 0, None, None, None)
+    previous = g_calc.board_frame()
+    g_calc.update_player(0, [(0, 0), (4, 5)], [1, 1], None, 0)
+    board = g_calc.board_frame()
+    msg_type, (seq, owner, count) = round_trip(("keyframe", (7, *previous)))
+    assert (msg_type, seq) == ("keyframe", 7)
+    local = (np.array(owner), np.array(count))
+
+    cells, d_owner, d_count = protocol.board_delta(previous, board)
+    assert cells.tolist() == [0, 29]
+    msg_type, (seq, *delta) = round_trip(("delta", (8, cells, d_owner, d_count)))
+    assert (msg_type, seq) == ("delta", 8)
+    protocol.apply_delta(local, *delta)
+    assert np.array_equal(local[0], board[0]) and np.array_equal(local[1], board[1])
+    assert len(protocol.encode(("delta", (8, cells, d_owner, d_count)))) < 40
+
+
+def test_send_board_stream():
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "uuid", keyframe_interval=3)
+    pairs = [socket.socketpair() for _ in range(3)]
+    connections = [pair[0] for pair in pairs]
+    server.connections.extend(connections)
+    server.add_peer(connections[0], ("player", "a", "uuid", protocol.offer()))
+    server.add_peer(connections[1], ("spectator", None, "uuid", protocol.offer()))
+    server.add_peer(connections[2], ("spectator", None, "uuid"))  # no delta capability
+    try:
+        g_calc = Gamecalc(2, 4, 4, 0, None, None, None)
+        boards = [g_calc.board_frame()]
+        for pos in [(0, 0), (1, 1), (2, 2), (3, 3)]:
+            g_calc.update_player(0, [pos], [1], None, 0)
+            boards.append(g_calc.board_frame())
+        for num, board in enumerate(boards):
+            # the second connection misses the second board
+            targets = [conn for conn in connections if (num != 1) or (conn != connections[1])]
+            server.send_board(targets, board)
+        received = [[msg[0] for msg in FrameReader().read(pair[1])] for pair in pairs]
+        assert received[0] == ["keyframe", "delta", "keyframe", "delta", "delta"]
+        assert received[1] == ["keyframe", "keyframe", "delta", "delta"]
+        assert received[2] == ["board"] * 5
+    finally:
+        for pair in pairs:
+            pair[0].close()
+            pair[1].close()
+        server.server.close()
+
+
+def slow_pair():
+    sender, reciever = socket.socketpair()
+    sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    reciever.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sender.setblocking(False)
+    reciever.setblocking(False)
+    return sender, reciever
+
+
+def read_all(server, sender, reciever):
+    """Reads from "reciever" while "server" flushes the queue of "sender"."""
+    reader = FrameReader()
+    messages = []
+    for _ in range(10000):
+        server.flush([sender])
+        new = reader.read(reciever)
+        messages += new
+        if (not new) and (sender not in server.pending()):
+            break
+    return messages
+
+
+@pytest.mark.parametrize("slow_client", ["drop", "disconnect"])
+def test_slow_client(slow_client):
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "uuid",
+                       queue_limit=200_000, slow_client=slow_client)
+    sender, reciever = slow_pair()
+    server.connections.append(sender)
+    server.add_peer(sender, ("spectator", None, "uuid", protocol.offer()))
+    rng = np.random.default_rng(0)
+    try:
+        for num in range(40):
+            board = (rng.integers(-1, 2, (100, 100)).astype(np.int8),
+                     rng.integers(0, 3, (100, 100)).astype(np.uint8))
+            server.send_board(server.connections, board)
+        if slow_client == "disconnect":
+            assert sender not in server.connections
+            # reported to the game loop once
+            assert server.pop_dropped() == [sender]
+            assert server.pop_dropped() == []
+            return
+        assert sender in server.connections
+        assert server.pop_dropped() == []
+        assert server.stats(sender)["queued_bytes"] <= 200_000
+        assert server.stats(sender)["dropped_messages"] > 0
+        server.send(sender, ("next player", (1, 5)))
+        messages = read_all(server, sender, reciever)
+        assert messages[-1] == ("next player", (1, 5))
+        # applied like the client does, the boards end with the last board
+        local, seq = None, None
+        for msg_type, content in messages[:-1]:
+            if msg_type == "keyframe":
+                seq, local = content[0], (np.array(content[1]), np.array(content[2]))
+            elif (seq is not None) and (content[0] == seq + 1):
+                seq = content[0]
+                protocol.apply_delta(local, *content[1:])
+            else:
+                seq = None
+        assert seq == 40
+        assert np.array_equal(local[0], board[0]) and np.array_equal(local[1], board[1])
+        stats = server.stats(sender)
+        assert stats["queued_bytes"] == 0 and stats["sent_messages"] == len(messages)
+        assert stats["max_latency"] >= stats["mean_latency"] > 0
+    finally:
+        if sender in server.connections:
+            server.close_connection(sender)
+        reciever.close()
+        server.server.close()
+
+
+def test_write_error_is_dropped():
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "uuid")
+    sender, reciever = socket.socketpair()
+    server.connections.append(sender)
+    try:
+        reciever.close()
+        assert not server.send(sender, ("next player", (0, 1)))
+        assert sender not in server.connections
+        assert server.pop_dropped() == [sender]
+    finally:
+        server.server.close()
+
+
+def test_broadcast_encodes_once(monkeypatch):
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "uuid")
+    pairs = [socket.socketpair() for _ in range(5)]
+    connections = [pair[0] for pair in pairs]
+    server.connections.extend(connections)
+    for connection in connections:
+        server.add_peer(connection, ("spectator", None, "uuid", protocol.offer()))
+    encoded = []
+    original = network.protocol.encode
+
+    def counting_encode(data):
+        encoded.append(data[0])
+        return original(data)
+
+    monkeypatch.setattr(network.protocol, "encode", counting_encode)
+    try:
+        queued = server.broadcast(connections, ("next player", (1, 3)))
+        board = (np.zeros((3, 3), np.int8), np.ones((3, 3), np.uint8))
+        server.send_board(connections, board)
+        server.send_board(connections, (board[0], board[1] + 1))
+        assert queued == connections
+        assert encoded == ["next player", "keyframe", "delta"]
+        for pair in pairs:
+            assert [msg[0] for msg in FrameReader().read(pair[1])] == ["next player", "keyframe",
+                                                                       "delta"]
+    finally:
+        for pair in pairs:
+            pair[0].close()
+            pair[1].close()
+        server.server.close()
+
+
+def test_close_all_shares_linger():
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "uuid")
+    pairs = [slow_pair() for _ in range(4)]
+    server.connections.extend(pair[0] for pair in pairs)
+    try:
+        # nobody reads, the queues can not be written
+        server.broadcast(server.connections, ("board", (np.zeros((300, 300), np.int8),
+                                                        np.zeros((300, 300), np.uint8))))
+        assert len(server.pending()) == 4
+        start = time.monotonic()
+        server.close_all(linger=0.3)
+        assert time.monotonic() - start < 0.9
+        assert server.connections == [] and server.pending() == []
+    finally:
+        for pair in pairs:
+            pair[1].close()
+        server.server.close()
+
+
+def test_restart_starts_new_board_stream():
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "uuid")
+    pairs = [socket.socketpair() for _ in range(2)]
+    try:
+        server.connections.append(pairs[0][0])
+        server.add_peer(pairs[0][0], ("player", "a", "uuid", protocol.offer()))
+        g_calc = Gamecalc(2, 4, 4, 0, None, None, None)
+        for pos in [(0, 0), (1, 1)]:
+            g_calc.update_player(0, [pos], [1], None, 0)
+            server.send_board(server.connections, g_calc.board_frame())
+        server.schedule_broadcast([("board", g_calc.board_frame())], 10.0)
+        server.close_all()
+        assert not server.has_scheduled()
+        # a client of the next game does not get the last board of the old game
+        server.connections.append(pairs[1][0])
+        server.add_peer(pairs[1][0], ("player", "b", "uuid", protocol.offer()))
+        pairs[1][0].setblocking(False)
+        pairs[1][1].setblocking(False)
+        server.send_keyframe(pairs[1][0])
+        assert FrameReader().read(pairs[1][1]) == []
+        board = Gamecalc(2, 3, 3, 0, None, None, None).board_frame()
+        server.send_board(server.connections, board)
+        (msg_type, (seq, *_)), = FrameReader().read(pairs[1][1])
+        assert (msg_type, seq) == ("keyframe", 1)
+    finally:
+        for pair in pairs:
+            pair[0].close()
+            pair[1].close()
+        server.server.close()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests selfplay."""
+
+
+import pytest
+import numpy as np
+
+from selfplay import run_selfplay
+
+
+def test_random_selfplay():
+    stats = run_selfplay(40, 2, 3, 3, workers=2, seed=3, chunk_size=7)
+    assert stats.wins.sum() + stats.unfinished == 40
+    assert stats.unfinished == 0
+    assert np.isclose(stats.win_rates.sum(), 1)
+    assert stats.average_length >= 3
+    assert stats.max_waves >= 2
+    for game in range(40):
+        winner = stats.results[game, 0]
+        assert np.all(stats.owner[game][stats.count[game] > 0] == winner)
+
+    same = run_selfplay(40, 2, 3, 3, workers=3, seed=3, chunk_size=7)
+    assert np.array_equal(stats.results, same.results)
+    assert np.array_equal(stats.count, same.count)
+
+
+def test_bot_selfplay():
+    stats = run_selfplay(2, 2, 3, 3, policy="bot", workers=2, time_budget=0.01)
+    assert stats.wins.sum() == 2
+    assert stats.average_waves >= 1
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        run_selfplay(1, 2, 3, 3, policy="mcts")
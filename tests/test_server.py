@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests the server game loop helpers."""
+
+
+import logging
+import socket
+
+from server import _player_left
+from network import FrameReader, Network_s
+from game_rules import Gamecalc
+
+
+def test_player_left_on_turn():
+    server = Network_s("127.0.0.1", 0, logging.getLogger("test"), "uuid")
+    pairs = [socket.socketpair() for _ in range(3)]
+    connections = [pair[0] for pair in pairs]
+    server.connections.extend(connections)
+    player = {conn: num for num, conn in enumerate(connections)}
+    nicknames = {0: "a", 1: "b", 2: "c"}
+    g_calc = Gamecalc(3, 4, 4, 0, None, None, None)
+    g_calc.set_state_for_undo(0)
+    try:
+        assert g_calc.player_to_move() == 0
+        server.close_connection(connections[0])
+        _player_left(server, g_calc, player, nicknames, connections[0], 3)
+        # the game goes on with the next player
+        assert g_calc.player_to_move() == 1
+        assert g_calc.undo(None) is None
+        assert connections[0] not in player and g_calc.winner is None
+        for pair in pairs[1:]:
+            assert FrameReader().read(pair[1]) == [("next player", (1, 3))]
+        server.close_connection(connections[1])
+        _player_left(server, g_calc, player, nicknames, connections[1], 3)
+        assert g_calc.winner == 2
+    finally:
+        for pair in pairs:
+            pair[0].close()
+            pair[1].close()
+        server.server.close()
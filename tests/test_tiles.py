@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests TileSpreader and the "tiled" engine."""
+
+
+import pytest
+import numpy as np
+
+from tiles import TileSpreader
+from topology import board_tables
+from game_rules import Gamecalc
+
+
+@pytest.mark.parametrize("topology", ["rect", "torus", "hex"])
+@pytest.mark.parametrize("workers", [1, 2, 3, 7, 40])
+def test_spread_matches_serial(topology, workers):
+    tables = board_tables(31, 17, topology)
+    spreader = TileSpreader(tables, 31, 17, workers=workers, min_cells=0)
+    assert spreader.tile_num == min(workers, 31)
+    assert spreader.bounds[0] == 0 and spreader.bounds[-1] == 31 * 17
+    rng = np.random.default_rng(workers)
+    for size in [0, 1, 50, 400]:
+        emptied = np.sort(rng.choice(31 * 17, size, replace=False)).astype(np.intp)
+        recieved, incoming = spreader.spread(emptied)
+        expected, expected_incoming = np.unique(tables.neighbors(emptied), return_counts=True)
+        assert np.array_equal(recieved, expected)
+        assert np.array_equal(incoming, expected_incoming)
+
+
+@pytest.mark.parametrize("min_cells", [0, 20])
+def test_tiled_engine_matches_numpy(min_cells):
+    games = [Gamecalc(3, 12, 20, 0, None, None, None, engine=engine, workers=4, undo_limit=0)
+             for engine in ["numpy", "tiled"]]
+    games[1]._tiles.min_cells = min_cells
+    rng = np.random.default_rng(5)
+    while games[0].winner is None:
+        valid = games[0].valid_moves()
+        pos = divmod(int(valid[rng.integers(len(valid))]), 12)
+        events = [list(game.play(game.player_to_move(), pos)) for game in games]
+        for game in games:
+            if game.winner is None:
+                game.increase_counter()
+        for event, tiled_event in zip(*events):
+            assert np.array_equal(event.changed, tiled_event.changed)
+            assert np.array_equal(event.totals, tiled_event.totals)
+        assert len(events[0]) == len(events[1])
+        assert np.array_equal(games[0].owner, games[1].owner)
+        assert np.array_equal(games[0].count, games[1].count)
+        assert games[0]._board_hash == games[1]._board_hash
+    assert games[0].winner == games[1].winner
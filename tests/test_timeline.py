@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests TimeLine."""
+
+
+from __future__ import annotations
+
+import numpy as np
+
+from timeline import TimeLine
+from game_rules import Gamecalc
+
+
+def test_append_and_grow():
+    time_line = TimeLine(2, capacity=1)
+    for round_num in range(50):
+        for wave in range(3):
+            time_line.append(round_num, wave, [round_num, wave])
+    assert len(time_line) == 150
+    assert time_line.nbytes < 1000 * 150
+    assert np.array_equal(time_line[7], [[7, 0], [7, 1], [7, 2]])
+    assert 49 in time_line and 50 not in time_line
+
+
+def test_pop():
+    time_line = TimeLine(2)
+    for round_num in range(3):
+        time_line.append(round_num, 0, [round_num, 1])
+    time_line.pop(2)
+    assert len(time_line) == 2
+    assert 2 not in time_line
+    time_line.pop(5)
+    assert list(time_line.rounds) == [0, 1]
+
+
+def test_downsample():
+    time_line = TimeLine(2)
+    for round_num in range(4):
+        for wave in range(round_num + 1):
+            time_line.append(round_num, wave, [round_num, wave])
+    series = time_line.downsample()
+    assert list(series.x) == [0, 1, 1.5, 2, 2 + 1/3, 2 + 2/3, 3, 3.25, 3.5, 3.75]
+    assert np.array_equal(series.totals, time_line.totals)
+
+    series = time_line.downsample(4)
+    assert len(series.x) == 4
+    assert series.x[0] == 0 and series.x[-1] == 3.75
+    assert np.array_equal(series.totals[-1], [3, 3])
+    assert series.to_lists()["totals"][0] == [0, 0]
+    assert len(TimeLine(3).downsample().x) == 0
+
+
+def test_game_time_line():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    for round_num, pos in enumerate([(0, 0), (2, 2), (0, 0)]):
+        g_calc.update_player(g_calc.player_to_move(), [pos], [1], None, round_num)
+        g_calc.increase_counter()
+    assert list(g_calc.time_line.rounds) == [0, 1, 2, 2]
+    assert list(g_calc.time_line.waves) == [0, 0, 0, 1]
+    assert np.array_equal(g_calc.time_line.totals[-1], [2, 1])
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests the board topologies."""
+
+
+import pytest
+import numpy as np
+
+from topology import board_tables
+from game_rules import Gamecalc
+from batch_rules import Batchcalc
+
+
+def neighbors(tables, row, column, width_num):
+    cells = tables.neighbors(np.array([row * width_num + column]))
+    return sorted(divmod(int(cell), width_num) for cell in cells)
+
+
+def test_torus():
+    tables = board_tables(3, 4, "torus")
+    assert np.all(tables.critical_mass == 4)
+    assert neighbors(tables, 0, 0, 4) == [(0, 1), (0, 3), (1, 0), (2, 0)]
+
+
+def test_hex():
+    tables = board_tables(4, 4, "hex")
+    assert neighbors(tables, 1, 1, 4) == [(0, 1), (0, 2), (1, 0), (1, 2), (2, 1), (2, 2)]
+    assert neighbors(tables, 2, 1, 4) == [(1, 0), (1, 1), (2, 0), (2, 2), (3, 0), (3, 1)]
+    assert neighbors(tables, 0, 0, 4) == [(0, 1), (1, 0)]
+    assert tables.critical_mass.reshape(4, 4)[1, 1] == 6
+    assert np.array_equal(tables.critical_mass, np.diff(tables.neighbor_ptr))
+
+
+def test_blocked():
+    tables = board_tables(3, 3, "rect", ((1, 1),))
+    assert tables.blocked[4] and tables.critical_mass[4] == 0
+    assert np.array_equal(tables.critical_mass.reshape(3, 3), [[2, 2, 2],
+                                                               [2, 0, 2],
+                                                               [2, 2, 2]])
+    assert 4 not in tables.neighbor_idx
+    assert board_tables(3, 3).is_plain and not tables.is_plain
+    with pytest.raises(ValueError):
+        board_tables(3, 3, "rect", ((0, 1), (1, 0)))
+    with pytest.raises(ValueError):
+        board_tables(3, 3, "rect", ((3, 0),))
+    with pytest.raises(ValueError):
+        board_tables(3, 3, "square")
+
+
+def test_valid_moves_skip_blocked():
+    tables = board_tables(3, 3, "rect", ((1, 1),))
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None, tables=tables)
+    assert 4 not in g_calc.valid_moves()
+    batch = Batchcalc(2, 2, 3, 3, tables=tables)
+    assert not batch.valid_moves()[:, 4].any()
+    with pytest.raises(ValueError):
+        Gamecalc(2, 3, 3, 0, None, None, None, engine="bitboard", tables=tables)
+    with pytest.raises(ValueError):
+        Gamecalc(2, 4, 3, 0, None, None, None, tables=tables)
+
+
+@pytest.mark.parametrize("topology, blocked", [("torus", ()), ("hex", ()),
+                                               ("rect", ((2, 2), (0, 4))),
+                                               ("hex", ((1, 1), (3, 3)))])
+def test_engines_agree(topology, blocked):
+    tables = board_tables(5, 6, topology, blocked)
+    games = [Gamecalc(3, 6, 5, 0, None, None, None, engine=engine, tables=tables,
+                      undo_limit=0)
+             for engine in ["numpy", "classic"]]
+    rng = np.random.default_rng(3)
+    for _ in range(400):
+        if games[0].winner is not None:
+            break
+        valid = games[0].valid_moves()
+        pos = divmod(int(valid[rng.integers(len(valid))]), 6)
+        waves = [game.apply_move(pos) for game in games]
+        assert waves[0] == waves[1]
+        assert np.array_equal(games[0].owner, games[1].owner)
+        assert np.array_equal(games[0].count, games[1].count)
+        assert not games[0].count.reshape(-1)[tables.blocked].any()
+    assert games[0].winner is not None
+    assert games[0].winner == games[1].winner
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests zobrist."""
+
+
+import pytest
+import numpy as np
+
+from game_rules import Gamecalc
+from zobrist import TranspositionTable, zobrist_keys, EXACT, LOWER
+from tests.test_game_rules import play_random_moves
+
+
+@pytest.mark.parametrize("engine", ["numpy", "classic", "bitboard"])
+def test_incremental_hash(engine):
+    g_calc = Gamecalc(3, 5, 6, 0, None, None, None, engine=engine, undo_limit=40)
+    keys = zobrist_keys(6, 5, 3)
+    hashes = [g_calc.get_hash()]
+    for _ in play_random_moves(g_calc, 40, 10):
+        board_hash = keys.board_hash(g_calc.owner, g_calc.count)
+        assert g_calc._board_hash == board_hash
+        if g_calc.winner is None:
+            assert g_calc.get_hash() == board_hash ^ int(keys.turn[g_calc.player_to_move()])
+        hashes.append(g_calc.get_hash())
+    assert len(set(hashes)) == len(hashes)
+    for board_hash in reversed(hashes[:-1]):
+        g_calc.undo(None)
+        assert g_calc.get_hash() == board_hash
+
+
+def test_hash_player_pos():
+    g_calc = Gamecalc(2, 3, 3, 0, None, None, None)
+    list(g_calc.play(0, (1, 1)))  # the assigned board replaces this move
+    start_pos = {0: np.array([[1, 0, 0], [0, 2, 0], [0, 0, 0]]),
+                 1: np.array([[0, 0, 0], [0, 0, 0], [0, 0, 1]])}
+    g_calc.player_pos = start_pos
+    other = Gamecalc(2, 3, 3, 0, None, None, None)
+    for pos in [(0, 0), (1, 1), (1, 1)]:
+        list(other.play(0, pos))
+    list(other.play(1, (2, 2)))
+    assert g_calc.get_hash() == other.get_hash()
+    other.increase_counter()
+    assert g_calc.get_hash() != other.get_hash()
+
+
+def test_transposition_table():
+    table = TranspositionTable(4)
+    assert table.get(5) is None
+    table.store(5, 3, 1.0, 7)
+    assert table.get(5).move == 7
+    table.store(7, 1, 2.0, flag=LOWER)  # same bucket, shallower
+    assert table.get(5).depth == 3
+    assert table.get(7).flag == LOWER
+    table.store(9, 0, 3.0)  # replaces the newest slot only
+    assert table.get(5) is not None
+    assert table.get(7) is None
+    table.store(11, 4, 4.0)  # deeper, moves the deepest entry to the second slot
+    assert table.get(11).flag == EXACT
+    assert table.get(5).depth == 3
+    assert len(table) == 2
+    table.store(5, 5, 5.0)
+    assert table.get(5).value == 5.0
+    assert table.get(11).value == 4.0
+    assert len(table) == 2
+    table.clear()
+    assert len(table) == 0